@@ -2,7 +2,7 @@
 Main entry point for the Civic Complaint Tracking System
 Run this file to start the Flask development server
 """
-from app import create_app
+from app import create_app, db
 import os
 
 # Create Flask application instance
@@ -24,6 +24,10 @@ if __name__ == '__main__':
     print("=" * 50)
     print("\nPress CTRL+C to quit")
     print()
+
+    # Dev server convenience only — production runs `flask init-db` instead
+    with app.app_context():
+        db.create_all()
     
     app.run(
         host='0.0.0.0',
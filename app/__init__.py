@@ -1,13 +1,18 @@
 """
 Flask application factory for Civic Complaint Tracking System
 """
+import os
+import weakref
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
+from app.utils.replica import RoutingSession
 
-# Initialize extensions
-db = SQLAlchemy()
+# Initialize extensions (the session routes read-only requests to the
+# replica bind when one is configured)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 def create_app(config_name='default'):
@@ -24,8 +29,12 @@ def create_app(config_name='default'):
     db.init_app(app)
     login_manager.init_app(app)
     
+    # Client address and scheme as seen by the outermost trusted proxy
+    proxies = app.config['TRUSTED_PROXY_COUNT']
+    if proxies > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+
     # Create upload directory if it doesn't exist
-    import os
     if app.config.get('UPLOAD_FOLDER'):
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
@@ -35,31 +44,64 @@ def create_app(config_name='default'):
     login_manager.login_message_category = 'info'
     
     # Register blueprints
-    from app.routes import auth, citizen, officer, admin, supervisor, moderator, auditor
-    app.register_blueprint(auth.bp)
-    app.register_blueprint(citizen.bp)
-    app.register_blueprint(officer.bp)
-    app.register_blueprint(admin.bp)
-    app.register_blueprint(supervisor.bp)
-    app.register_blueprint(moderator.bp)
-    app.register_blueprint(auditor.bp)
-    
-    # Register main blueprint
-    from app.routes import main
-    app.register_blueprint(main.bp)
+    from app.routes import auth, citizen, officer, admin, supervisor, moderator, auditor, main
+    for module in (auth, citizen, officer, admin, supervisor, moderator, auditor, main):
+        app.register_blueprint(module.bp)
     
     # Register error handlers
     register_error_handlers(app)
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-    
-    # Home route
 
+    # Read-replica routing for @replica_reads views
+    from app.utils import replica
+    replica.init_app(app)
+
+    # Prometheus /metrics, per-request SQL counts and timings (Server-Timing,
+    # logs, admin page), the slow-query log and the on-demand profiler, with
+    # rate limiting after metrics so rejected requests are still counted
+    from app.utils import metrics, sql_stats, slow_queries, profiler, rate_limit
+    metrics.init_app(app)
+    rate_limit.init_app(app)
+    sql_stats.init_app(app)
+    slow_queries.init_app(app)
+    profiler.init_app(app)
+
+    # Register CLI commands (schema creation lives in `flask init-db`,
+    # never in the worker boot path)
+    from app.cli import register_cli
+    register_cli(app)
+
+    # Forked workers must not reuse pooled connections opened in the master
+    register_fork_safety(app)
     
     return app
 
+# The app served by this process: the last one created. Held weakly so apps
+# made by benchmarks or tests can be garbage collected.
+_current_app_ref = None
+
+
+def _dispose_engines_after_fork():
+    app = _current_app_ref() if _current_app_ref else None
+    if app is None:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+
+def register_fork_safety(app):
+    """
+    Drop inherited pool connections in every forked child so the app can be
+    created once in the gunicorn master (--preload) and shared copy-on-write.
+    One fork hook per process serves whichever app was created last.
+    """
+    global _current_app_ref
+    _current_app_ref = weakref.ref(app)
+
 def register_error_handlers(app):
     """Register custom error handlers"""
     
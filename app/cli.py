@@ -0,0 +1,137 @@
+"""
+Flask CLI commands for database setup and maintenance
+Run with: flask --app wsgi:app <command>
+"""
+import click
+from app import db
+
+
+def register_cli(app):
+    """Attach management commands to the application's `flask` CLI"""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create any missing database tables (safe to run repeatedly)"""
+        db.create_all()
+        click.echo('Database tables are up to date.')
+
+    @app.cli.command('archive-closed')
+    @click.option('--days', type=int, default=None,
+                  help='Archive complaints Closed for longer than this (default ARCHIVE_AFTER_DAYS)')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Complaints moved per transaction (default ARCHIVE_BATCH_SIZE)')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+    def archive_closed(days, batch_size, max_batches):
+        """Move long-Closed complaints and their history to the archive tables"""
+        from app.utils.archive import archive_closed_complaints
+        moved = archive_closed_complaints(days, batch_size, max_batches)
+        click.echo(f'Archived {moved} closed complaint(s).')
+
+    @app.cli.command('rollup-update')
+    def rollup_update():
+        """Fold new status history into the daily department rollups"""
+        from app.utils.rollups import update_rollups
+        click.echo(f'Rolled up {update_rollups()} status change(s).')
+
+    @app.cli.command('rollup-backfill')
+    @click.option('--batch-size', type=int, default=None,
+                  help='History rows per transaction (default ROLLUP_BATCH_SIZE)')
+    def rollup_backfill(batch_size):
+        """Rebuild the daily department rollups from all status history"""
+        from app.utils.rollups import backfill_rollups
+        click.echo(f'Rebuilt rollups from {backfill_rollups(batch_size)} status change(s).')
+
+    @app.cli.command('sla-sweep')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Complaints escalated per transaction (default SLA_BATCH_SIZE)')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+    @click.option('--dry-run', is_flag=True, help='Only report how many complaints are overdue')
+    @click.option('--interval', type=int, default=0,
+                  help='Keep running, sweeping every this many seconds')
+    def sla_sweep(batch_size, max_batches, dry_run, interval):
+        """Escalate complaints stalled past their SLA deadline and notify supervisors"""
+        import time
+        from app.utils.sla import sweep
+        while True:
+            counts = sweep(batch_size, max_batches, dry_run)
+            verb = 'Overdue' if dry_run else 'Escalated'
+            click.echo(f'{verb}: ' + ', '.join(f'{status} {n}' for status, n in counts.items()))
+            if not interval:
+                break
+            db.session.remove()
+            time.sleep(interval)
+
+    @app.cli.command('assign-complaints')
+    @click.option('--department-id', type=int, default=None, help='Only this department')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Complaints assigned per transaction (default ASSIGNMENT_BATCH_SIZE)')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches')
+    def assign_complaints(department_id, batch_size, max_batches):
+        """Assign Under Review complaints to the least-loaded officer of their department"""
+        from app.utils.assignment import assign_pending
+        click.echo(f'Assigned {assign_pending(department_id, batch_size, max_batches)} complaint(s).')
+
+    @app.cli.command('trending-decay')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Complaints rescored per transaction (default TRENDING_BATCH_SIZE)')
+    @click.option('--rebuild', is_flag=True,
+                  help='Also score every complaint upvoted in the window (after migrating)')
+    @click.option('--interval', type=int, default=0,
+                  help='Keep running, re-decaying every INTERVAL seconds')
+    def trending_decay(batch_size, rebuild, interval):
+        """Recompute public complaints' trending scores from their recent upvotes"""
+        import time
+        from app.utils.trending import decay_all
+        while True:
+            click.echo(f'Rescored {decay_all(batch_size, rebuild)} complaint(s).')
+            if not interval:
+                break
+            rebuild = False
+            db.session.remove()
+            time.sleep(interval)
+
+    @app.cli.command('work-queue-rebuild')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Complaints recomputed per transaction (default WORK_QUEUE_BATCH_SIZE)')
+    def work_queue_rebuild(batch_size):
+        """Recompute work-queue priorities (after migrating or changing SLA or queue settings)"""
+        from app.utils.work_queue import rebuild
+        click.echo(f'Reprioritized {rebuild(batch_size)} complaint(s).')
+
+    @app.cli.command('dedup-index')
+    @click.option('--batch-size', type=int, default=1000, help='Complaints indexed per transaction')
+    def dedup_index(batch_size):
+        """Build duplicate-detection signatures for open complaints that lack one"""
+        from app.utils.duplicates import build_index
+        click.echo(f'Indexed {build_index(batch_size)} complaint(s).')
+
+    @app.cli.command('replicate-db')
+    @click.option('--interval', type=float, default=0,
+                  help='Keep copying every N seconds (0 = copy once)')
+    def replicate_db(interval):
+        """Copy a SQLite primary into the SQLite replica (local stand-in for replication)"""
+        import time
+        from app.utils.replica import BIND_KEY, copy_sqlite
+        if BIND_KEY not in db.engines:
+            raise click.ClickException('DATABASE_REPLICA_URL is not set.')
+        primary, replica = db.engines[None].url, db.engines[BIND_KEY].url
+        if primary.get_backend_name() != 'sqlite' or replica.get_backend_name() != 'sqlite':
+            raise click.ClickException('Only SQLite files can be copied; use the database\'s own replication.')
+        while True:
+            copy_sqlite(primary.database, replica.database)
+            click.echo(f'Copied {primary.database} -> {replica.database}')
+            if not interval:
+                break
+            time.sleep(interval)
+
+    @app.cli.command('profile-token')
+    @click.argument('admin_username')
+    @click.option('--mode', type=click.Choice(['sample', 'cprofile']), default='sample')
+    def profile_token(admin_username, mode):
+        """Print a signed X-Profile header value that profiles the requests sending it"""
+        from app.models import User
+        from app.utils.profiler import make_token
+        admin = User.query.filter_by(username=admin_username, role='admin').first()
+        if admin is None:
+            raise click.ClickException(f'No admin named {admin_username!r}.')
+        click.echo(make_token(app, admin.id, mode))
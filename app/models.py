@@ -2,9 +2,12 @@
 Database models for Civic Complaint Tracking System — 7-Role RBAC
 """
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.types import TypeDecorator, SmallInteger
 from app import db, login_manager
+from app.utils import identity_cache, passwords
 
 # All valid roles
 VALID_ROLES = ['admin', 'supervisor', 'moderator', 'officer', 'auditor', 'citizen']
@@ -23,7 +26,7 @@ STATUS_TRANSITIONS = {
     'Submitted':    ['Under Review', 'Flagged'],       # Moderator action
     'Flagged':      ['Closed'],                        # Terminal via Moderator/Admin
     'Under Review': ['Assigned', 'Rejected'],
-    'Assigned':     ['In Progress', 'On Hold', 'Rejected'],
+    'Assigned':     ['In Progress', 'On Hold', 'Rejected', 'Escalated'],
     'In Progress':  ['Resolved', 'On Hold', 'Rejected', 'Escalated'],
     'On Hold':      ['In Progress', 'Rejected', 'Escalated'],
     'Escalated':    ['In Progress', 'Assigned'],       # Supervisor/Admin resolves escalation
@@ -32,6 +35,61 @@ STATUS_TRANSITIONS = {
     'Closed':       []   # Terminal
 }
 
+# Compact storage code per status. Codes are persisted: never renumber, only append.
+STATUS_CODES = {
+    'Draft': 1, 'Submitted': 2, 'Flagged': 3, 'Under Review': 4,
+    'Assigned': 5, 'In Progress': 6, 'On Hold': 7, 'Escalated': 8,
+    'Resolved': 9, 'Rejected': 10, 'Closed': 11,
+}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# STATUS_TRANSITIONS compiled to an array, indexed by source code, of
+# bitmasks with one bit set per allowed target code
+_TRANSITION_MASKS = tuple(
+    sum(1 << STATUS_CODES[target] for target in STATUS_TRANSITIONS.get(STATUS_NAMES.get(code), ()))
+    for code in range(max(STATUS_NAMES) + 1)
+)
+
+
+def can_transition(current_status, new_status):
+    """True when STATUS_TRANSITIONS allows current_status → new_status"""
+    try:
+        return bool(_TRANSITION_MASKS[STATUS_CODES[current_status]] >> STATUS_CODES[new_status] & 1)
+    except KeyError:
+        return False
+
+
+def check_transition(current_status, new_status):
+    """Raise ValueError unless STATUS_TRANSITIONS allows current_status → new_status"""
+    if not can_transition(current_status, new_status):
+        allowed = STATUS_TRANSITIONS.get(current_status, [])
+        raise ValueError(
+            f'Invalid transition: {current_status} → {new_status}. '
+            f'Allowed: {", ".join(allowed) if allowed else "None (terminal)"}'
+        )
+
+
+class StatusCode(TypeDecorator):
+    """
+    Status stored as a SMALLINT code but read and written as its name, so
+    models, queries (`current_status == 'Closed'`, `.in_([...])`) and
+    templates keep working with status names.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return STATUS_CODES[value]
+        except KeyError:
+            raise ValueError(f'Unknown status: {value!r}') from None
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else STATUS_NAMES[int(value)]
+
+
 # Badge colour CSS class per status
 STATUS_BADGE_COLORS = {
     'Draft':        'status-draft',
@@ -77,14 +135,29 @@ class User(UserMixin, db.Model):
     upvotes = db.relationship('Upvote', backref='user', lazy='dynamic', cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify on the bounded hashing pool; may raise passwords.HashingBusy"""
+        return passwords.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return passwords.needs_rehash(self.password_hash)
 
     def is_staff(self):
         return self.role in STAFF_ROLES
 
+    @property
+    def department_name(self):
+        return self.department.name if self.department else None
+
+    @property
+    def unread_count(self):
+        return Notification.query.filter_by(user_id=self.id, is_read=False).count()
+
+    def get_unread_notifications(self):
+        return Notification.query.filter_by(user_id=self.id, is_read=False).all()
+
     def get_dashboard_url(self):
         """Return the correct dashboard URL for this user's role"""
         from flask import url_for
@@ -104,7 +177,20 @@ class User(UserMixin, db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """Served from the short-TTL identity cache (see app/utils/identity_cache.py)"""
+    return identity_cache.load_identity(int(user_id))
+
+
+def system_actor():
+    """User recorded as the actor of automatic transitions (SLA escalations, auto-assignment)"""
+    username = current_app.config['SYSTEM_ACTOR_USERNAME']
+    if username:
+        actor = User.query.filter_by(username=username).first()
+    else:
+        actor = User.query.filter_by(role='admin', is_active=True).order_by(User.id).first()
+    if actor is None:
+        raise RuntimeError('No user available to record automatic transitions; set SYSTEM_ACTOR_USERNAME.')
+    return actor
 
 
 class Department(db.Model):
@@ -122,7 +208,39 @@ class Department(db.Model):
         return f'<Department {self.name}>'
 
 
-class Complaint(db.Model):
+class Status(db.Model):
+    """Lookup table naming the status codes, for reports and ad-hoc SQL"""
+    __tablename__ = 'statuses'
+
+    code = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+
+@event.listens_for(Status.__table__, 'after_create')
+def _seed_statuses(table, connection, **kw):
+    connection.execute(table.insert(), [{'code': code, 'name': name} for name, code in STATUS_CODES.items()])
+
+
+class ComplaintMixin:
+    """Read-side helpers shared by live and archived complaints"""
+    is_archived = False
+
+    def get_allowed_next_statuses(self):
+        return STATUS_TRANSITIONS.get(self.current_status, [])
+
+    def is_terminal(self):
+        return self.current_status == 'Closed'
+
+    def get_resolution_time(self):
+        if self.current_status in ('Resolved', 'Closed'):
+            return (self.updated_at - self.created_at).days
+        return None
+
+    def get_badge_class(self):
+        return STATUS_BADGE_COLORS.get(self.current_status, 'bg-secondary')
+
+
+class Complaint(ComplaintMixin, db.Model):
     """Complaint model — 11-stage lifecycle"""
     __tablename__ = 'complaints'
 
@@ -130,9 +248,9 @@ class Complaint(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
     citizen_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False, index=True)
     assigned_officer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
-    current_status = db.Column(db.String(50), nullable=False, default='Draft')
+    current_status = db.Column(StatusCode, nullable=False, default='Draft')
     flag_reason = db.Column(db.Text, nullable=True)       # Set by Moderator when flagging
     escalation_notes = db.Column(db.Text, nullable=True)  # Set by Supervisor when escalating
     evidence_filename = db.Column(db.String(255), nullable=True)
@@ -141,6 +259,11 @@ class Complaint(db.Model):
     is_public = db.Column(db.Boolean, default=False, nullable=False)
     rating = db.Column(db.Integer, nullable=True) # 1-5 scale
     feedback_text = db.Column(db.Text, nullable=True)
+    duplicate_of_id = db.Column(db.Integer, nullable=True)  # Canonical complaint this was merged into
+    upvote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Kept by app/utils/upvotes.py
+    trending_score = db.Column(db.Float, nullable=False, default=0, server_default='0')  # As of trending_at; see app/utils/trending.py
+    trending_at = db.Column(db.DateTime, nullable=True)
+    priority = db.Column(db.Float, nullable=True)  # Officer work queue rank, NULL once closed; see app/utils/work_queue.py
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -150,23 +273,27 @@ class Complaint(db.Model):
     )
     upvotes = db.relationship('Upvote', backref='complaint', lazy='dynamic', cascade='all, delete-orphan')
 
-    def get_allowed_next_statuses(self):
-        return STATUS_TRANSITIONS.get(self.current_status, [])
-
-    def is_terminal(self):
-        return self.current_status == 'Closed'
+    __table_args__ = (
+        # Status age scans: archival of long-Closed complaints, SLA sweeps
+        db.Index('ix_complaints_status_updated_at', 'current_status', 'updated_at'),
+        # Officer workload (open complaints per officer) for auto-assignment
+        db.Index('ix_complaints_officer_status', 'assigned_officer_id', 'current_status'),
+        # Keyset pages of the public feed, optionally by department (see
+        # app/utils/public_feed.py)
+        db.Index('ix_complaints_public_created_at', 'is_public', 'created_at', 'id'),
+        db.Index('ix_complaints_department_public_created_at', 'department_id', 'is_public', 'created_at', 'id'),
+        # "Top this week" pages of the public feed
+        db.Index('ix_complaints_public_trending', 'is_public', 'trending_score', 'id'),
+        # Officer work queue: a department's open complaints, most urgent first
+        db.Index('ix_complaints_department_priority', 'department_id', 'priority'),
+    )
 
     def update_status(self, new_status, changed_by_user, notes=''):
         """
         Update complaint status with validation.
         Raises ValueError if transition is invalid.
         """
-        allowed = STATUS_TRANSITIONS.get(self.current_status, [])
-        if new_status not in allowed:
-            raise ValueError(
-                f'Invalid transition: {self.current_status} → {new_status}. '
-                f'Allowed: {", ".join(allowed) if allowed else "None (terminal)"}'
-            )
+        check_transition(self.current_status, new_status)
 
         history = StatusHistory(
             complaint_id=self.id,
@@ -181,6 +308,7 @@ class Complaint(db.Model):
         if self.citizen_id != changed_by_user.id:
             notification = Notification(
                 user_id=self.citizen_id,
+                complaint_id=self.id,
                 message=f'Your complaint "#{self.id}: {self.title}" status changed to {new_status}.',
                 link=f'/citizen/complaint/{self.id}'
             )
@@ -188,14 +316,6 @@ class Complaint(db.Model):
         self.current_status = new_status
         self.updated_at = datetime.utcnow()
 
-    def get_resolution_time(self):
-        if self.current_status in ('Resolved', 'Closed'):
-            return (self.updated_at - self.created_at).days
-        return None
-
-    def get_badge_class(self):
-        return STATUS_BADGE_COLORS.get(self.current_status, 'bg-secondary')
-
     def __repr__(self):
         return f'<Complaint #{self.id}: {self.title} ({self.current_status})>'
 
@@ -205,13 +325,21 @@ class StatusHistory(db.Model):
     __tablename__ = 'status_history'
 
     id = db.Column(db.Integer, primary_key=True)
-    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), nullable=False)
-    previous_status = db.Column(db.String(50), nullable=False)
-    new_status = db.Column(db.String(50), nullable=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), nullable=False, index=True)
+    previous_status = db.Column(StatusCode, nullable=False)
+    new_status = db.Column(StatusCode, nullable=False)
     changed_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     notes = db.Column(db.Text, nullable=True)
     changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    # Keyset pagination of the audit log on (changed_at, id), optionally
+    # narrowed by actor or transition type (see app/utils/audit_log.py)
+    __table_args__ = (
+        db.Index('ix_status_history_changed_at_id', 'changed_at', 'id'),
+        db.Index('ix_status_history_actor_changed_at', 'changed_by_user_id', 'changed_at', 'id'),
+        db.Index('ix_status_history_new_status_changed_at', 'new_status', 'changed_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<StatusHistory: {self.previous_status} → {self.new_status}>'
 
@@ -221,6 +349,7 @@ class Notification(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    complaint_id = db.Column(db.Integer, nullable=True, index=True)  # Complaint the message is about
     message = db.Column(db.String(255), nullable=False)
     link = db.Column(db.String(255), nullable=True)
     is_read = db.Column(db.Boolean, default=False, nullable=False)
@@ -232,5 +361,159 @@ class Upvote(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), nullable=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # One upvote per user and complaint; lets batched writes skip duplicates
+    __table_args__ = (
+        db.Index('ux_upvotes_user_complaint', 'user_id', 'complaint_id', unique=True),
+    )
+
+
+# ── Archive tier ─────────────────────────────────────────────────────────
+# Closed complaints older than ARCHIVE_AFTER_DAYS are moved here, with their
+# history, upvotes and notifications, by `flask archive-closed` (see
+# app/utils/archive.py). Rows keep their original ids.
+
+class ArchivedComplaint(ComplaintMixin, db.Model):
+    """Closed complaint moved out of the hot complaints table"""
+    __tablename__ = 'complaints_archive'
+    is_archived = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    citizen_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False, index=True)
+    assigned_officer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    current_status = db.Column(StatusCode, nullable=False)
+    flag_reason = db.Column(db.Text, nullable=True)
+    escalation_notes = db.Column(db.Text, nullable=True)
+    evidence_filename = db.Column(db.String(255), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    is_public = db.Column(db.Boolean, default=False, nullable=False)
+    rating = db.Column(db.Integer, nullable=True)
+    feedback_text = db.Column(db.Text, nullable=True)
+    duplicate_of_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, index=True)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    department = db.relationship('Department')
+    citizen = db.relationship('User', foreign_keys=[citizen_id])
+    assigned_officer = db.relationship('User', foreign_keys=[assigned_officer_id])
+    status_history = db.relationship(
+        'ArchivedStatusHistory', backref='complaint', lazy='dynamic',
+        order_by='ArchivedStatusHistory.changed_at.desc()', cascade='all, delete-orphan'
+    )
+    upvotes = db.relationship('ArchivedUpvote', backref='complaint', lazy='dynamic',
+                              cascade='all, delete-orphan')
+
+    def get_allowed_next_statuses(self):
+        return []
+
+    def __repr__(self):
+        return f'<ArchivedComplaint #{self.id}: {self.title}>'
+
+
+class ArchivedStatusHistory(db.Model):
+    """Status history of archived complaints (same shape and indexes as status_history)"""
+    __tablename__ = 'status_history_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints_archive.id'), nullable=False, index=True)
+    previous_status = db.Column(StatusCode, nullable=False)
+    new_status = db.Column(StatusCode, nullable=False)
+    changed_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    notes = db.Column(db.Text, nullable=True)
+    changed_at = db.Column(db.DateTime, index=True)
+
+    changed_by = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_status_history_archive_changed_at_id', 'changed_at', 'id'),
+        db.Index('ix_status_history_archive_actor_changed_at', 'changed_by_user_id', 'changed_at', 'id'),
+        db.Index('ix_status_history_archive_new_status_changed_at', 'new_status', 'changed_at', 'id'),
+    )
+
+
+class ArchivedUpvote(db.Model):
+    __tablename__ = 'upvotes_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints_archive.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime)
+
+
+class ArchivedNotification(db.Model):
+    __tablename__ = 'notifications_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    complaint_id = db.Column(db.Integer, nullable=True, index=True)
+    message = db.Column(db.String(255), nullable=False)
+    link = db.Column(db.String(255), nullable=True)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+
+# ── Daily rollups ────────────────────────────────────────────────────────
+# Maintained from status_history by `flask rollup-update` / `rollup-backfill`
+# (see app/utils/rollups.py); trend charts read these instead of raw history.
+
+class DailyDepartmentStat(db.Model):
+    """Per-department counts of lifecycle events for one (UTC) day"""
+    __tablename__ = 'daily_department_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
+    submitted = db.Column(db.Integer, default=0, nullable=False)
+    verified = db.Column(db.Integer, default=0, nullable=False)
+    flagged = db.Column(db.Integer, default=0, nullable=False)
+    resolved = db.Column(db.Integer, default=0, nullable=False)
+    closed = db.Column(db.Integer, default=0, nullable=False)
+    escalated = db.Column(db.Integer, default=0, nullable=False)
+    stage_exits = db.Column(db.Integer, default=0, nullable=False)      # transitions out of a non-Draft stage
+    stage_seconds = db.Column(db.Float, default=0.0, nullable=False)   # time spent in those stages
+
+    __table_args__ = (
+        db.UniqueConstraint('department_id', 'day', name='uq_daily_department_stats_department_day'),
+    )
+
+    @property
+    def mean_time_in_stage_hours(self):
+        if not self.stage_exits:
+            return None
+        return self.stage_seconds / self.stage_exits / 3600
+
+
+class RollupState(db.Model):
+    """High-water mark of the status_history rows already folded into the rollups"""
+    __tablename__ = 'rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_history_id = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ── Duplicate detection ──────────────────────────────────────────────────
+# MinHash signatures of complaint text and their LSH band buckets (see
+# app/utils/duplicates.py). Bucket keys include the department, so a lookup
+# only ever meets complaints of the same department.
+
+class ComplaintSignature(db.Model):
+    __tablename__ = 'complaint_signatures'
+
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), primary_key=True, autoincrement=False)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+
+class DuplicateBucket(db.Model):
+    __tablename__ = 'duplicate_buckets'
+
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), primary_key=True,
+                             autoincrement=False, index=True)
@@ -1,13 +1,17 @@
 """
 Admin routes for user management, department management, and reports
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app,
+                   abort, send_from_directory)
 from flask_login import login_required, current_user
 from sqlalchemy import func, case
 from datetime import datetime
 from app import db
-from app.models import User, Department, Complaint, StatusHistory, STATUS_TRANSITIONS, VALID_ROLES
+from app.models import User, Department, Complaint, StatusHistory, STATUS_TRANSITIONS, VALID_ROLES, VALID_STATUSES
 from app.utils.decorators import role_required
+from app.utils.replica import replica_reads
+from app.utils import (exports, archive, rollups, assignment, sql_stats, slow_queries, profiler,
+                       reference_data)
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -113,8 +117,7 @@ def add_user():
         if errors:
             for error in errors:
                 flash(error, 'danger')
-            departments = Department.query.all()
-            return render_template('admin/add_user.html', departments=departments)
+            return render_template('admin/add_user.html', departments=reference_data.departments())
 
         new_user = User(
             username=username,
@@ -125,13 +128,17 @@ def add_user():
         new_user.set_password(password)
 
         db.session.add(new_user)
+        if role == 'officer':
+            db.session.flush()
+            moved = assignment.rebalance(new_user.department_id, current_user)
+            if moved:
+                flash(f'{moved} complaint(s) moved to {username} to balance the workload.', 'info')
         db.session.commit()
 
         flash(f'User {username} created successfully!', 'success')
         return redirect(url_for('admin.manage_users'))
 
-    departments = Department.query.all()
-    return render_template('admin/add_user.html', departments=departments)
+    return render_template('admin/add_user.html', departments=reference_data.departments())
 
 
 @bp.route('/user/delete/<int:user_id>', methods=['POST'])
@@ -146,6 +153,10 @@ def delete_user(user_id):
         return redirect(url_for('admin.manage_users'))
 
     username = user.username
+    if user.role == 'officer':
+        released = assignment.release_officer(user, current_user)
+        if released:
+            flash(f'{released} open complaint(s) of {username} were handed to other officers.', 'info')
     db.session.delete(user)
     db.session.commit()
 
@@ -198,7 +209,7 @@ def delete_department(dept_id):
     """Delete a department"""
     dept = Department.query.get_or_404(dept_id)
 
-    if dept.complaints.count() > 0:
+    if dept.complaints.count() > 0 or archive.count_archived(department_id=dept.id) > 0:
         flash('Cannot delete department with existing complaints.', 'danger')
         return redirect(url_for('admin.manage_departments'))
 
@@ -215,18 +226,18 @@ def delete_department(dept_id):
 @role_required('admin')
 def department_view(dept_id):
     """View department details with all complaints and staff"""
-    dept = Department.query.get_or_404(dept_id)
+    dept = reference_data.department_or_404(dept_id)
 
     # Staff
-    supervisors = User.query.filter_by(department_id=dept.id, role='supervisor').all()
-    officers = User.query.filter_by(department_id=dept.id, role='officer').all()
+    staff = reference_data.roster(dept.id)
+    supervisors, officers = staff['supervisor'], staff['officer']
 
     # Complaints — optional status filter (always exclude drafts)
     status_filter = request.args.get('status', '')
     complaints_q = Complaint.query.filter_by(department_id=dept.id).filter(
         Complaint.current_status != 'Draft'
     )
-    if status_filter:
+    if status_filter in VALID_STATUSES:
         complaints_q = complaints_q.filter_by(current_status=status_filter)
     complaints = complaints_q.order_by(Complaint.created_at.desc()).all()
 
@@ -255,6 +266,7 @@ def department_view(dept_id):
 # ========== Reports ==========
 
 @bp.route('/reports')
+@replica_reads
 @login_required
 @role_required('admin')
 def reports():
@@ -293,15 +305,98 @@ def reports():
                            active_complaints=active_complaints,
                            avg_resolution_time=avg_resolution_time,
                            complaints_by_dept=complaints_by_dept,
+                           departments=reference_data.departments(by_name=True),
+                           department_names=reference_data.department_names(),
+                           valid_statuses=VALID_STATUSES,
                            now=datetime.now)
 
 
+@bp.route('/api/trends')
+@replica_reads
+@login_required
+@role_required('admin')
+def trends_api():
+    """Daily-rollup trend series: ?months=12&department_id=&bucket=day|week|month"""
+    return jsonify(rollups.trend(**rollups.parse_trend_args(request.args)))
+
+
+@bp.route('/sql-stats')
+@login_required
+@role_required('admin')
+def sql_stats_view():
+    """Per-endpoint SQL counts and timings across all workers, worst first"""
+    rows, workers = sql_stats.summary(sql_stats.stats_dir(current_app))
+    return render_template('admin/sql_stats.html', rows=rows, workers=workers,
+                           enabled=current_app.config['SQL_INSTRUMENTATION'],
+                           threshold=current_app.config['SQL_N_PLUS_ONE_THRESHOLD'])
+
+
+@bp.route('/sql-stats/reset', methods=['POST'])
+@login_required
+@role_required('admin')
+def reset_sql_stats():
+    sql_stats.reset(sql_stats.stats_dir(current_app))
+    flash('SQL statistics have been reset.', 'info')
+    return redirect(url_for('admin.sql_stats_view'))
+
+
+@bp.route('/slow-queries')
+@login_required
+@role_required('admin')
+def slow_queries_view():
+    """Statements slower than SLOW_QUERY_MS in the last ?days=7, with their query plans"""
+    days = max(1, min(request.args.get('days', 7, type=int), 90))
+    rows = slow_queries.report(slow_queries.log_dir(current_app), days=days)
+    return render_template('admin/slow_queries.html', rows=rows, days=days,
+                           threshold=current_app.config['SLOW_QUERY_MS'])
+
+
+@bp.route('/profiles', methods=['GET', 'POST'])
+@login_required
+@role_required('admin')
+def profiles():
+    """Stored profiler reports; POST issues an X-Profile token for another session or curl"""
+    token = None
+    mode = request.form.get('mode', 'sample')
+    if request.method == 'POST':
+        if mode not in profiler.MODES:
+            abort(400, 'Unknown profiler mode.')
+        token = profiler.make_token(current_app, current_user.id, mode)
+    return render_template('admin/profiles.html', token=token, mode=mode,
+                           reports=profiler.list_reports(profiler.report_dir(current_app)),
+                           enabled=current_app.config['PROFILER_ENABLED'],
+                           max_age=current_app.config['PROFILER_TOKEN_MAX_AGE'])
+
+
+@bp.route('/profiles/<path:name>')
+@login_required
+@role_required('admin')
+def download_profile(name):
+    return send_from_directory(profiler.report_dir(current_app), name, as_attachment=True,
+                               mimetype='text/plain')
+
+
+@bp.route('/export/<dataset>')
+@replica_reads
+@login_required
+@role_required('admin')
+def export(dataset):
+    """
+    Stream complaints, department stats or status history as CSV/NDJSON.
+    Query args: format=csv|ndjson, gzip=1, start, end, department_id, status
+    """
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') == '1'
+    filters = exports.parse_filters(request.args)
+    return exports.stream_export(dataset, fmt, filters, compress)
+
+
 @bp.route('/complaint/<int:complaint_id>')
 @login_required
 @role_required('admin')
 def view_complaint(complaint_id):
     """View any complaint (read-only for admin)"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
     history = complaint.status_history.all()
     allowed_transitions = complaint.get_allowed_next_statuses()
 
@@ -1,15 +1,19 @@
 """
 Auditor routes — read-only access to all complaints and audit trails
 """
-from flask import Blueprint, render_template, request
+import json
+from flask import Blueprint, render_template, request, url_for, Response
 from flask_login import login_required
 from app.models import Complaint, StatusHistory, VALID_STATUSES
 from app.utils.decorators import role_required
+from app.utils.replica import replica_reads
+from app.utils import audit_log, archive, reference_data
 
 bp = Blueprint('auditor', __name__, url_prefix='/auditor')
 
 
 @bp.route('/dashboard')
+@replica_reads
 @login_required
 @role_required('auditor', 'admin')
 def dashboard():
@@ -20,25 +24,100 @@ def dashboard():
     if status_filter != 'all' and status_filter in VALID_STATUSES:
         query = query.filter_by(current_status=status_filter)
 
-    complaints = query.order_by(Complaint.created_at.desc()).all()
+    # Closed also lists the archive, a page at a time: live Closed complaints
+    # and the newest archived ones first, then older archived pages alone
+    archived_before = request.args.get('archived_before', type=int)
+    complaints, older_url = [], None
+    if not archived_before:
+        complaints = query.order_by(Complaint.created_at.desc()).all()
+    if status_filter == 'Closed':
+        archived, next_before = archive.archived_page(archived_before)
+        complaints += archived
+        if next_before:
+            older_url = url_for('auditor.dashboard', status='Closed', archived_before=next_before)
 
+    # Live complaints only, like the "all" list; archived (Closed) ones are
+    # counted separately and listed under Closed
     status_counts = {s: Complaint.query.filter_by(current_status=s).count()
                      for s in VALID_STATUSES}
 
     return render_template('auditor/dashboard.html',
                            complaints=complaints,
+                           older_url=older_url,
+                           department_names=reference_data.department_names(),
                            valid_statuses=VALID_STATUSES,
                            status_filter=status_filter,
-                           status_counts=status_counts)
+                           status_counts=status_counts,
+                           archived_count=archive.count_archived())
 
 
 @bp.route('/complaint/<int:complaint_id>')
+@replica_reads
 @login_required
 @role_required('auditor', 'admin')
 def complaint_detail(complaint_id):
     """Read-only complaint detail with full status history"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
     history = complaint.status_history.all()
     return render_template('auditor/complaint_detail.html',
                            complaint=complaint,
                            history=history)
+
+
+@bp.route('/audit-log')
+@replica_reads
+@login_required
+@role_required('auditor', 'admin')
+def audit_log_view():
+    """System-wide status transition log, newest first, keyset-paginated"""
+    filters = audit_log.parse_filters(request.args)
+    rows, next_cursor = audit_log.fetch_page(filters)
+
+    # Keep the current filters on the "older" link, swapping in the new cursor
+    next_url = None
+    if next_cursor:
+        args = {k: v for k, v in request.args.items() if k != 'cursor'}
+        next_url = url_for('auditor.audit_log_view', cursor=next_cursor, **args)
+
+    return render_template('auditor/audit_log.html',
+                           rows=rows,
+                           next_url=next_url,
+                           filters=request.args,
+                           departments=reference_data.departments(by_name=True),
+                           valid_statuses=VALID_STATUSES)
+
+
+@bp.route('/api/audit-log')
+@replica_reads
+@login_required
+@role_required('auditor', 'admin')
+def audit_log_api():
+    """
+    NDJSON page of the audit log; same filters as the HTML view.
+    The cursor for the next page is returned in the X-Next-Cursor header
+    (and a Link rel="next" header) and is absent on the last page.
+    """
+    filters = audit_log.parse_filters(request.args)
+    rows, next_cursor = audit_log.fetch_page(filters)
+
+    body = ''.join(json.dumps({
+        'id': r.id,
+        'changed_at': r.changed_at.isoformat(),
+        'complaint_id': r.complaint_id,
+        'department_id': r.department_id,
+        'department': r.department,
+        'previous_status': r.previous_status,
+        'new_status': r.new_status,
+        'actor_id': r.actor_id,
+        'actor': r.actor,
+        'actor_role': r.actor_role,
+        'notes': r.notes,
+    }) + '\n' for r in rows)
+
+    headers = {}
+    if next_cursor:
+        args = {k: v for k, v in request.args.items() if k != 'cursor'}
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = '<{}>; rel="next"'.format(
+            url_for('auditor.audit_log_api', cursor=next_cursor, _external=True, **args))
+    return Response(body, mimetype='application/x-ndjson', headers=headers)
@@ -5,6 +5,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
 from app import db
 from app.models import User
+from app.utils.passwords import HashingBusy
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -24,10 +25,20 @@ def login():
             return render_template('auth/login.html')
 
         user = User.query.filter_by(username=username).first()
-        if user is None or not user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('The server is handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html'), 503, {'Retry-After': '2'}
+        if not valid:
             flash('Invalid username or password.', 'danger')
             return render_template('auth/login.html')
 
+        # Upgrade hashes made with an older algorithm/cost while we have the password
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
         login_user(user, remember=remember)
         flash(f'Welcome back, {user.username}!', 'success')
         return redirect(user.get_dashboard_url())
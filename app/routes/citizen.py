@@ -1,14 +1,15 @@
 """
 Citizen routes for complaint submission, draft saving, and tracking
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, abort
 from werkzeug.utils import secure_filename
 import os
 import uuid
 from flask_login import login_required, current_user
 from app import db
-from app.models import Complaint, Department, STATUS_TRANSITIONS
+from app.models import Complaint, STATUS_TRANSITIONS
 from app.utils.decorators import role_required
+from app.utils import archive, duplicates, metrics, reference_data
 
 bp = Blueprint('citizen', __name__, url_prefix='/citizen')
 
@@ -31,7 +32,13 @@ def dashboard():
     ).count()
     rejected = all_complaints.filter_by(current_status='Rejected').count()
 
-    complaints = all_complaints.order_by(Complaint.created_at.desc()).all()
+    # Long-closed complaints live in the archive tier
+    archived = archive.count_archived(citizen_id=current_user.id)
+    total_complaints += archived
+    resolved += archived
+
+    complaints = archive.citizen_complaints(current_user.id) if archived else \
+        all_complaints.order_by(Complaint.created_at.desc()).all()
 
     return render_template('citizen/dashboard.html',
                            total=total_complaints,
@@ -68,6 +75,7 @@ def submit_complaint():
                     evidence_filename = f"{uuid.uuid4().hex}.{ext}"
                     filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], evidence_filename)
                     file.save(filepath)
+                    metrics.record_upload(ext, filepath)
 
         errors = []
         if not title or len(title) < 5:
@@ -80,18 +88,17 @@ def submit_complaint():
         if errors:
             for error in errors:
                 flash(error, 'danger')
-            departments = Department.query.all()
+            departments = reference_data.departments()
             return render_template('citizen/submit_complaint.html', departments=departments)
 
-        # Determine initial status
-        initial_status = 'Draft' if save_as_draft else 'Submitted'
-
+        # Every complaint starts as a Draft; an immediate submit records the
+        # Draft → Submitted transition like submit_draft does
         complaint = Complaint(
             title=title,
             description=description,
             citizen_id=current_user.id,
             department_id=int(department_id),
-            current_status=initial_status,
+            current_status='Draft',
             evidence_filename=evidence_filename,
             latitude=float(latitude) if latitude else None,
             longitude=float(longitude) if longitude else None,
@@ -99,6 +106,10 @@ def submit_complaint():
         )
 
         db.session.add(complaint)
+        if not save_as_draft:
+            db.session.flush()
+            complaint.update_status('Submitted', current_user, notes='Citizen submitted complaint.')
+            duplicates.index_complaint(complaint, replace=False)
         db.session.commit()
 
         if save_as_draft:
@@ -108,10 +119,44 @@ def submit_complaint():
 
         return redirect(url_for('citizen.view_complaints'))
 
-    departments = Department.query.all()
+    departments = reference_data.departments()
     return render_template('citizen/submit_complaint.html', departments=departments)
 
 
+@bp.route('/api/duplicates')
+@login_required
+@role_required('citizen')
+def duplicate_candidates():
+    """Open complaints that look like the one being written (JSON, polled by the submit form)"""
+    try:
+        department_id = int(request.args['department_id']) if request.args.get('department_id') else None
+        latitude = float(request.args['latitude']) if request.args.get('latitude') else None
+        longitude = float(request.args['longitude']) if request.args.get('longitude') else None
+        exclude_id = int(request.args['exclude_id']) if request.args.get('exclude_id') else None
+    except ValueError:
+        abort(400, 'department_id, latitude, longitude and exclude_id must be numbers.')
+
+    public, private = [], 0
+    for complaint, score, distance in duplicates.find_candidates(
+            request.args.get('title', ''), request.args.get('description', ''),
+            department_id, latitude, longitude, exclude_id=exclude_id):
+        # Private complaints are only counted, never shown to other citizens
+        if not complaint.is_public and complaint.citizen_id != current_user.id:
+            private += 1
+            continue
+        public.append({
+            'id': complaint.id,
+            'title': complaint.title,
+            'status': complaint.current_status,
+            'upvotes': complaint.upvote_count,
+            'similarity': round(score, 2),
+            'distance_m': round(distance) if distance is not None else None,
+            'own': complaint.citizen_id == current_user.id,
+            'upvote_url': url_for('main.upvote_complaint', complaint_id=complaint.id),
+        })
+    return jsonify({'candidates': public, 'private_matches': private})
+
+
 @bp.route('/complaint/<int:complaint_id>/edit', methods=['GET', 'POST'])
 @login_required
 @role_required('citizen')
@@ -147,6 +192,7 @@ def edit_draft(complaint_id):
                     evidence_filename = f"{uuid.uuid4().hex}.{ext}"
                     filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], evidence_filename)
                     file.save(filepath)
+                    metrics.record_upload(ext, filepath)
                     complaint.evidence_filename = evidence_filename
 
         errors = []
@@ -160,7 +206,7 @@ def edit_draft(complaint_id):
         if errors:
             for error in errors:
                 flash(error, 'danger')
-            departments = Department.query.all()
+            departments = reference_data.departments()
             return render_template('citizen/edit_draft.html',
                                    complaint=complaint, departments=departments)
 
@@ -176,11 +222,12 @@ def edit_draft(complaint_id):
                 note = 'Citizen revised and resubmitted after rejection.' if is_rejected \
                        else 'Citizen edited and submitted draft.'
                 complaint.update_status('Submitted', current_user, notes=note)
+                duplicates.index_complaint(complaint)
                 flash(f'Complaint #{complaint.id} updated and submitted!', 'success')
             except ValueError as e:
                 flash(str(e), 'danger')
                 db.session.rollback()
-                departments = Department.query.all()
+                departments = reference_data.departments()
                 return render_template('citizen/edit_draft.html',
                                        complaint=complaint, departments=departments)
         else:
@@ -189,7 +236,7 @@ def edit_draft(complaint_id):
         db.session.commit()
         return redirect(url_for('citizen.view_complaints'))
 
-    departments = Department.query.all()
+    departments = reference_data.departments()
     return render_template('citizen/edit_draft.html',
                            complaint=complaint, departments=departments)
 
@@ -211,6 +258,7 @@ def submit_draft(complaint_id):
 
     try:
         complaint.update_status('Submitted', current_user, notes='Citizen submitted draft complaint.')
+        duplicates.index_complaint(complaint)
         db.session.commit()
         flash(f'Complaint #{complaint.id} has been submitted successfully!', 'success')
     except ValueError as e:
@@ -225,7 +273,7 @@ def submit_draft(complaint_id):
 @role_required('citizen')
 def view_complaints():
     """View all complaints submitted by the current citizen"""
-    complaints = current_user.complaints.order_by(Complaint.created_at.desc()).all()
+    complaints = archive.citizen_complaints(current_user.id)
     return render_template('citizen/complaints.html', complaints=complaints)
 
 
@@ -234,7 +282,7 @@ def view_complaints():
 @role_required('citizen')
 def complaint_detail(complaint_id):
     """View detailed information about a specific complaint"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
 
     if complaint.citizen_id != current_user.id:
         flash('You do not have permission to view this complaint.', 'danger')
@@ -251,7 +299,7 @@ def complaint_detail(complaint_id):
 @role_required('citizen')
 def rate_complaint(complaint_id):
     """Submit a rating and feedback for a resolved/closed complaint"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
 
     if complaint.citizen_id != current_user.id:
         flash('You do not have permission to rate this complaint.', 'danger')
@@ -1,11 +1,13 @@
 """
 Main routes — home redirect and public guest stats page
 """
-from flask import Blueprint, render_template, redirect, flash, url_for, request
+from flask import Blueprint, render_template, redirect, flash, url_for, request, jsonify, abort
 from flask_login import current_user, login_required
 from sqlalchemy import func
 from app import db
-from app.models import Complaint, Department, User
+from app.models import Complaint, Department
+from app.utils import rollups, reference_data, upvotes, public_feed
+from app.utils.replica import replica_reads
 
 bp = Blueprint('main', __name__)
 
@@ -20,6 +22,7 @@ def index():
 
 
 @bp.route('/public')
+@replica_reads
 def public_stats():
     """Public guest page — anonymized complaint statistics (no login required)"""
     total = Complaint.query.filter(Complaint.current_status != 'Draft').count()
@@ -41,7 +44,8 @@ def public_stats():
     resolution_rate = round((resolved / total * 100) if total else 0)
 
     # All departments for the directory section
-    departments = Department.query.order_by(Department.name).all()
+    departments = reference_data.departments(by_name=True)
+    rosters = {dept.id: reference_data.roster(dept.id) for dept in departments}
 
     return render_template('public/stats.html',
                            total=total,
@@ -50,17 +54,26 @@ def public_stats():
                            flagged=flagged,
                            by_dept=by_dept,
                            resolution_rate=resolution_rate,
-                           departments=departments)
+                           departments=departments,
+                           rosters=rosters)
+
+
+@bp.route('/public/api/trends')
+@replica_reads
+def public_trends():
+    """Anonymized monthly/weekly/daily trend series from the daily rollups"""
+    return jsonify(rollups.trend(**rollups.parse_trend_args(request.args)))
 
 
 @bp.route('/public/department/<int:dept_id>')
+@replica_reads
 def department_detail(dept_id):
     """Public department detail — shows description, supervisor, and officers"""
-    dept = Department.query.get_or_404(dept_id)
+    dept = reference_data.department_or_404(dept_id)
 
     # Get supervisor(s) and officers for this department
-    supervisors = User.query.filter_by(department_id=dept.id, role='supervisor').all()
-    officers = User.query.filter_by(department_id=dept.id, role='officer').all()
+    staff = reference_data.roster(dept.id)
+    supervisors, officers = staff['supervisor'], staff['officer']
 
     # Complaint stats for this department (exclude drafts)
     dept_complaints = Complaint.query.filter_by(department_id=dept.id).filter(
@@ -83,36 +96,93 @@ def department_detail(dept_id):
                            active_complaints=active_complaints)
 
 @bp.route('/public/complaints')
+@replica_reads
 def public_complaints():
-    """Feed of all public complaints"""
-    # Exclude drafts and fetch public
-    complaints = Complaint.query.filter_by(is_public=True).filter(Complaint.current_status != 'Draft').order_by(Complaint.created_at.desc()).all()
-    return render_template('public/feed.html', complaints=complaints)
+    """Feed of public complaints: the first page, the rest is loaded from public_complaints_api"""
+    filters = public_feed.parse_filters(request.args)
+    complaints, next_cursor = public_feed.fetch_page(filters)
+    user_id = current_user.id if current_user.is_authenticated else None
+
+    # Infinite scroll asks the API for the next pages with the same filters;
+    # the "older" link is the fallback without JavaScript
+    args = {k: v for k, v in request.args.items() if k != 'cursor'}
+    next_url = url_for('main.public_complaints', cursor=next_cursor, **args) if next_cursor else None
+    return render_template('public/feed.html', complaints=complaints, next_cursor=next_cursor,
+                           next_url=next_url, api_url=url_for('main.public_complaints_api', **args),
+                           upvote_state=upvotes.state(complaints, user_id),
+                           department_names=reference_data.department_names(),
+                           departments=reference_data.departments(by_name=True),
+                           feed_statuses=public_feed.FEED_STATUSES, sorts=public_feed.SORTS,
+                           filters=request.args)
+
+@bp.route('/public/api/complaints')
+@replica_reads
+def public_complaints_api():
+    """
+    JSON page of the public feed; same filters as the feed page plus limit
+    and cursor. next_cursor is null on the last page.
+    """
+    filters = public_feed.parse_filters(request.args)
+    complaints, next_cursor = public_feed.fetch_page(filters)
+    user_id = current_user.id if current_user.is_authenticated else None
+    state = upvotes.state(complaints, user_id)
+    names = reference_data.department_names()
+    return jsonify({
+        'complaints': [_feed_item(complaint, names, *state[complaint.id]) for complaint in complaints],
+        'next_cursor': next_cursor,
+    })
+
+
+def _feed_item(complaint, department_names, upvote_count, upvoted):
+    evidence = None
+    if complaint.evidence_filename:
+        ext = complaint.evidence_filename.rsplit('.', 1)[-1].lower()
+        evidence = {
+            'url': url_for('static', filename='uploads/' + complaint.evidence_filename),
+            'kind': 'image' if ext in ('png', 'jpg', 'jpeg', 'gif') else 'video' if ext == 'mp4' else 'file',
+        }
+    return {
+        'id': complaint.id,
+        'title': complaint.title,
+        'description': complaint.description,
+        'department_id': complaint.department_id,
+        'department': department_names.get(complaint.department_id),
+        'status': complaint.current_status,
+        'created_at': complaint.created_at.isoformat(),
+        'evidence': evidence,
+        'upvotes': upvote_count,
+        'upvoted': upvoted,
+        'upvote_url': url_for('main.upvote_complaint', complaint_id=complaint.id),
+        'upvote_api': url_for('main.upvote_api', complaint_id=complaint.id),
+    }
 
 @bp.route('/public/complaint/<int:complaint_id>/upvote', methods=['POST'])
 @login_required
 def upvote_complaint(complaint_id):
-    """Upvote a public complaint"""
-    complaint = Complaint.query.get_or_404(complaint_id)
-    
-    if not complaint.is_public:
+    """Upvote a public complaint (form fallback for the feed's AJAX upvotes)"""
+    result = upvotes.cast(current_user.id, complaint_id)
+    if result is None:
         flash('Cannot upvote a private complaint.', 'danger')
         return redirect(url_for('main.public_complaints'))
-        
-    from app.models import Upvote
-    existing = Upvote.query.filter_by(user_id=current_user.id, complaint_id=complaint_id).first()
-    
-    if existing:
-        flash('You have already upvoted this complaint.', 'info')
-    else:
-        upvote = Upvote(user_id=current_user.id, complaint_id=complaint_id)
-        db.session.add(upvote)
-        db.session.commit()
+
+    if result[0]:
         flash('Complaint upvoted!', 'success')
-        
+    else:
+        flash('You have already upvoted this complaint.', 'info')
     return redirect(request.referrer or url_for('main.public_complaints'))
 
 
+@bp.route('/public/api/complaint/<int:complaint_id>/upvote', methods=['POST'])
+@login_required
+def upvote_api(complaint_id):
+    """Upvote a public complaint; the upvote is queued and written in the next batch"""
+    result = upvotes.cast(current_user.id, complaint_id)
+    if result is None:
+        abort(403, 'Cannot upvote a private complaint.')
+    created, count = result
+    return jsonify({'upvoted': True, 'created': created, 'upvotes': count})
+
+
 @bp.route('/about')
 def about():
     return render_template('about.html')
@@ -6,6 +6,7 @@ from flask_login import login_required, current_user
 from app import db
 from app.models import Complaint
 from app.utils.decorators import role_required
+from app.utils import archive, duplicates
 
 bp = Blueprint('moderator', __name__, url_prefix='/moderator')
 
@@ -34,11 +35,15 @@ def dashboard():
 @role_required('moderator', 'admin')
 def complaint_detail(complaint_id):
     """Review a complaint before verifying or flagging"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
     history = complaint.status_history.all()
+    candidates = []
+    if complaint.current_status in duplicates.OPEN_STATUSES:
+        candidates = duplicates.candidates_for(complaint)
     return render_template('moderator/complaint_detail.html',
                            complaint=complaint,
-                           history=history)
+                           history=history,
+                           candidates=candidates)
 
 
 @bp.route('/verify/<int:complaint_id>', methods=['POST'])
@@ -90,3 +95,36 @@ def flag(complaint_id):
         db.session.rollback()
 
     return redirect(url_for('moderator.dashboard'))
+
+
+@bp.route('/complaint/<int:complaint_id>/merge', methods=['POST'])
+@login_required
+@role_required('moderator', 'admin')
+def merge(complaint_id):
+    """Close the selected Submitted complaints as duplicates of this one, moving their upvotes"""
+    canonical = Complaint.query.get_or_404(complaint_id)
+    if canonical.current_status not in duplicates.OPEN_STATUSES:
+        flash('Duplicates can only be merged into an open complaint.', 'warning')
+        return redirect(url_for('moderator.complaint_detail', complaint_id=complaint_id))
+
+    ids = {int(i) for i in request.form.getlist('duplicate_ids') if i.isdigit()} - {canonical.id}
+    selected = Complaint.query.filter(Complaint.id.in_(ids)).all() if ids else []
+    mergeable = [c for c in selected
+                 if c.current_status == 'Submitted' and c.department_id == canonical.department_id]
+    if not mergeable:
+        flash('Select at least one Submitted complaint from the same department.', 'warning')
+        return redirect(url_for('moderator.complaint_detail', complaint_id=complaint_id))
+
+    try:
+        moved = duplicates.merge(canonical, mergeable, current_user)
+        db.session.commit()
+        flash(f'Merged {len(mergeable)} duplicate(s) into complaint #{canonical.id}; '
+              f'{moved} upvote(s) moved.', 'success')
+    except ValueError as e:
+        flash(str(e), 'danger')
+        db.session.rollback()
+    if len(mergeable) < len(ids):
+        flash(f'{len(ids) - len(mergeable)} selected complaint(s) were skipped '
+              '(not Submitted or from another department).', 'warning')
+
+    return redirect(url_for('moderator.complaint_detail', complaint_id=complaint_id))
@@ -1,11 +1,15 @@
 """
 Officer routes for viewing and updating complaints through the 9-stage lifecycle
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from datetime import datetime
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort,
+                   current_app)
 from flask_login import login_required, current_user
+from sqlalchemy import select, func
 from app import db
-from app.models import Complaint
+from app.models import Complaint, check_transition
 from app.utils.decorators import role_required
+from app.utils import archive, assignment, reference_data, work_queue
 
 bp = Blueprint('officer', __name__, url_prefix='/officer')
 
@@ -14,32 +18,117 @@ bp = Blueprint('officer', __name__, url_prefix='/officer')
 @login_required
 @role_required('officer')
 def dashboard():
-    """Officer dashboard with department complaints and lifecycle stats"""
+    """Officer dashboard with lifecycle stats and the department's work queue"""
     if not current_user.department_id:
         flash('You are not assigned to any department. Please contact admin.', 'warning')
-        return render_template('officer/dashboard.html', complaints=[],
-                               total=0, submitted=0, under_review=0,
-                               assigned=0, in_progress=0, on_hold=0,
-                               resolved=0, rejected=0, closed=0)
+        return render_template('officer/dashboard.html', queue=[], counts={}, total=0,
+                               scope='next', scopes=work_queue.SCOPES, officer_names={}, now=None)
 
-    complaints = Complaint.query.filter_by(department_id=current_user.department_id)\
-                                .filter(Complaint.current_status != 'Draft')\
-                                .order_by(Complaint.created_at.desc()).all()
-
-    def count(status):
-        return sum(1 for c in complaints if c.current_status == status)
+    counts = dict(db.session.execute(
+        select(Complaint.current_status, func.count(Complaint.id))
+        .where(Complaint.department_id == current_user.department_id, Complaint.current_status != 'Draft')
+        .group_by(Complaint.current_status)
+    ).all())
+    scope = _scope()
+    queue = work_queue.fetch(current_user.department_id, current_user.id, scope)
 
     return render_template('officer/dashboard.html',
-                           complaints=complaints,
-                           total=len(complaints),
-                           submitted=count('Submitted'),
-                           under_review=count('Under Review'),
-                           assigned=count('Assigned'),
-                           in_progress=count('In Progress'),
-                           on_hold=count('On Hold'),
-                           resolved=count('Resolved'),
-                           rejected=count('Rejected'),
-                           closed=count('Closed'))
+                           queue=[(complaint, work_queue.due_at(complaint.priority)) for complaint in queue],
+                           counts=counts,
+                           total=sum(counts.values()),
+                           scope=scope,
+                           scopes=work_queue.SCOPES,
+                           officer_names=_officer_names(),
+                           now=datetime.utcnow())
+
+
+def _scope():
+    scope = request.args.get('scope') or 'next'
+    if scope not in work_queue.SCOPES:
+        abort(400, f'Unknown scope "{scope}".')
+    return scope
+
+
+def _officer_names():
+    roster = reference_data.roster(current_user.department_id)
+    return {officer.id: officer.username for officer in roster['officer']}
+
+
+def _queue_item(complaint, officer_names, now):
+    due = work_queue.due_at(complaint.priority)
+    return {
+        'id': complaint.id,
+        'title': complaint.title,
+        'status': complaint.current_status,
+        'status_since': complaint.updated_at.isoformat(),
+        'upvotes': complaint.upvote_count,
+        'escalated': work_queue.is_escalated(complaint),
+        'priority': complaint.priority,
+        'due_at': due.isoformat(),
+        'overdue': due < now,
+        'assigned_officer_id': complaint.assigned_officer_id,
+        'assigned_officer': officer_names.get(complaint.assigned_officer_id),
+        'url': url_for('officer.complaint_detail', complaint_id=complaint.id),
+        'claim_api': None if complaint.assigned_officer_id else
+                     url_for('officer.claim_api', complaint_id=complaint.id),
+    }
+
+
+@bp.route('/api/queue')
+@login_required
+@role_required('officer')
+def queue_api():
+    """Top of the department's work queue, most urgent first"""
+    if not current_user.department_id:
+        abort(400, 'You are not assigned to any department.')
+    try:
+        limit = max(1, min(int(request.args.get('limit') or current_app.config['WORK_QUEUE_SIZE']),
+                           work_queue.MAX_QUEUE_SIZE))
+    except ValueError:
+        abort(400, 'limit must be an integer.')
+    queue = work_queue.fetch(current_user.department_id, current_user.id, _scope(), limit)
+    officer_names, now = _officer_names(), datetime.utcnow()
+    return jsonify({'complaints': [_queue_item(complaint, officer_names, now) for complaint in queue]})
+
+
+@bp.route('/queue/claim', methods=['POST'])
+@login_required
+@role_required('officer')
+def claim():
+    """Claim the complaint given in the form, or the most urgent unassigned one"""
+    complaint_id = request.form.get('complaint_id', type=int)
+    if complaint_id:
+        complaint = work_queue.claim(complaint_id, current_user)
+    else:
+        complaint = work_queue.claim_next(current_user)
+    if complaint is None:
+        db.session.rollback()
+        flash('This complaint was claimed or closed in the meantime.' if complaint_id
+              else 'There are no unassigned complaints left to claim.', 'info')
+        return redirect(url_for('officer.dashboard'))
+    db.session.commit()
+    flash(f'Complaint #{complaint.id} is now assigned to you.', 'success')
+    return redirect(url_for('officer.complaint_detail', complaint_id=complaint.id))
+
+
+@bp.route('/api/queue/claim', methods=['POST'])
+@bp.route('/api/queue/claim/<int:complaint_id>', methods=['POST'])
+@login_required
+@role_required('officer')
+def claim_api(complaint_id=None):
+    """Claim one complaint, or the most urgent unassigned one; `complaint` is null when none is left"""
+    if complaint_id:
+        complaint = work_queue.claim(complaint_id, current_user)
+        if complaint is None:
+            db.session.rollback()
+            abort(409, 'The complaint is closed or already assigned.')
+    else:
+        complaint = work_queue.claim_next(current_user)
+    if complaint is None:
+        db.session.rollback()
+        return jsonify({'complaint': None})
+    db.session.commit()
+    return jsonify({'complaint': _queue_item(complaint, _officer_names(), datetime.utcnow())})
 
 
 @bp.route('/complaint/<int:complaint_id>')
@@ -47,7 +136,7 @@ def dashboard():
 @role_required('officer')
 def complaint_detail(complaint_id):
     """View complaint details with dynamic status transition options"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
 
     if complaint.department_id != current_user.department_id:
         flash('You do not have permission to view this complaint.', 'danger')
@@ -81,13 +170,27 @@ def update_status(complaint_id):
         return redirect(url_for('officer.complaint_detail', complaint_id=complaint_id))
 
     try:
-        # Auto-assign officer if not already set
-        if not complaint.assigned_officer_id:
-            complaint.assigned_officer_id = current_user.id
-
-        complaint.update_status(new_status, current_user, notes)
-        db.session.commit()
-        flash(f'Status updated to "{new_status}" successfully!', 'success')
+        if new_status == 'Assigned' and not complaint.assigned_officer_id:
+            # Assigning goes to the least-loaded officer, not whoever clicked first
+            check_transition(complaint.current_status, 'Assigned')
+            heap = assignment.workload_heap(complaint.department_id)
+            if not heap:
+                flash('There are no active officers in this department to assign to.', 'warning')
+                return redirect(url_for('officer.complaint_detail', complaint_id=complaint_id))
+            if assignment.assign(complaint, heap, current_user, notes) is None:
+                db.session.rollback()
+                if complaint.assigned_officer_id:
+                    flash('This complaint was assigned by someone else in the meantime.', 'info')
+                else:
+                    flash(f'This complaint is now {complaint.current_status} and can no longer be assigned.',
+                          'danger')
+                return redirect(url_for('officer.complaint_detail', complaint_id=complaint_id))
+            db.session.commit()
+            flash(f'Complaint assigned to {complaint.assigned_officer.username}.', 'success')
+        else:
+            complaint.update_status(new_status, current_user, notes)
+            db.session.commit()
+            flash(f'Status updated to "{new_status}" successfully!', 'success')
     except ValueError as e:
         flash(str(e), 'danger')
         db.session.rollback()
@@ -3,9 +3,11 @@ Supervisor routes — monitor department complaints, escalate stalled issues
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
+from sqlalchemy import select, func
 from app import db
 from app.models import Complaint, User
 from app.utils.decorators import role_required
+from app.utils import archive
 
 bp = Blueprint('supervisor', __name__, url_prefix='/supervisor')
 
@@ -33,12 +35,13 @@ def dashboard():
 
     # Officer workload: how many open complaints each officer has
     officers = User.query.filter_by(department_id=dept_id, role='officer').all()
-    officer_stats = []
-    for officer in officers:
-        open_count = Complaint.query.filter_by(
-            assigned_officer_id=officer.id
-        ).filter(Complaint.current_status.in_(UNRESOLVED)).count()
-        officer_stats.append({'officer': officer, 'open': open_count})
+    loads = dict(db.session.execute(
+        select(Complaint.assigned_officer_id, func.count(Complaint.id))
+        .where(Complaint.assigned_officer_id.in_([officer.id for officer in officers]),
+               Complaint.current_status.in_(UNRESOLVED))
+        .group_by(Complaint.assigned_officer_id)
+    ).all())
+    officer_stats = [{'officer': officer, 'open': loads.get(officer.id, 0)} for officer in officers]
 
     # Chart Data: Complaints by Status for this department
     status_counts = {}
@@ -63,7 +66,7 @@ def dashboard():
 @role_required('supervisor', 'admin')
 def complaint_detail(complaint_id):
     """View complaint details + escalation option"""
-    complaint = Complaint.query.get_or_404(complaint_id)
+    complaint = archive.get_complaint_or_404(complaint_id)
 
     if complaint.department_id != current_user.department_id and current_user.role != 'admin':
         flash('You can only view complaints in your department.', 'danger')
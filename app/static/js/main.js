@@ -122,11 +122,64 @@ function initPopovers() {
     });
 }
 
+// Trend line chart fed by a rollup trends endpoint (/admin/api/trends, /public/api/trends)
+const TREND_SERIES = [
+    ['submitted', 'Submitted', '#6c757d'],
+    ['verified', 'Verified', '#fd7e14'],
+    ['flagged', 'Flagged', '#dc3545'],
+    ['resolved', 'Resolved', '#28a745'],
+    ['closed', 'Closed', '#20c997'],
+    ['escalated', 'Escalated', '#e83e8c'],
+];
+
+function renderTrendChart(canvasId, url, existing) {
+    const canvas = document.getElementById(canvasId);
+    if (!canvas) {
+        return Promise.resolve(null);
+    }
+    return fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(function(response) { return response.json(); })
+        .then(function(trend) {
+            if (existing) {
+                existing.destroy();
+            }
+            const datasets = TREND_SERIES.map(function(series) {
+                return {
+                    label: series[1], data: trend[series[0]], borderColor: series[2],
+                    backgroundColor: series[2], tension: 0.25, yAxisID: 'y'
+                };
+            });
+            datasets.push({
+                label: 'Mean hours in stage', data: trend.mean_time_in_stage_hours,
+                borderColor: '#0d6efd', borderDash: [6, 4], tension: 0.25, yAxisID: 'hours',
+                spanGaps: true
+            });
+            return new Chart(canvas.getContext('2d'), {
+                type: 'line',
+                data: { labels: trend.labels, datasets: datasets },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    interaction: { mode: 'index', intersect: false },
+                    scales: {
+                        y: { beginAtZero: true, title: { display: true, text: 'Complaints' } },
+                        hours: {
+                            beginAtZero: true, position: 'right', grid: { drawOnChartArea: false },
+                            title: { display: true, text: 'Hours' }
+                        }
+                    },
+                    plugins: { legend: { position: 'bottom', labels: { boxWidth: 12 } } }
+                }
+            });
+        });
+}
+
 // Export functions for global use
 window.confirmDelete = confirmDelete;
 window.showLoadingSpinner = showLoadingSpinner;
 window.addCharacterCounter = addCharacterCounter;
 window.formatDates = formatDates;
 window.setupTableSearch = setupTableSearch;
+window.renderTrendChart = renderTrendChart;
 
 console.log('Civic Complaint System - JavaScript loaded successfully');
@@ -0,0 +1,148 @@
+"""
+Archive tier for closed complaints
+
+Closed is terminal, so once a complaint has been Closed for longer than
+ARCHIVE_AFTER_DAYS it is moved, together with its status history, upvotes
+and notifications, into the *_archive tables. Each batch is copied with
+INSERT ... SELECT and deleted from the hot tables in one transaction, so a
+run can be interrupted at any point without losing or duplicating rows.
+
+Read paths use get_complaint_or_404() and the union helpers below to see
+archived complaints transparently.
+"""
+from datetime import datetime, timedelta
+from flask import abort, current_app
+from sqlalchemy import select, insert, delete, literal, union_all
+from app import db
+from app.models import (Complaint, StatusHistory, Upvote, Notification, ArchivedComplaint,
+                        ArchivedStatusHistory, ArchivedUpvote, ArchivedNotification,
+                        ComplaintSignature, DuplicateBucket)
+from app.utils import identity_cache
+
+# (live model, archive model, column linking rows to their complaint)
+ARCHIVED_PAGE_SIZE = 50
+
+TIERS = [
+    (Complaint, ArchivedComplaint, 'id'),
+    (StatusHistory, ArchivedStatusHistory, 'complaint_id'),
+    (Upvote, ArchivedUpvote, 'complaint_id'),
+    (Notification, ArchivedNotification, 'complaint_id'),
+]
+
+
+def _copy_statement(live, archived, key, ids, archived_at):
+    """INSERT INTO <archive> (...) SELECT ... FROM <live> WHERE <key> IN ids"""
+    live_table, archive_table = live.__table__, archived.__table__
+    names = [c.name for c in archive_table.columns if c.name in live_table.c]
+    columns = [live_table.c[name] for name in names]
+    if 'archived_at' in archive_table.c:
+        names.append('archived_at')
+        columns.append(literal(archived_at))
+    source = select(*columns).where(live_table.c[key].in_(ids))
+    return insert(archive_table).from_select(names, source)
+
+
+def archive_batch(cutoff, batch_size):
+    """Move one batch of complaints Closed before `cutoff`; returns the number moved"""
+    ids = db.session.execute(
+        select(Complaint.id)
+        .where(Complaint.current_status == 'Closed', Complaint.updated_at < cutoff)
+        .order_by(Complaint.updated_at, Complaint.id)
+        .limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    archived_at = datetime.utcnow()
+    try:
+        # Parents first on the way in, children first on the way out
+        for live, archived, key in TIERS:
+            db.session.execute(_copy_statement(live, archived, key, ids, archived_at))
+        # Closed complaints are never duplicate candidates; drop their index rows
+        for index in (DuplicateBucket, ComplaintSignature):
+            db.session.execute(delete(index).where(index.complaint_id.in_(ids)))
+        for live, archived, key in reversed(TIERS):
+            db.session.execute(delete(live.__table__).where(live.__table__.c[key].in_(ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(ids)
+
+
+def archive_closed_complaints(older_than_days=None, batch_size=None, max_batches=None):
+    """Archive Closed complaints in bounded batches; returns the total moved"""
+    if older_than_days is None:
+        older_than_days = current_app.config['ARCHIVE_AFTER_DAYS']
+    if batch_size is None:
+        batch_size = current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    if total:
+        # Core deletes bypass the ORM events that keep unread counts fresh
+        identity_cache.invalidate()
+    return total
+
+
+# ── Read-side fallbacks ──────────────────────────────────────────────────
+
+def get_complaint_or_404(complaint_id):
+    """Live complaint if present, otherwise its archived copy, otherwise 404"""
+    complaint = db.session.get(Complaint, complaint_id)
+    if complaint is None:
+        complaint = db.session.get(ArchivedComplaint, complaint_id)
+    if complaint is None:
+        abort(404)
+    return complaint
+
+
+def citizen_complaints(citizen_id):
+    """All of a citizen's complaints, live and archived, newest first"""
+    live = Complaint.query.filter_by(citizen_id=citizen_id).all()
+    archived = ArchivedComplaint.query.filter_by(citizen_id=citizen_id).all()
+    return sorted(live + archived, key=lambda c: c.created_at, reverse=True)
+
+
+def count_archived(**criteria):
+    return ArchivedComplaint.query.filter_by(**criteria).count()
+
+
+def archived_page(before_id=None, limit=ARCHIVED_PAGE_SIZE):
+    """
+    Archived complaints newest first (by id, so the primary key drives it),
+    keyset-paginated: returns (rows, before_id of the next page or None)
+    """
+    query = ArchivedComplaint.query
+    if before_id:
+        query = query.filter(ArchivedComplaint.id < before_id)
+    rows = query.order_by(ArchivedComplaint.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+
+def complaints_union():
+    """Selectable over complaints + complaints_archive with the shared columns"""
+    live, archived = Complaint.__table__, ArchivedComplaint.__table__
+    names = [c.name for c in live.columns if c.name in archived.c]
+    return union_all(
+        select(*[live.c[n] for n in names]),
+        select(*[archived.c[n] for n in names]),
+    ).subquery('all_complaints')
+
+
+def status_history_union():
+    """Selectable over status_history + status_history_archive"""
+    live, archived = StatusHistory.__table__, ArchivedStatusHistory.__table__
+    names = [c.name for c in live.columns]
+    return union_all(
+        select(*[live.c[n] for n in names]),
+        select(*[archived.c[n] for n in names]),
+    ).subquery('all_status_history')
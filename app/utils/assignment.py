@@ -0,0 +1,211 @@
+"""
+Load-balanced officer assignment
+
+Each department's active officers are kept in a min-heap keyed on their
+workload (open complaints assigned to them), built from one grouped query
+over the (assigned_officer_id, current_status) index. Under Review complaints
+are handed to the least-loaded officer in batches by `flask assign-complaints`,
+and the heap is updated as each assignment is made.
+
+Claims are made with a conditional UPDATE (only while the complaint is still
+unassigned and in the status the Assigned transition starts from: Under
+Review, or Escalated after its officer left), so two workers or officers can
+never assign the same complaint twice.
+"""
+import heapq
+from flask import current_app
+from sqlalchemy import select, update, func, and_
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models import Complaint, Notification, StatusHistory, User, can_transition, system_actor
+
+# Statuses that count towards an officer's workload
+OPEN_STATUSES = ('Assigned', 'In Progress', 'On Hold', 'Escalated')
+
+
+def workloads(department_id, exclude=()):
+    """{officer_id: open complaint count} for the department's active officers"""
+    stmt = select(User.id, func.count(Complaint.id))\
+        .outerjoin(Complaint, and_(Complaint.assigned_officer_id == User.id,
+                                   Complaint.current_status.in_(OPEN_STATUSES)))\
+        .where(User.role == 'officer', User.is_active.is_(True),
+               User.department_id == department_id)\
+        .group_by(User.id)
+    if exclude:
+        stmt = stmt.where(User.id.notin_(exclude))
+    return dict(db.session.execute(stmt).all())
+
+
+def workload_heap(department_id, exclude=()):
+    heap = [(load, officer_id) for officer_id, load in workloads(department_id, exclude).items()]
+    heapq.heapify(heap)
+    return heap
+
+
+def _claim(complaint, officer_id):
+    """Atomically take an unassigned complaint, still in its loaded status, for `officer_id`"""
+    if not can_transition(complaint.current_status, 'Assigned'):
+        return False
+    claimed = db.session.execute(
+        update(Complaint)
+        .where(Complaint.id == complaint.id, Complaint.current_status == complaint.current_status,
+               Complaint.assigned_officer_id.is_(None))
+        .values(assigned_officer_id=officer_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed:
+        set_committed_value(complaint, 'assigned_officer_id', officer_id)
+    return bool(claimed)
+
+
+def assign(complaint, heap, actor, notes=''):
+    """Give one complaint to the least-loaded officer in `heap`; returns the officer id or None"""
+    if not heap:
+        return None
+    load, officer_id = heapq.heappop(heap)
+    if not _claim(complaint, officer_id):
+        heapq.heappush(heap, (load, officer_id))
+        db.session.refresh(complaint)
+        return None
+    complaint.update_status('Assigned', actor,
+                            notes or 'Assigned automatically to the least-loaded officer.')
+    heapq.heappush(heap, (load + 1, officer_id))
+    return officer_id
+
+
+def assign_pending(department_id=None, batch_size=None, max_batches=None):
+    """Assign Under Review complaints in batches; returns the number assigned"""
+    if batch_size is None:
+        batch_size = current_app.config['ASSIGNMENT_BATCH_SIZE']
+    actor = system_actor()
+    staffed = select(User.department_id).where(User.role == 'officer', User.is_active.is_(True))
+
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        query = Complaint.query.filter(Complaint.current_status == 'Under Review',
+                                       Complaint.assigned_officer_id.is_(None),
+                                       Complaint.department_id.in_(staffed))
+        if department_id:
+            query = query.filter(Complaint.department_id == department_id)
+        pending = query.order_by(Complaint.updated_at, Complaint.id).limit(batch_size).all()
+        if not pending:
+            break
+
+        heaps = {}
+        for complaint in pending:
+            if complaint.department_id not in heaps:
+                heaps[complaint.department_id] = workload_heap(complaint.department_id)
+            if assign(complaint, heaps[complaint.department_id], actor):
+                total += 1
+        db.session.commit()
+        batches += 1
+        if len(pending) < batch_size:
+            break
+    return total
+
+
+# ── Rebalancing when the officer roster changes ─────────────────────────
+
+def _usernames(officer_ids):
+    return dict(db.session.execute(select(User.id, User.username).where(User.id.in_(list(officer_ids)))).all())
+
+
+def _reassign(complaint, officer_id, officer_name, actor, reason):
+    """
+    Hand a complaint to another officer (or nobody). updated_at is kept: the
+    SLA clock and work-queue priority run from the last status change. The
+    move is recorded in the history as a same-status entry.
+    """
+    db.session.execute(
+        update(Complaint).where(Complaint.id == complaint.id)
+        .values(assigned_officer_id=officer_id, updated_at=Complaint.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    set_committed_value(complaint, 'assigned_officer_id', officer_id)
+    db.session.add(StatusHistory(
+        complaint_id=complaint.id,
+        previous_status=complaint.current_status,
+        new_status=complaint.current_status,
+        changed_by_user_id=actor.id,
+        notes=f'Reassigned to {officer_name} ({reason}).' if officer_id else f'Unassigned ({reason}).',
+    ))
+    if officer_id:
+        db.session.add(Notification(
+            user_id=officer_id,
+            complaint_id=complaint.id,
+            message=f'Complaint #{complaint.id} has been assigned to you ({reason}).'[:255],
+            link=f'/officer/complaint/{complaint.id}',
+        ))
+
+
+def rebalance(department_id, actor=None):
+    """
+    Even out workloads after an officer joins: move not-yet-started (Assigned)
+    complaints from the busiest officers to the least busy until loads differ
+    by at most one. `actor` (default system_actor()) is recorded in the
+    history. Returns the number moved; the caller commits.
+    """
+    loads = workloads(department_id)
+    if len(loads) < 2:
+        return 0
+    actor = actor or system_actor()
+    names = _usernames(loads)
+    movable = {officer_id: [] for officer_id in loads}
+    for complaint in Complaint.query.filter(Complaint.department_id == department_id,
+                                            Complaint.current_status == 'Assigned',
+                                            Complaint.assigned_officer_id.in_(loads))\
+                                    .order_by(Complaint.updated_at.desc()):
+        movable[complaint.assigned_officer_id].append(complaint)
+
+    lightest = [(load, officer_id) for officer_id, load in loads.items()]
+    heapq.heapify(lightest)
+    heaviest = [(-load, officer_id) for officer_id, load in loads.items()]
+    heapq.heapify(heaviest)
+
+    moved = 0
+    while heaviest:
+        neg_load, busy_id = heapq.heappop(heaviest)
+        if -neg_load != loads[busy_id]:
+            continue                          # stale entry
+        while lightest[0][0] != loads[lightest[0][1]]:
+            heapq.heappop(lightest)           # stale entry
+        idle_load, idle_id = lightest[0]
+        if loads[busy_id] - idle_load <= 1:
+            break
+        if not movable[busy_id]:
+            continue                          # everything this officer holds is under way
+        _reassign(movable[busy_id].pop(0), idle_id, names[idle_id], actor, 'workload rebalanced')
+        loads[busy_id] -= 1
+        loads[idle_id] += 1
+        heapq.heapreplace(lightest, (loads[idle_id], idle_id))
+        heapq.heappush(lightest, (loads[busy_id], busy_id))
+        heapq.heappush(heaviest, (-loads[busy_id], busy_id))
+        heapq.heappush(heaviest, (-loads[idle_id], idle_id))
+        moved += 1
+    return moved
+
+
+def release_officer(officer, actor=None):
+    """
+    Hand an outgoing officer's open complaints to the remaining officers of
+    the department, least-loaded first. Complaints are left unassigned when
+    nobody is left. `actor` (default system_actor()) is recorded in the
+    history. Returns the number released; the caller commits.
+    """
+    open_complaints = Complaint.query.filter(Complaint.assigned_officer_id == officer.id,
+                                             Complaint.current_status.in_(OPEN_STATUSES))\
+                                     .order_by(Complaint.updated_at).all()
+    if not open_complaints:
+        return 0
+    actor = actor or system_actor()
+    heap = workload_heap(officer.department_id, exclude=(officer.id,)) if officer.department_id else []
+    names = _usernames(officer_id for _, officer_id in heap)
+    reason = f'{officer.username} was removed'
+    for complaint in open_complaints:
+        if heap:
+            load, officer_id = heapq.heappop(heap)
+            _reassign(complaint, officer_id, names[officer_id], actor, reason)
+            heapq.heappush(heap, (load + 1, officer_id))
+        else:
+            _reassign(complaint, None, None, actor, reason)
+    return len(open_complaints)
@@ -0,0 +1,124 @@
+"""
+Keyset-paginated audit trail over status_history
+
+Pages are ordered newest first on (changed_at, id) and continue from an
+opaque cursor instead of an OFFSET, so page 10,000 costs the same as page 1.
+Every filter combination is served by one of the composite indexes declared
+on StatusHistory (and mirrored on the archive table, which is merged in).
+"""
+import base64
+from datetime import datetime, timedelta
+from flask import abort
+from sqlalchemy import select, and_, or_
+from app import db
+from app.models import (Complaint, Department, StatusHistory, User, VALID_STATUSES,
+                        ArchivedComplaint, ArchivedStatusHistory)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(changed_at, history_id):
+    raw = f'{changed_at.isoformat()}|{history_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        stamp, history_id = raw.split('|')
+        return datetime.fromisoformat(stamp), int(history_id)
+    except (ValueError, UnicodeDecodeError):
+        abort(400, 'Invalid cursor.')
+
+
+def parse_filters(args):
+    """
+    Read audit filters from query args:
+    actor (username), department_id, from_status, to_status,
+    start / end (YYYY-MM-DD, inclusive), limit, cursor
+    """
+    filters = {
+        'actor': args.get('actor', '').strip(),
+        'department_id': None, 'from_status': None, 'to_status': None,
+        'start': None, 'end': None, 'cursor': None,
+        'limit': DEFAULT_PAGE_SIZE,
+    }
+    try:
+        if args.get('department_id'):
+            filters['department_id'] = int(args['department_id'])
+        if args.get('start'):
+            filters['start'] = datetime.strptime(args['start'], '%Y-%m-%d')
+        if args.get('end'):
+            filters['end'] = datetime.strptime(args['end'], '%Y-%m-%d') + timedelta(days=1)
+        if args.get('limit'):
+            filters['limit'] = max(1, min(int(args['limit']), MAX_PAGE_SIZE))
+    except ValueError:
+        abort(400, 'Dates must be YYYY-MM-DD; department_id and limit must be integers.')
+    for key in ('from_status', 'to_status'):
+        value = args.get(key)
+        if value:
+            if value not in VALID_STATUSES:
+                abort(400, f'Unknown status "{value}".')
+            filters[key] = value
+    if args.get('cursor'):
+        filters['cursor'] = decode_cursor(args['cursor'])
+    return filters
+
+
+def _page_select(history, complaint, filters, actor_id):
+    stmt = select(
+        history.id, history.changed_at, history.complaint_id,
+        history.previous_status, history.new_status, history.notes,
+        User.id.label('actor_id'), User.username.label('actor'), User.role.label('actor_role'),
+        complaint.title.label('complaint_title'),
+        Department.id.label('department_id'), Department.name.label('department'),
+    ).join(User, history.changed_by_user_id == User.id)\
+     .join(complaint, history.complaint_id == complaint.id)\
+     .join(Department, complaint.department_id == Department.id)
+
+    if actor_id is not None:
+        stmt = stmt.where(history.changed_by_user_id == actor_id)
+    if filters['department_id']:
+        stmt = stmt.where(complaint.department_id == filters['department_id'])
+    if filters['from_status']:
+        stmt = stmt.where(history.previous_status == filters['from_status'])
+    if filters['to_status']:
+        stmt = stmt.where(history.new_status == filters['to_status'])
+    if filters['start']:
+        stmt = stmt.where(history.changed_at >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(history.changed_at < filters['end'])
+    if filters['cursor']:
+        # Expanded row-value comparison; every engine can drive this from an index
+        changed_at, history_id = filters['cursor']
+        stmt = stmt.where(or_(
+            history.changed_at < changed_at,
+            and_(history.changed_at == changed_at, history.id < history_id),
+        ))
+    return stmt.order_by(history.changed_at.desc(), history.id.desc()).limit(filters['limit'] + 1)
+
+
+def fetch_page(filters):
+    """Return (rows, next_cursor); next_cursor is None on the last page"""
+    actor_id = None
+    if filters['actor']:
+        actor_id = db.session.execute(
+            select(User.id).where(User.username == filters['actor'])).scalar()
+        if actor_id is None:
+            return [], None
+
+    # Each tier returns at most limit + 1 rows from its own index; archived
+    # rows keep their original ids, so merging on (changed_at, id) is exact.
+    rows = []
+    for history, complaint in ((StatusHistory, Complaint),
+                               (ArchivedStatusHistory, ArchivedComplaint)):
+        rows.extend(db.session.execute(_page_select(history, complaint, filters, actor_id)).all())
+    rows.sort(key=lambda r: (r.changed_at, r.id), reverse=True)
+
+    limit = filters['limit']
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].changed_at, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,201 @@
+"""
+Near-duplicate complaint detection with MinHash / LSH
+
+Each submitted complaint gets a MinHash signature of its title and
+description shingles (word unigrams and bigrams), split into LSH bands. A
+band's bucket key also encodes the department, so looking up a new text is a
+primary-key probe of BANDS buckets in duplicate_buckets, never a scan.
+Candidates sharing a bucket are then ranked by estimated Jaccard similarity
+and filtered by distance when both complaints have coordinates.
+
+With 16 bands of 2 rows, texts with ~25% shingle overlap have an even chance
+of meeting in some bucket and ~50% overlap is found almost always.
+"""
+import hashlib
+import math
+import random
+import re
+import struct
+from flask import current_app
+from sqlalchemy import select, delete, func
+from app import db
+from app.models import Complaint, ComplaintSignature, DuplicateBucket, Upvote
+from app.utils import trending, upvotes
+
+NUM_PERM = 32
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260101)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE_FORMAT = f'<{NUM_PERM}I'
+
+# Statuses a new report can still be a duplicate of
+OPEN_STATUSES = ('Submitted', 'Under Review', 'Assigned', 'In Progress', 'On Hold', 'Escalated')
+
+STOPWORDS = frozenset('''
+a an and are as at be been but by for from has have in is it its near of on or our
+the their there this to was were with please very not no
+'''.split())
+
+
+# ── Signatures ───────────────────────────────────────────────────────────
+
+def shingles(title, description):
+    tokens = [t for t in re.findall(r'[a-z0-9]+', f'{title} {description}'.lower())
+              if t not in STOPWORDS]
+    return set(tokens) | {f'{a} {b}' for a, b in zip(tokens, tokens[1:])}
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'little')
+
+
+def signature(title, description):
+    """MinHash signature (tuple of NUM_PERM ints), or None for text with no shingles"""
+    hashes = [_hash64(s) for s in shingles(title, description)]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def bucket_keys(sig, department_id):
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(f'{department_id}:{band}:{rows}'.encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+# ── Index maintenance ────────────────────────────────────────────────────
+
+def unindex(complaint_ids):
+    db.session.execute(delete(DuplicateBucket).where(DuplicateBucket.complaint_id.in_(complaint_ids)))
+    db.session.execute(delete(ComplaintSignature).where(ComplaintSignature.complaint_id.in_(complaint_ids)))
+
+
+def index_complaint(complaint, replace=True):
+    """(Re)index one flushed complaint; the caller commits. replace=False skips
+    clearing old rows, for complaints that were never indexed."""
+    if replace:
+        unindex([complaint.id])
+    sig = signature(complaint.title, complaint.description)
+    if sig is None:
+        return
+    db.session.add(ComplaintSignature(complaint_id=complaint.id, signature=struct.pack(_SIGNATURE_FORMAT, *sig)))
+    db.session.add_all(DuplicateBucket(bucket=key, complaint_id=complaint.id)
+                       for key in set(bucket_keys(sig, complaint.department_id)))
+
+
+def build_index(batch_size=1000):
+    """Index every open complaint that has no signature yet; returns the number indexed"""
+    total = 0
+    while True:
+        missing = Complaint.query.outerjoin(ComplaintSignature)\
+            .filter(ComplaintSignature.complaint_id.is_(None),
+                    Complaint.current_status.in_(OPEN_STATUSES))\
+            .order_by(Complaint.id).limit(batch_size).all()
+        if not missing:
+            return total
+        for complaint in missing:
+            index_complaint(complaint)
+        db.session.commit()
+        total += len(missing)
+        # Complaints without shingles never get a signature; don't loop on them
+        if all(signature(c.title, c.description) is None for c in missing):
+            return total
+
+
+# ── Lookup ───────────────────────────────────────────────────────────────
+
+def find_candidates(title, description, department_id, latitude=None, longitude=None,
+                    exclude_id=None, limit=None):
+    """[(complaint, similarity, distance_m or None)] best first, open complaints only"""
+    config = current_app.config
+    limit = limit or config['DUPLICATE_MAX_CANDIDATES']
+    sig = signature(title, description)
+    if sig is None or not department_id:
+        return []
+
+    hits = select(DuplicateBucket.complaint_id, func.count().label('hits'))\
+        .where(DuplicateBucket.bucket.in_(bucket_keys(sig, department_id)))\
+        .group_by(DuplicateBucket.complaint_id)\
+        .order_by(func.count().desc()).limit(limit * 10)
+    ids = [row.complaint_id for row in db.session.execute(hits) if row.complaint_id != exclude_id]
+    if not ids:
+        return []
+
+    rows = db.session.execute(
+        select(Complaint, ComplaintSignature.signature)
+        .join(ComplaintSignature, ComplaintSignature.complaint_id == Complaint.id)
+        .where(Complaint.id.in_(ids), Complaint.current_status.in_(OPEN_STATUSES))
+    ).all()
+
+    candidates = []
+    for complaint, packed in rows:
+        score = similarity(sig, struct.unpack(_SIGNATURE_FORMAT, packed))
+        if score < config['DUPLICATE_MIN_SIMILARITY']:
+            continue
+        distance = None
+        if None not in (latitude, longitude, complaint.latitude, complaint.longitude):
+            distance = distance_m(latitude, longitude, complaint.latitude, complaint.longitude)
+            if distance > config['DUPLICATE_RADIUS_METERS']:
+                continue
+        candidates.append((complaint, score, distance))
+    candidates.sort(key=lambda c: (-c[1], c[2] if c[2] is not None else float('inf')))
+    return candidates[:limit]
+
+
+def candidates_for(complaint, limit=None):
+    return find_candidates(complaint.title, complaint.description, complaint.department_id,
+                           complaint.latitude, complaint.longitude, exclude_id=complaint.id, limit=limit)
+
+
+# ── Merging ──────────────────────────────────────────────────────────────
+
+def merge(canonical, duplicates, moderator):
+    """
+    Close `duplicates` (Submitted complaints) as duplicates of `canonical`,
+    moving their upvotes, plus the duplicate reporter's own support, onto
+    it. Returns the number of upvotes moved; the caller commits.
+    """
+    supporters = {user_id for (user_id,) in
+                  db.session.execute(select(Upvote.user_id).where(Upvote.complaint_id == canonical.id))}
+    supporters.add(canonical.citizen_id)
+    moved = 0
+    for duplicate in duplicates:
+        for upvote in duplicate.upvotes.all():
+            if upvote.user_id in supporters:
+                db.session.delete(upvote)
+            else:
+                upvote.complaint_id = canonical.id
+                supporters.add(upvote.user_id)
+                moved += 1
+        if duplicate.citizen_id not in supporters:
+            db.session.add(Upvote(user_id=duplicate.citizen_id, complaint_id=canonical.id))
+            supporters.add(duplicate.citizen_id)
+            moved += 1
+
+        note = f'Duplicate of complaint #{canonical.id}.'
+        duplicate.duplicate_of_id = canonical.id
+        duplicate.flag_reason = note
+        duplicate.update_status('Flagged', moderator, f'Flagged: {note}')
+        duplicate.update_status('Closed', moderator, f'Merged into complaint #{canonical.id}.')
+    unindex([d.id for d in duplicates])
+    upvotes.recount([canonical.id] + [d.id for d in duplicates])
+    trending.rescore([canonical.id] + [d.id for d in duplicates])
+    return moved
@@ -0,0 +1,203 @@
+"""
+Streaming CSV / NDJSON exports of complaints, department stats and status history
+
+Rows are fetched in chunks through a server-side cursor (yield_per) and
+written to the response as they arrive, so an export of a million rows uses
+constant memory and starts sending bytes immediately. Optional gzip is
+applied incrementally on the same stream.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from flask import Response, abort, stream_with_context
+from sqlalchemy import select, func, case
+from app import db
+from app.models import (Complaint, Department, StatusHistory, User, VALID_STATUSES,
+                        ArchivedComplaint, ArchivedStatusHistory)
+from app.utils import archive
+
+EXPORT_CHUNK_ROWS = 1000
+FORMATS = {
+    'csv':    ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def parse_filters(args):
+    """Read ?start=YYYY-MM-DD&end=YYYY-MM-DD&department_id=&status= (all optional)"""
+    filters = {'start': None, 'end': None, 'department_id': None, 'status': None}
+    try:
+        if args.get('start'):
+            filters['start'] = datetime.strptime(args['start'], '%Y-%m-%d')
+        if args.get('end'):
+            # inclusive: everything before the following midnight
+            filters['end'] = datetime.strptime(args['end'], '%Y-%m-%d') + timedelta(days=1)
+        if args.get('department_id'):
+            filters['department_id'] = int(args['department_id'])
+    except ValueError:
+        abort(400, 'Dates must be YYYY-MM-DD and department_id an integer.')
+    status = args.get('status')
+    if status:
+        if status not in VALID_STATUSES:
+            abort(400, f'Unknown status "{status}".')
+        filters['status'] = status
+    return filters
+
+
+# ── Queries (Core selects: no ORM identity map growing with the export) ──
+# Complaints and history are exported from the live tables followed by the
+# archive tier (see app/utils/archive.py); each tier streams in id order.
+
+def _complaints_select(model, filters):
+    stmt = select(
+        model.id, model.title, model.description,
+        Department.name.label('department'), model.current_status,
+        model.citizen_id, model.assigned_officer_id, model.is_public,
+        model.latitude, model.longitude, model.rating,
+        model.flag_reason, model.escalation_notes,
+        model.created_at, model.updated_at,
+    ).join(Department, model.department_id == Department.id)\
+     .where(model.current_status != 'Draft')
+    if filters['start']:
+        stmt = stmt.where(model.created_at >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(model.created_at < filters['end'])
+    if filters['department_id']:
+        stmt = stmt.where(model.department_id == filters['department_id'])
+    if filters['status']:
+        stmt = stmt.where(model.current_status == filters['status'])
+    return stmt.order_by(model.id)
+
+
+def complaints_query(filters):
+    return [_complaints_select(Complaint, filters), _complaints_select(ArchivedComplaint, filters)]
+
+
+def department_stats_query(filters):
+    complaints = archive.complaints_union()
+    counts = [
+        func.sum(case((complaints.c.current_status == s, 1), else_=0)).label(s.lower().replace(' ', '_'))
+        for s in VALID_STATUSES if s != 'Draft'
+    ]
+    stmt = select(
+        Department.id.label('department_id'), Department.name.label('department'),
+        func.count(complaints.c.id).label('total'), *counts,
+        func.avg(complaints.c.rating).label('avg_rating'),
+    ).join(complaints, complaints.c.department_id == Department.id)\
+     .where(complaints.c.current_status != 'Draft')
+    if filters['start']:
+        stmt = stmt.where(complaints.c.created_at >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(complaints.c.created_at < filters['end'])
+    if filters['department_id']:
+        stmt = stmt.where(Department.id == filters['department_id'])
+    if filters['status']:
+        stmt = stmt.where(complaints.c.current_status == filters['status'])
+    return [stmt.group_by(Department.id, Department.name).order_by(Department.name)]
+
+
+def _status_history_select(history, complaint, filters):
+    stmt = select(
+        history.id, history.complaint_id,
+        Department.name.label('department'),
+        history.previous_status, history.new_status,
+        User.username.label('changed_by'), User.role.label('changed_by_role'),
+        history.notes, history.changed_at,
+    ).join(complaint, history.complaint_id == complaint.id)\
+     .join(Department, complaint.department_id == Department.id)\
+     .join(User, history.changed_by_user_id == User.id)
+    if filters['start']:
+        stmt = stmt.where(history.changed_at >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(history.changed_at < filters['end'])
+    if filters['department_id']:
+        stmt = stmt.where(complaint.department_id == filters['department_id'])
+    if filters['status']:
+        stmt = stmt.where(history.new_status == filters['status'])
+    return stmt.order_by(history.id)
+
+
+def status_history_query(filters):
+    return [_status_history_select(StatusHistory, Complaint, filters),
+            _status_history_select(ArchivedStatusHistory, ArchivedComplaint, filters)]
+
+
+EXPORTS = {
+    'complaints':     complaints_query,
+    'departments':    department_stats_query,
+    'status_history': status_history_query,
+}
+
+
+# ── Streaming ────────────────────────────────────────────────────────────
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def _encode_rows(statements, fmt):
+    """Yield encoded text chunks of ~EXPORT_CHUNK_ROWS rows each, statement by statement"""
+    buffer = io.StringIO()
+    write = None
+
+    for stmt in statements:
+        result = db.session.execute(stmt, execution_options={'yield_per': EXPORT_CHUNK_ROWS})
+        try:
+            if write is None:
+                columns = list(result.keys())
+                if fmt == 'csv':
+                    writer = csv.writer(buffer)
+                    writer.writerow(columns)
+                    write = lambda row: writer.writerow([_serialize(v) for v in row])
+                else:
+                    write = lambda row: buffer.write(json.dumps(
+                        {k: _serialize(v) for k, v in zip(columns, row)}, default=str) + '\n')
+
+                # Header goes out before the first chunk is fetched
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+
+            for partition in result.partitions():
+                for row in partition:
+                    write(row)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            result.close()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, fmt, filters, compress=False):
+    """Build a streaming Response for one dataset, format and filter set"""
+    if dataset not in EXPORTS or fmt not in FORMATS:
+        abort(404)
+    statements = EXPORTS[dataset](filters)
+    mimetype, extension = FORMATS[fmt]
+
+    def generate():
+        chunks = _encode_rows(statements, fmt)
+        yield from (_gzip(chunks) if compress else chunks)
+
+    filename = f"{dataset}_{datetime.utcnow():%Y%m%d_%H%M%S}.{extension}"
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',   # let nginx pass chunks straight through
+        'Cache-Control': 'no-store',
+    })
@@ -0,0 +1,193 @@
+"""
+Short-TTL identity cache for Flask-Login
+
+load_user runs on every authenticated request. Instead of loading the full
+User row (and then lazily its department and notifications from templates),
+we keep a small snapshot of the fields needed for authorization and
+navigation per user id, and serve current_user from it.
+
+Entries are dropped after IDENTITY_CACHE_TTL seconds, and immediately (in
+this process) once a transaction that touched the user, their department or
+their notifications commits. Changes that matter for authorization (a role,
+active flag or department change, a deleted user or department) also bump
+the "identities" version stamp (see app/utils/reference_data.py), so every
+gunicorn worker drops its snapshots on its next request. Unread counts in
+other workers catch up when their entry expires.
+"""
+import threading
+import time
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.utils import reference_data, replica
+
+STAMP = 'identities'
+_AUTH_FIELDS = ('role', 'is_active', 'department_id')
+
+_cache = {}          # user_id -> (stamp, expires_at, snapshot)
+_lock = threading.Lock()
+
+
+def load_identity(user_id):
+    """Return a CachedUser for user_id, or None if the user does not exist"""
+    from app.models import User
+
+    ttl = current_app.config.get('IDENTITY_CACHE_TTL', 0)
+    if ttl <= 0:
+        return db.session.get(User, user_id)
+
+    stamp = reference_data.current_stamp(STAMP)
+    entry = _cache.get(user_id)
+    now = time.monotonic()
+    if entry is not None and entry[0] == stamp and entry[1] > now:
+        return CachedUser(entry[2])
+
+    with replica.primary_reads():
+        snapshot = _build_snapshot(user_id)
+    if snapshot is None:
+        invalidate(user_id)
+        return None
+
+    with _lock:
+        if len(_cache) >= current_app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000):
+            _purge_expired(now)
+        _cache[user_id] = (stamp, now + ttl, snapshot)
+    return CachedUser(snapshot)
+
+
+def invalidate(user_id=None):
+    """Forget one user's snapshot, or every snapshot when user_id is None"""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
+
+
+def _purge_expired(now):
+    for key in [k for k, (_, expires_at, _) in _cache.items() if expires_at <= now]:
+        del _cache[key]
+    if len(_cache) >= current_app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000):
+        _cache.clear()
+
+
+def _build_snapshot(user_id):
+    """Fetch every cached field in a single query"""
+    from app.models import User, Department, Notification
+
+    unread = select(func.count(Notification.id)).where(
+        Notification.user_id == User.id,
+        Notification.is_read.is_(False)
+    ).scalar_subquery()
+
+    row = db.session.query(
+        User.id, User.username, User.role, User.department_id, User.is_active,
+        Department.name, unread
+    ).outerjoin(Department, User.department_id == Department.id)\
+     .filter(User.id == user_id).first()
+
+    if row is None:
+        return None
+    return {
+        'id': row[0],
+        'username': row[1],
+        'role': row[2],
+        'department_id': row[3],
+        'is_active': row[4],
+        'department_name': row[5],
+        'unread_count': row[6],
+    }
+
+
+class CachedUser(UserMixin):
+    """
+    Stand-in for User served from the identity cache.
+    Snapshot fields are answered without touching the database; any other
+    attribute (relationships, profile fields, writes) loads the real User
+    row once and delegates to it.
+    """
+
+    def __init__(self, snapshot):
+        object.__setattr__(self, '_snapshot', snapshot)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def is_active(self):
+        return self._snapshot['is_active']
+
+    def _load(self):
+        if self._user is None:
+            from app.models import User
+            object.__setattr__(self, '_user', db.session.get(User, self._snapshot['id']))
+        return self._user
+
+    def __getattr__(self, name):
+        snapshot = object.__getattribute__(self, '_snapshot')
+        if name in snapshot:
+            return snapshot[name]
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    # These User methods only read snapshot fields, so call them unbound
+    # rather than loading the row.
+    def is_staff(self):
+        from app.models import User
+        return User.is_staff(self)
+
+    def get_dashboard_url(self):
+        from app.models import User
+        return User.get_dashboard_url(self)
+
+    def get_unread_notifications(self):
+        from app.models import User
+        return User.get_unread_notifications(self)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username} ({self.role})>'
+
+
+# ── Invalidation ─────────────────────────────────────────────────────────
+# Collect affected user ids at flush time, but only drop them once the
+# transaction commits, so a concurrent request can't re-cache stale rows.
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidations(session, flush_context):
+    from app.models import User, Department, Notification
+
+    pending = session.info.setdefault('identity_invalidations', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            pending.add(obj.id)
+            state = inspect(obj)
+            if state.deleted or obj not in session.new and any(state.attrs[name].history.has_changes() for name in _AUTH_FIELDS):
+                session.info['identity_bump'] = True
+        elif isinstance(obj, Notification):
+            pending.add(obj.user_id)
+        elif isinstance(obj, Department):
+            pending.add(None)   # department renamed/removed: drop everything
+            session.info['identity_bump'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    pending = session.info.pop('identity_invalidations', None)
+    if session.info.pop('identity_bump', False) and has_app_context():
+        # Every worker, this one included
+        reference_data.bump(current_app._get_current_object(), STAMP)
+    if not pending:
+        return
+    if None in pending:
+        invalidate()
+        return
+    for user_id in pending:
+        invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('identity_invalidations', None)
+    session.info.pop('identity_bump', None)
@@ -0,0 +1,137 @@
+"""
+Prometheus metrics
+
+Request latency, response size, request and exception counts and in-flight
+requests are recorded per blueprint and endpoint, next to business counters
+(status transitions, evidence uploads). /metrics serves them in the
+Prometheus text format to the networks in METRICS_ALLOWED_NETWORKS.
+
+Under gunicorn every worker is a separate process, so PROMETHEUS_MULTIPROC_DIR
+must point at a directory shared by the workers (gunicorn.conf.py sets one up
+and cleans up after exited workers); /metrics then merges every worker's
+values. Without it (flask run) the process-local registry is served.
+"""
+import ipaddress
+import os
+import time
+from flask import Response, abort, g, got_request_exception, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+REQUEST_LATENCY = Histogram(
+    'cctrs_http_request_duration_seconds', 'Request latency',
+    ['blueprint', 'endpoint', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+RESPONSE_SIZE = Histogram(
+    'cctrs_http_response_size_bytes', 'Response body size (streamed responses excluded)',
+    ['blueprint', 'endpoint'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216))
+REQUESTS = Counter(
+    'cctrs_http_requests', 'Requests by response status',
+    ['blueprint', 'endpoint', 'method', 'status'])
+EXCEPTIONS = Counter(
+    'cctrs_http_exceptions', 'Unhandled exceptions raised by views',
+    ['blueprint', 'endpoint', 'exception'])
+IN_PROGRESS = Gauge(
+    'cctrs_http_requests_in_progress', 'Requests being served',
+    ['blueprint'], multiprocess_mode='livesum')
+
+TRANSITIONS = Counter(
+    'cctrs_status_transitions', 'Committed complaint status transitions',
+    ['from_status', 'to_status'])
+UPLOADS = Counter('cctrs_uploads', 'Evidence files uploaded', ['kind'])
+UPLOAD_SIZE = Histogram(
+    'cctrs_upload_size_bytes', 'Evidence file size', ['kind'],
+    buckets=(65536, 262144, 1048576, 4194304, 8388608, 16777216))
+
+
+def _labels():
+    return request.blueprint or 'app', request.endpoint or 'unmatched'
+
+
+def record_upload(kind, path):
+    """Count an evidence file saved at `path`"""
+    UPLOADS.labels(kind).inc()
+    try:
+        UPLOAD_SIZE.labels(kind).observe(os.path.getsize(path))
+    except OSError:
+        pass
+
+
+# ── Status transitions (counted once their transaction commits) ─────────
+
+def _collect_transitions(session, flush_context):
+    from app.models import StatusHistory
+    pending = session.info.setdefault('metric_transitions', [])
+    pending.extend((obj.previous_status, obj.new_status)
+                   for obj in session.new
+                   if isinstance(obj, StatusHistory) and obj.previous_status != obj.new_status)
+
+
+def _count_transitions(session):
+    for previous_status, new_status in session.info.pop('metric_transitions', ()):
+        TRANSITIONS.labels(previous_status, new_status).inc()
+
+
+def _discard_transitions(session):
+    session.info.pop('metric_transitions', None)
+
+
+# ── Wiring ───────────────────────────────────────────────────────────────
+
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    allowed = [ipaddress.ip_network(n.strip()) for n in app.config['METRICS_ALLOWED_NETWORKS'].split(',')
+               if n.strip()]
+
+    if not event.contains(Session, 'after_flush', _collect_transitions):
+        event.listen(Session, 'after_flush', _collect_transitions)
+        event.listen(Session, 'after_commit', _count_transitions)
+        event.listen(Session, 'after_rollback', _discard_transitions)
+
+    @app.before_request
+    def _start():
+        if request.endpoint == 'metrics':
+            return
+        g.metrics_started = time.perf_counter()
+        IN_PROGRESS.labels(_labels()[0]).inc()
+
+    @app.after_request
+    def _observe(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        blueprint, endpoint = _labels()
+        REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+        if not response.is_streamed and response.content_length is not None:
+            RESPONSE_SIZE.labels(blueprint, endpoint).observe(response.content_length)
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        if g.pop('metrics_started', None) is not None:
+            IN_PROGRESS.labels(_labels()[0]).dec()
+
+    def _count_exception(sender, exception, **extra):
+        EXCEPTIONS.labels(*_labels(), type(exception).__name__).inc()
+
+    got_request_exception.connect(_count_exception, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics():
+        try:
+            remote = ipaddress.ip_address(request.remote_addr or '')
+        except ValueError:
+            abort(403)
+        if not any(remote in network for network in allowed):
+            abort(403)
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,101 @@
+"""
+Password hashing policy
+
+The algorithm and cost come from PASSWORD_HASH_METHOD (any Werkzeug method
+string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'). Stored hashes
+made with other parameters still verify, and are flagged by needs_rehash()
+so the login route can upgrade them transparently.
+
+Verification is CPU-heavy by design, so it runs on a small per-process
+thread pool (PASSWORD_HASH_WORKERS). hashlib releases the GIL while hashing,
+so other request threads keep running; once PASSWORD_HASH_QUEUE_LIMIT
+verifications are waiting, further logins get HashingBusy instead of
+piling up behind them.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+_canonical_methods = {}
+
+
+class HashingBusy(Exception):
+    """Raised when too many password verifications are already queued"""
+
+
+def _config(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:     # outside an application context (scripts)
+        return default
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=_config('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+
+
+def verify_password(pwhash, password):
+    """Check a password on the bounded hashing pool"""
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy('Too many password verifications in progress.')
+    try:
+        future = executor.submit(check_password_hash, pwhash, password)
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is held until the hash finishes, even if we stop waiting for it
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_config('PASSWORD_HASH_TIMEOUT', 30))
+    except TimeoutError:
+        raise HashingBusy('Password verification timed out.') from None
+
+
+def needs_rehash(pwhash):
+    """True if pwhash was not produced with the configured method and cost"""
+    method = _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    return pwhash.split('$', 1)[0] != _canonical_method(method)
+
+
+def _canonical_method(method):
+    """
+    Werkzeug stores the fully expanded parameters ('scrypt' becomes
+    'scrypt:32768:8:1'), so derive the stored prefix from a throwaway hash
+    once per method instead of re-implementing its defaults here.
+    """
+    if method not in _canonical_methods:
+        _canonical_methods[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return _canonical_methods[method]
+
+
+def _get_pool():
+    # Created lazily so it is never built in a preloading gunicorn master
+    # (threads do not survive fork)
+    global _executor, _slots
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                workers = _config('PASSWORD_HASH_WORKERS', 2)
+                _slots = threading.BoundedSemaphore(workers + _config('PASSWORD_HASH_QUEUE_LIMIT', 32))
+                _executor = ThreadPoolExecutor(max_workers=workers,
+                                               thread_name_prefix='password-hash')
+    return _executor, _slots
+
+
+def _reset_pool_after_fork():
+    global _executor, _slots, _pool_lock
+    _executor = None
+    _slots = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
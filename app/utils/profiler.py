@@ -0,0 +1,230 @@
+"""
+On-demand request profiler
+
+An admin profiles one request by adding `?_profile=sample` (or
+`?_profile=cprofile`) to its URL. To profile a page another role sees, or a
+request made from curl, send `X-Profile: <token>` instead; tokens are signed
+with the SECRET_KEY, generated on the admin Profiles page or with
+`flask profile-token`, and expire after PROFILER_TOKEN_MAX_AGE seconds. A
+token stops working as soon as its issuer is no longer an active admin.
+
+* sample   - a background thread samples the request thread's stack every
+             PROFILER_INTERVAL_MS and writes collapsed stacks
+             (`frame;frame;frame count`), the input of flamegraph.pl,
+             speedscope and similar viewers.
+* cprofile - deterministic cProfile of the request, written as a pstats text
+             report sorted by cumulative time.
+
+Reports are stored in PROFILER_DIR (the newest MAX_REPORTS are kept) and the
+profiled response carries an `X-Profile-Report` header with the report's
+download URL. Requests without the flag or header only pay for one argument
+and header lookup; PROFILER_ENABLED=0 removes the hooks altogether. Under
+gevent workers the sampler sees whichever greenlet holds the thread, so use
+cprofile there.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, request, url_for
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import select
+from app import db
+from app.models import User
+
+MODES = ('sample', 'cprofile')
+MAX_REPORTS = 200
+TOKEN_SALT = 'cctrs-profiler'
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+# ── Profilers ────────────────────────────────────────────────────────────
+
+def _label(code):
+    path = code.co_filename
+    if path.startswith(_ROOT + os.sep):
+        path = os.path.relpath(path, _ROOT)
+    else:
+        path = os.sep.join(path.split(os.sep)[-2:])
+    # ';' separates frames in the collapsed format
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class Sampler:
+    """Samples one thread's stack from a helper thread; stacks are kept collapsed"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cctrs-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def report(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Tracer:
+    """cProfile of the request, reported as pstats text"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def report(self):
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(80)
+        return out.getvalue()
+
+
+# ── Tokens ───────────────────────────────────────────────────────────────
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.secret_key, salt=TOKEN_SALT)
+
+
+def make_token(app, admin_id, mode='sample'):
+    """Signed X-Profile header value, issued by the admin `admin_id`"""
+    return _serializer(app).dumps({'by': admin_id, 'mode': mode})
+
+
+def _token_mode(app, token):
+    try:
+        payload = _serializer(app).loads(token, max_age=app.config['PROFILER_TOKEN_MAX_AGE'])
+    except BadSignature:
+        return None
+    if payload.get('mode') not in MODES:
+        return None
+    issuer = db.session.execute(
+        select(User.role, User.is_active).where(User.id == payload.get('by'))
+    ).first()
+    if issuer is None or issuer.role != 'admin' or not issuer.is_active:
+        return None
+    return payload['mode']
+
+
+# ── Reports ──────────────────────────────────────────────────────────────
+
+def report_dir(app):
+    return app.config['PROFILER_DIR'] or os.path.join(app.instance_path, 'profiles')
+
+
+def list_reports(directory):
+    """Stored reports, newest first: [{'name', 'size', 'created_at'}]"""
+    reports = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        if not name.endswith(('.collapsed', '.txt')):
+            continue
+        try:
+            info = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        reports.append({'name': name, 'size': info.st_size,
+                        'created_at': datetime.fromtimestamp(info.st_mtime)})
+    reports.sort(key=lambda r: r['created_at'], reverse=True)
+    return reports
+
+
+def _store(directory, mode, text):
+    os.makedirs(directory, exist_ok=True)
+    endpoint = _UNSAFE.sub('_', request.endpoint or 'unmatched')
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    extension = 'collapsed' if mode == 'sample' else 'txt'
+    name = f'{stamp}-{endpoint}-{os.getpid()}-{threading.get_ident() % 10000}.{extension}'
+    with open(os.path.join(directory, name), 'w') as f:
+        f.write(text)
+    for stale in list_reports(directory)[MAX_REPORTS:]:
+        try:
+            os.remove(os.path.join(directory, stale['name']))
+        except OSError:
+            pass
+    return name
+
+
+# ── Wiring ───────────────────────────────────────────────────────────────
+
+def init_app(app):
+    if not app.config['PROFILER_ENABLED']:
+        return
+    interval = app.config['PROFILER_INTERVAL_MS'] / 1000
+
+    def _requested_mode():
+        token = request.headers.get('X-Profile')
+        if token:
+            return _token_mode(app, token)
+        mode = request.args.get('_profile')
+        if mode is None:
+            return None
+        if not (current_user.is_authenticated and current_user.role == 'admin'):
+            return None
+        return mode if mode in MODES else 'sample'
+
+    @app.before_request
+    def _start():
+        if '_profile' not in request.args and 'X-Profile' not in request.headers:
+            return
+        mode = _requested_mode()
+        if mode is None:
+            return
+        profiler = Sampler(interval) if mode == 'sample' else Tracer()
+        g.profiler = (mode, profiler, time.perf_counter())
+        profiler.start()
+
+    @app.after_request
+    def _finish(response):
+        active = g.pop('profiler', None)
+        if active is None:
+            return response
+        mode, profiler, started = active
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        name = _store(report_dir(app), mode, profiler.report())
+        response.headers['X-Profile-Report'] = url_for('admin.download_profile', name=name)
+        response.headers.add('Server-Timing', f'profile;dur={elapsed_ms:.1f};desc="{mode}"')
+        return response
+
+    @app.teardown_request
+    def _abandon(exc):
+        # The view raised before after_request: stop the sampler thread anyway
+        active = g.pop('profiler', None)
+        if active is not None:
+            active[1].stop()
@@ -0,0 +1,123 @@
+"""
+Keyset-paginated public complaints feed
+
+The feed page renders its first page and loads the rest from
+/public/api/complaints as the reader scrolls. Pages are ordered newest
+first on (created_at, id), or with sort=top by trending score on
+(trending_score, id) (see app/utils/trending.py), and continue from an
+opaque cursor instead of an OFFSET, so a page costs the same however many
+public complaints exist and however far down the reader is. The feed
+indexes declared on Complaint serve both orders; status and area filters
+are checked on the index walk.
+"""
+import base64
+import math
+from datetime import datetime
+from flask import abort, current_app
+from sqlalchemy import select, and_, or_
+from app import db
+from app.models import Complaint, VALID_STATUSES
+
+MAX_PAGE_SIZE = 50
+DEFAULT_RADIUS_M = 2000
+MAX_RADIUS_M = 50000
+FEED_STATUSES = [status for status in VALID_STATUSES if status != 'Draft']
+SORTS = {'new': 'Newest', 'top': 'Top this week'}
+
+_METERS_PER_DEGREE = 111320
+
+
+def _sort_key(sort):
+    return Complaint.trending_score if sort == 'top' else Complaint.created_at
+
+
+def encode_cursor(sort, key, complaint_id):
+    key = repr(key) if sort == 'top' else key.isoformat()
+    raw = f'{sort}|{key}|{complaint_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """(sort key, complaint id) from a cursor made for the same sort order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        cursor_sort, key, complaint_id = raw.split('|')
+        if cursor_sort != sort:
+            raise ValueError
+        return (float(key) if sort == 'top' else datetime.fromisoformat(key)), int(complaint_id)
+    except (ValueError, UnicodeDecodeError):
+        abort(400, 'Invalid cursor.')
+
+
+def parse_filters(args):
+    """
+    Read feed filters from query args: sort (new or top), department_id,
+    status, near (lat,lng) with radius (meters), limit, cursor
+    """
+    filters = {
+        'sort': args.get('sort') or 'new',
+        'department_id': None, 'status': None, 'area': None, 'cursor': None,
+        'limit': current_app.config['COMPLAINTS_PER_PAGE'],
+    }
+    try:
+        if args.get('department_id'):
+            filters['department_id'] = int(args['department_id'])
+        if args.get('limit'):
+            filters['limit'] = max(1, min(int(args['limit']), MAX_PAGE_SIZE))
+        if args.get('near'):
+            latitude, longitude = (float(part) for part in args['near'].split(','))
+            radius = min(float(args.get('radius') or DEFAULT_RADIUS_M), MAX_RADIUS_M)
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and radius > 0):
+                raise ValueError
+            filters['area'] = bounding_box(latitude, longitude, radius)
+    except ValueError:
+        abort(400, 'department_id and limit must be integers; near must be "latitude,longitude" '
+                   'and radius a positive number of meters.')
+    if filters['sort'] not in SORTS:
+        abort(400, f'Unknown sort "{filters["sort"]}".')
+    status = args.get('status')
+    if status:
+        if status not in FEED_STATUSES:
+            abort(400, f'Unknown status "{status}".')
+        filters['status'] = status
+    if args.get('cursor'):
+        filters['cursor'] = decode_cursor(args['cursor'], filters['sort'])
+    return filters
+
+
+def bounding_box(latitude, longitude, radius_m):
+    """(south, west, north, east) of the box around a point; the feed's "area" """
+    dlat = radius_m / _METERS_PER_DEGREE
+    dlng = radius_m / (_METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - dlat, longitude - dlng, latitude + dlat, longitude + dlng
+
+
+def fetch_page(filters):
+    """Return (complaints, next_cursor); next_cursor is None on the last page"""
+    stmt = select(Complaint).where(Complaint.is_public.is_(True), Complaint.current_status != 'Draft')
+    if filters['department_id']:
+        stmt = stmt.where(Complaint.department_id == filters['department_id'])
+    if filters['status']:
+        stmt = stmt.where(Complaint.current_status == filters['status'])
+    if filters['area']:
+        south, west, north, east = filters['area']
+        stmt = stmt.where(Complaint.latitude.between(south, north),
+                          Complaint.longitude.between(west, east))
+    key = _sort_key(filters['sort'])
+    if filters['sort'] == 'top':
+        stmt = stmt.where(Complaint.trending_score > 0)
+    if filters['cursor']:
+        # Expanded row-value comparison, as in the audit log
+        value, complaint_id = filters['cursor']
+        stmt = stmt.where(or_(key < value, and_(key == value, Complaint.id < complaint_id)))
+    limit = filters['limit']
+    complaints = db.session.execute(
+        stmt.order_by(key.desc(), Complaint.id.desc()).limit(limit + 1)
+    ).scalars().all()
+
+    next_cursor = None
+    if len(complaints) > limit:
+        complaints = complaints[:limit]
+        last = complaints[-1]
+        next_cursor = encode_cursor(filters['sort'], getattr(last, key.key), last.id)
+    return complaints, next_cursor
@@ -0,0 +1,188 @@
+"""
+Token-bucket rate limiting
+
+Each limited route gets a bucket per client: the user id when logged in,
+the remote address otherwise. Login is keyed on the submitted username and
+the address, so staff behind one office NAT don't share ten logins a
+minute; RATE_LIMIT_LOGIN_PER_IP caps all usernames from one address
+together, well above a shift change. A bucket holds `capacity` tokens and refills
+at capacity/period tokens per second; every request takes one token, and a
+request that finds the bucket empty gets 429 Too Many Requests with a
+Retry-After header, before the view reads the form or the upload.
+
+Limits come from RATE_LIMITS, e.g.
+{"auth.login": [10, 60], "main.public_complaints": [60, 60, ["GET"]]}
+(endpoint -> [capacity, period seconds, methods], methods defaulting to
+POST).
+
+Buckets live in a Backend. MemoryBackend keeps them in this process only,
+so under gunicorn every worker has its own; SQLiteBackend shares them
+between the workers of one host through a small SQLite file, and
+gunicorn.conf.py selects it. Another shared store (Redis, memcached) only
+needs to implement Backend.take().
+"""
+import abc
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from flask import jsonify, render_template, request
+from flask_login import current_user
+
+logger = logging.getLogger('cctrs.rate_limit')
+
+MAX_MEMORY_KEYS = 100000
+LOGIN_ENDPOINT = 'auth.login'
+
+
+class Backend(abc.ABC):
+    """Token-bucket store shared by everything that sees the same limits"""
+
+    @abc.abstractmethod
+    def take(self, key, capacity, rate, now):
+        """
+        Take one token from `key` (refilled at `rate` tokens/second up to
+        `capacity`); return 0 when allowed, otherwise the seconds until a
+        token is available
+        """
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBackend(Backend):
+    """Buckets in a dict; per process"""
+
+    def __init__(self):
+        self._buckets = {}          # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+            if len(self._buckets) >= MAX_MEMORY_KEYS:
+                self._buckets.clear()   # a flood of distinct clients: start over rather than grow
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+
+
+class SQLiteBackend(Backend):
+    """Buckets in a SQLite file, shared by every process on the host"""
+
+    PURGE_EVERY = 1000      # takes between deletions of long-idle buckets
+    IDLE_SECONDS = 86400
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with sqlite3.connect(path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connection(self):
+        # One connection per thread, and a new one after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(row[0], row[1], capacity, rate, now) if row else capacity
+            wait = (1 - tokens) / rate if tokens < 1 else 0
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens if wait else tokens - 1, now))
+            self._takes += 1
+            if self._takes % self.PURGE_EVERY == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.IDLE_SECONDS,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+def make_backend(storage):
+    """Backend for a RATE_LIMIT_STORAGE value: 'memory' or 'sqlite:////path/to/file.db'"""
+    if storage == 'memory':
+        return MemoryBackend()
+    if storage.startswith('sqlite:///'):
+        return SQLiteBackend(storage[len('sqlite:///'):])
+    raise ValueError(f'Unknown RATE_LIMIT_STORAGE {storage!r}')
+
+
+# ── Wiring ───────────────────────────────────────────────────────────────
+
+def client_key():
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return f'ip:{request.remote_addr}'
+
+
+def login_key():
+    username = request.form.get('username', '').strip().lower()
+    return f'ip:{request.remote_addr}:login:{username}'
+
+
+def too_many_requests(retry_after):
+    """429 response with Retry-After, as JSON for API/AJAX callers and HTML otherwise"""
+    seconds = max(1, math.ceil(retry_after))
+    headers = {'Retry-After': str(seconds)}
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify(error='Too many requests. Please slow down.', retry_after=seconds), 429, headers
+    return render_template('errors/429.html', retry_after=seconds), 429, headers
+
+
+def init_app(app):
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+    backend = make_backend(app.config['RATE_LIMIT_STORAGE'])
+    limits = {}
+    for endpoint, spec in app.config['RATE_LIMITS'].items():
+        capacity, period = spec[0], spec[1]
+        methods = frozenset(m.upper() for m in (spec[2] if len(spec) > 2 else ['POST']))
+        limits[endpoint] = (capacity, capacity / period, methods)
+    ip_capacity, ip_period = app.config['RATE_LIMIT_LOGIN_PER_IP']
+    app.extensions['rate_limit'] = backend
+
+    def _take(key, capacity, rate):
+        try:
+            return backend.take(key, capacity, rate, time.time())
+        except sqlite3.Error as e:
+            # Never turn a limiter problem into an outage
+            logger.warning('Rate limiter unavailable, allowing %s: %s', key, e)
+            return 0
+
+    @app.before_request
+    def _limit():
+        limit = limits.get(request.endpoint)
+        if limit is None or request.method not in limit[2]:
+            return None
+        capacity, rate, _ = limit
+        if request.endpoint == LOGIN_ENDPOINT and not current_user.is_authenticated:
+            key = f'{request.endpoint}:ip:{request.remote_addr}'
+            wait = _take(key, ip_capacity, ip_capacity / ip_period)
+            if not wait:
+                key = f'{request.endpoint}:{login_key()}'
+                wait = _take(key, capacity, rate)
+        else:
+            key = f'{request.endpoint}:{client_key()}'
+            wait = _take(key, capacity, rate)
+        if wait:
+            logger.info('Rate limited %s for %.1fs', key, wait)
+            return too_many_requests(wait)
+        return None
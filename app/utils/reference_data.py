@@ -0,0 +1,183 @@
+"""
+Reference-data cache for departments and staff rosters
+
+The department list (submit/edit forms, user form, filters) and each
+department's supervisors and officers change rarely but are read on almost
+every page. They are cached per process as immutable snapshots, so they can
+be shared by threads and outlive the request's session.
+
+Each cached value carries the version stamp it was loaded under. A stamp is
+a small file in REFERENCE_CACHE_DIR; committing a change to a department or
+to a supervisor/officer rewrites it, and every gunicorn worker compares
+stamps on read, so all workers reload on their next access. Entries also
+expire after REFERENCE_CACHE_TTL seconds as a safety net for changes made
+outside the app (seed scripts, SQL shells). A TTL of 0 turns the cache off.
+Values are always loaded from the primary, never a read replica.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from flask import abort, current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.utils import replica
+
+DepartmentRef = namedtuple('DepartmentRef', 'id name description created_at')
+StaffRef = namedtuple('StaffRef', 'id username email role department_id is_active')
+
+ROSTER_ROLES = ('supervisor', 'officer')
+_ROSTER_FIELDS = ('role', 'department_id', 'username', 'email', 'is_active')
+
+_cache = {}          # key -> (stamp, expires_at, value)
+_lock = threading.Lock()
+
+
+# ── Version stamps ───────────────────────────────────────────────────────
+
+def cache_dir(app):
+    return app.config['REFERENCE_CACHE_DIR'] or os.path.join(app.instance_path, 'reference_cache')
+
+
+def _stamp_path(app, name):
+    return os.path.join(cache_dir(app), f'{name}.version')
+
+
+def _read_stamp(app, name):
+    try:
+        with open(_stamp_path(app, name)) as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
+def bump(app, *names):
+    """Give `names` a new version stamp, invalidating them in every worker"""
+    os.makedirs(cache_dir(app), exist_ok=True)
+    stamp = f'{time.time_ns()}-{os.getpid()}'
+    for name in names:
+        path = _stamp_path(app, name)
+        with open(path + f'.{os.getpid()}.tmp', 'w') as f:
+            f.write(stamp)
+        os.replace(path + f'.{os.getpid()}.tmp', path)
+    with _lock:
+        for key in [k for k in _cache if k[0] in names]:
+            del _cache[key]
+
+
+def current_stamp(name):
+    """The version stamp `name` has now, for caches kept outside this module"""
+    return _read_stamp(current_app._get_current_object(), name)
+
+
+def _cached(key, stamp_name, load):
+    app = current_app._get_current_object()
+    ttl = app.config['REFERENCE_CACHE_TTL']
+    if ttl <= 0:
+        return load()
+    stamp = _read_stamp(app, stamp_name)
+    entry = _cache.get(key)
+    now = time.monotonic()
+    if entry is not None and entry[0] == stamp and entry[1] > now:
+        return entry[2]
+    with replica.primary_reads():
+        value = load()
+    with _lock:
+        _cache[key] = (stamp, now + ttl, value)
+    return value
+
+
+# ── Lookups ──────────────────────────────────────────────────────────────
+
+def _load_departments():
+    from app.models import Department
+    rows = db.session.query(Department.id, Department.name, Department.description,
+                            Department.created_at).order_by(Department.id).all()
+    return tuple(DepartmentRef(*row) for row in rows)
+
+
+def departments(by_name=False):
+    """Every department, in id order (or alphabetically with by_name=True)"""
+    if by_name:
+        return _cached(('departments', 'by_name'), 'departments',
+                       lambda: tuple(sorted(departments(), key=lambda d: d.name)))
+    return _cached(('departments', 'by_id'), 'departments', _load_departments)
+
+
+def department_names():
+    """{department id: name}, for labelling rows without loading their department"""
+    return _cached(('departments', 'names'), 'departments',
+                   lambda: {d.id: d.name for d in departments()})
+
+
+def department_or_404(department_id):
+    for department in departments():
+        if department.id == department_id:
+            return department
+    abort(404)
+
+
+_EMPTY_ROSTER = {role: () for role in ROSTER_ROLES}
+
+
+def _load_rosters():
+    from app.models import User
+    rows = db.session.query(User.id, User.username, User.email, User.role, User.department_id,
+                            User.is_active)\
+        .filter(User.department_id.isnot(None), User.role.in_(ROSTER_ROLES))\
+        .order_by(User.id).all()
+    rosters = {}
+    for row in rows:
+        members = rosters.setdefault(row.department_id, {role: [] for role in ROSTER_ROLES})
+        members[row.role].append(StaffRef(*row))
+    return {department_id: {role: tuple(staff) for role, staff in members.items()}
+            for department_id, members in rosters.items()}
+
+
+def roster(department_id):
+    """{'supervisor': (StaffRef, ...), 'officer': (StaffRef, ...)} for one department"""
+    # Every department's staff is loaded in one query; rosters are small
+    return _cached(('staff', 'all'), 'staff', _load_rosters).get(department_id, _EMPTY_ROSTER)
+
+
+# ── Invalidation ─────────────────────────────────────────────────────────
+# Like the identity cache: collect at flush time, bump once the transaction
+# commits so no worker can reload the old rows in between.
+
+def _roster_changed(user):
+    """Whether an updated user moved into, out of or within a roster"""
+    state = inspect(user)
+    if not any(state.attrs[name].history.has_changes() for name in _ROSTER_FIELDS):
+        return False
+    old_roles = state.attrs.role.history.deleted
+    return user.role in ROSTER_ROLES or any(role in ROSTER_ROLES for role in old_roles)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    from app.models import User, Department
+
+    pending = session.info.setdefault('reference_changes', set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Department):
+            pending.update(('departments', 'staff'))
+        elif isinstance(obj, User) and obj.role in ROSTER_ROLES:
+            pending.add('staff')
+    for obj in session.dirty:
+        if isinstance(obj, Department):
+            pending.update(('departments', 'staff'))
+        elif isinstance(obj, User) and _roster_changed(obj):
+            pending.add('staff')
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    pending = session.info.pop('reference_changes', None)
+    if pending and has_app_context():
+        bump(current_app._get_current_object(), *pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('reference_changes', None)
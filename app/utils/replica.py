@@ -0,0 +1,93 @@
+"""
+Read-replica routing
+
+When DATABASE_REPLICA_URL is set it becomes the `replica` bind, and the
+SELECTs of GET requests to views marked with @replica_reads (the auditor
+pages, the public pages, admin reports and exports) run on it. Everything
+else, including any flush or UPDATE/DELETE a replica-routed request makes,
+runs on the primary.
+
+Caches shared across requests (reference data, identity snapshots) are
+always filled from the primary, inside primary_reads(): a lagging replica
+must not store stale rows under a fresh version stamp.
+
+A request that writes starts a REPLICA_STICKY_SECONDS window, kept in the
+user's session cookie, during which their replica-routed pages are read
+from the primary as well, so they never see a replica that has not caught
+up with their own change yet.
+
+For local testing, `flask replicate-db --interval 2` copies a SQLite primary
+into a SQLite replica every two seconds, standing in for real replication
+(and its lag).
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from flask import request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import CompoundSelect, Select
+from sqlalchemy.sql.dml import UpdateBase
+
+BIND_KEY = 'replica'
+STICKY_KEY = '_primary_until'
+
+
+def replica_reads(view):
+    """Mark a read-only view whose GET requests may be served from the replica"""
+    view.replica_reads = True
+    return view
+
+
+@contextmanager
+def primary_reads():
+    """Send this request's reads to the primary inside the block"""
+    from app import db
+    routed = db.session.info.pop(BIND_KEY, None)
+    try:
+        yield
+    finally:
+        if routed:
+            db.session.info[BIND_KEY] = routed
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the replica when the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and self.info.get(BIND_KEY) \
+                and isinstance(clause, (Select, CompoundSelect)):
+            return self._db.engines[BIND_KEY]
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_app(app):
+    if BIND_KEY not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    from app import db
+    sticky = app.config['REPLICA_STICKY_SECONDS']
+
+    @app.before_request
+    def _route():
+        view = app.view_functions.get(request.endpoint)
+        if request.method in ('GET', 'HEAD') and getattr(view, 'replica_reads', False) \
+                and session.get(STICKY_KEY, 0) < time.time():
+            db.session.info[BIND_KEY] = True
+
+    @app.after_request
+    def _stick(response):
+        if sticky > 0 and db.session.info.get('wrote'):
+            session[STICKY_KEY] = time.time() + sticky
+        return response
+
+
+def copy_sqlite(primary_path, replica_path):
+    """Copy the primary database into the replica file with SQLite's online backup"""
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
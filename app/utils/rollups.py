@@ -0,0 +1,238 @@
+"""
+Daily per-department rollups of the complaint lifecycle
+
+Every status_history row is folded exactly once into daily_department_stats:
+counters for the events the dashboards chart (submitted, verified, flagged,
+resolved, closed, escalated) plus the total time complaints spent in the stage
+they left, from which the mean time-in-stage is derived.
+
+rollup_state keeps the id of the last history row processed, so
+`flask rollup-update` only reads rows added since the previous run and can be
+scheduled every few minutes. `flask rollup-backfill` rebuilds everything,
+archived history included. A 12-month trend then reads at most 365 rows per
+department instead of scanning complaints and status_history.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from flask import abort, current_app
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import (Complaint, StatusHistory, ArchivedComplaint, ArchivedStatusHistory,
+                        DailyDepartmentStat, RollupState)
+
+STATE_NAME = 'status_history'
+COUNTERS = ('submitted', 'verified', 'flagged', 'resolved', 'closed', 'escalated')
+BUCKETS = ('day', 'week', 'month')
+
+# Rows younger than this are left for the next run: a concurrent transaction
+# may still commit a history row with a lower id.
+SETTLE_SECONDS = 30
+
+
+def _events(previous_status, new_status):
+    """Names of the counters a single transition increments"""
+    events = []
+    if new_status == 'Submitted':
+        events.append('submitted')
+    if previous_status == 'Submitted' and new_status == 'Under Review':
+        events.append('verified')
+    if new_status == 'Flagged':
+        events.append('flagged')
+    if new_status == 'Resolved':
+        events.append('resolved')
+    if new_status == 'Closed':
+        events.append('closed')
+    if new_status == 'Escalated':
+        events.append('escalated')
+    return events
+
+
+def _transitions(history, complaint, after_id, limit):
+    """History rows after `after_id` with their department and the time the stage began"""
+    earlier = aliased(history)
+    entered_at = select(func.max(earlier.changed_at))\
+        .where(earlier.complaint_id == history.complaint_id, earlier.id < history.id,
+               earlier.previous_status != earlier.new_status)\
+        .scalar_subquery()
+    stmt = select(
+        history.id, history.changed_at, history.previous_status, history.new_status,
+        complaint.department_id,
+        func.coalesce(entered_at, complaint.created_at).label('entered_at'),
+    ).join(complaint, history.complaint_id == complaint.id)\
+     .where(history.id > after_id)\
+     .order_by(history.id).limit(limit)
+    return db.session.execute(stmt).all()
+
+
+def _fold(rows):
+    """Apply a batch of transitions to daily_department_stats (caller commits)"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    for row in rows:
+        if row.previous_status == row.new_status:
+            continue                          # a reassignment, not a transition
+        delta = deltas[(row.department_id, row.changed_at.date())]
+        for name in _events(row.previous_status, row.new_status):
+            delta[name] += 1
+        if row.previous_status != 'Draft' and row.entered_at is not None:
+            delta['stage_exits'] += 1
+            delta['stage_seconds'] += max((row.changed_at - row.entered_at).total_seconds(), 0)
+    if not deltas:
+        return
+
+    department_ids = {key[0] for key in deltas}
+    days = [key[1] for key in deltas]
+    existing = {
+        (stat.department_id, stat.day): stat
+        for stat in DailyDepartmentStat.query.filter(
+            DailyDepartmentStat.department_id.in_(department_ids),
+            DailyDepartmentStat.day.between(min(days), max(days)))
+    }
+    for key, delta in deltas.items():
+        stat = existing.get(key)
+        if stat is None:
+            stat = DailyDepartmentStat(department_id=key[0], day=key[1],
+                                       stage_exits=0, stage_seconds=0.0,
+                                       **{name: 0 for name in COUNTERS})
+            db.session.add(stat)
+        for name, value in delta.items():
+            setattr(stat, name, getattr(stat, name) + (value if name == 'stage_seconds' else int(value)))
+
+
+def _state():
+    state = db.session.get(RollupState, STATE_NAME)
+    if state is None:
+        state = RollupState(name=STATE_NAME, last_history_id=0)
+        db.session.add(state)
+        db.session.flush()
+    return state
+
+
+def update_rollups(batch_size=None):
+    """Fold status_history rows added since the last run; returns rows processed"""
+    if batch_size is None:
+        batch_size = current_app.config['ROLLUP_BATCH_SIZE']
+    settled_before = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+    processed = 0
+    while True:
+        last_id = _state().last_history_id
+        rows = _transitions(StatusHistory, Complaint, last_id, batch_size)
+        settled = []
+        for row in rows:
+            if row.changed_at >= settled_before:
+                break
+            settled.append(row)
+        if not settled:
+            db.session.commit()
+            return processed
+
+        _fold(settled)
+        # Compare-and-set the watermark so two overlapping runs cannot both count a batch
+        moved = db.session.execute(
+            update(RollupState)
+            .where(RollupState.name == STATE_NAME, RollupState.last_history_id == last_id)
+            .values(last_history_id=settled[-1].id, updated_at=datetime.utcnow())
+        ).rowcount
+        if not moved:
+            db.session.rollback()
+            return processed
+        db.session.commit()
+        db.session.expire_all()
+        processed += len(settled)
+        if len(settled) < len(rows):
+            return processed
+
+
+def backfill_rollups(batch_size=None):
+    """Rebuild every rollup from live and archived history; returns rows processed"""
+    if batch_size is None:
+        batch_size = current_app.config['ROLLUP_BATCH_SIZE']
+    db.session.execute(delete(DailyDepartmentStat))
+    _state().last_history_id = 0
+    db.session.commit()
+
+    # Archived complaints are Closed and no longer change, so one pass suffices
+    processed, last_id = 0, 0
+    while True:
+        rows = _transitions(ArchivedStatusHistory, ArchivedComplaint, last_id, batch_size)
+        if not rows:
+            break
+        _fold(rows)
+        db.session.commit()
+        db.session.expire_all()
+        processed += len(rows)
+        last_id = rows[-1].id
+    return processed + update_rollups(batch_size)
+
+
+# ── Trends ───────────────────────────────────────────────────────────────
+
+def _bucket_start(day, bucket):
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _months_back(today, months):
+    month_index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def trend(months=12, department_id=None, bucket='month'):
+    """
+    Series for the last `months` calendar months, one point per bucket:
+    {'labels': [...], 'submitted': [...], ..., 'mean_time_in_stage_hours': [...]}
+    """
+    start = _months_back(date.today(), months)
+    stmt = select(
+        DailyDepartmentStat.day,
+        *[func.sum(getattr(DailyDepartmentStat, name)).label(name) for name in COUNTERS],
+        func.sum(DailyDepartmentStat.stage_exits).label('stage_exits'),
+        func.sum(DailyDepartmentStat.stage_seconds).label('stage_seconds'),
+    ).where(DailyDepartmentStat.day >= start)
+    if department_id:
+        stmt = stmt.where(DailyDepartmentStat.department_id == department_id)
+    stmt = stmt.group_by(DailyDepartmentStat.day).order_by(DailyDepartmentStat.day)
+
+    # Every bucket in the window gets a point, including quiet ones
+    totals = {}
+    cursor = _bucket_start(start, bucket)
+    step = {'day': 1, 'week': 7}.get(bucket)
+    while cursor <= date.today():
+        totals[cursor] = dict.fromkeys(COUNTERS + ('stage_exits', 'stage_seconds'), 0)
+        cursor = cursor + timedelta(days=step) if step else \
+            (cursor.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    for row in db.session.execute(stmt):
+        day = row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day))
+        point = totals.setdefault(_bucket_start(day, bucket),
+                                  dict.fromkeys(COUNTERS + ('stage_exits', 'stage_seconds'), 0))
+        for name in COUNTERS + ('stage_exits', 'stage_seconds'):
+            point[name] += row._mapping[name] or 0
+
+    label_format = '%Y-%m' if bucket == 'month' else '%Y-%m-%d'
+    keys = sorted(totals)
+    series = {'labels': [key.strftime(label_format) for key in keys]}
+    for name in COUNTERS:
+        series[name] = [int(totals[key][name]) for key in keys]
+    series['mean_time_in_stage_hours'] = [
+        round(totals[key]['stage_seconds'] / totals[key]['stage_exits'] / 3600, 1)
+        if totals[key]['stage_exits'] else None
+        for key in keys
+    ]
+    return series
+
+
+def parse_trend_args(args):
+    """Read ?months=&department_id=&bucket= with sane bounds"""
+    try:
+        months = max(1, min(int(args.get('months', 12)), 36))
+        department_id = int(args['department_id']) if args.get('department_id') else None
+    except ValueError:
+        abort(400, 'months and department_id must be integers.')
+    bucket = args.get('bucket', 'month')
+    if bucket not in BUCKETS:
+        abort(400, f'bucket must be one of: {", ".join(BUCKETS)}.')
+    return {'months': months, 'department_id': department_id, 'bucket': bucket}
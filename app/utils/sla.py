@@ -0,0 +1,125 @@
+"""
+SLA monitor: escalate complaints that have stalled past their deadline
+
+Deadlines are hours a complaint may stay in one status, configured per
+status with optional per-department overrides (SLA_DEADLINES_HOURS). A sweep
+walks the (current_status, updated_at) index from the oldest complaint in
+each monitored status, escalates overdue ones through update_status in
+batches and notifies the department's supervisors.
+
+Run it on a schedule: `flask sla-sweep` (cron) or `flask sla-sweep --interval 300`.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func, and_, or_
+from app import db
+from app.models import Complaint, Department, Notification, User, system_actor
+
+MONITORED_STATUSES = ('Assigned', 'In Progress', 'On Hold')
+
+
+def deadlines():
+    """
+    {status: (default_hours, {department_id: hours})} from SLA_DEADLINES_HOURS:
+    {"Assigned": 72, ..., "departments": {"Sanitation": {"In Progress": 120}}}
+    Departments may be given by name or id.
+    """
+    config = current_app.config['SLA_DEADLINES_HOURS']
+    overrides = config.get('departments', {})
+    by_name = {}
+    if overrides:
+        by_name = {name: dept_id for dept_id, name in
+                   db.session.execute(select(Department.id, Department.name))}
+
+    table = {status: (float(config[status]), {}) for status in MONITORED_STATUSES if status in config}
+    for department, hours_by_status in overrides.items():
+        dept_id = by_name.get(department)
+        if dept_id is None and str(department).isdigit():
+            dept_id = int(department)
+        if dept_id is None:
+            current_app.logger.warning('SLA override for unknown department %r ignored', department)
+            continue
+        for status, hours in hours_by_status.items():
+            if status in table:
+                table[status][1][dept_id] = float(hours)
+    return table
+
+
+def _overdue_condition(status, default_hours, department_hours, now):
+    # The laxest cutoff bounds the index range; each department's own
+    # deadline is applied on top of it
+    loosest = min([default_hours, *department_hours.values()])
+    per_department = [
+        and_(Complaint.department_id == dept_id, Complaint.updated_at < now - timedelta(hours=hours))
+        for dept_id, hours in department_hours.items()
+    ]
+    per_department.append(and_(Complaint.department_id.notin_(list(department_hours)),
+                               Complaint.updated_at < now - timedelta(hours=default_hours)))
+    return and_(Complaint.current_status == status,
+                Complaint.updated_at < now - timedelta(hours=loosest),
+                or_(*per_department))
+
+
+def overdue_complaints(status, default_hours, department_hours, now, limit):
+    """Oldest complaints in `status` past their department's deadline (at most `limit`)"""
+    return Complaint.query.filter(_overdue_condition(status, default_hours, department_hours, now))\
+        .order_by(Complaint.updated_at, Complaint.id).limit(limit).all()
+
+
+def count_overdue(status, default_hours, department_hours, now):
+    return db.session.execute(
+        select(func.count(Complaint.id))
+        .where(_overdue_condition(status, default_hours, department_hours, now))
+    ).scalar()
+
+
+def _notify_supervisors(escalated):
+    by_department = defaultdict(list)
+    for complaint in escalated:
+        by_department[complaint.department_id].append(complaint)
+    supervisors = User.query.filter(User.role == 'supervisor', User.is_active.is_(True),
+                                    User.department_id.in_(by_department)).all()
+    for supervisor in supervisors:
+        for complaint in by_department[supervisor.department_id]:
+            db.session.add(Notification(
+                user_id=supervisor.id,
+                complaint_id=complaint.id,
+                message=f'Complaint #{complaint.id} was auto-escalated: {complaint.escalation_notes}'[:255],
+                link=f'/supervisor/complaint/{complaint.id}',
+            ))
+
+
+def sweep(batch_size=None, max_batches=None, dry_run=False):
+    """Escalate overdue complaints; returns {status: count} (would-be counts when dry_run)"""
+    if batch_size is None:
+        batch_size = current_app.config['SLA_BATCH_SIZE']
+    actor = system_actor()
+
+    now = datetime.utcnow()
+    escalated = {}
+    batches = 0
+    for status, (default_hours, department_hours) in deadlines().items():
+        escalated[status] = 0
+        if dry_run:
+            escalated[status] = count_overdue(status, default_hours, department_hours, now)
+            continue
+        while max_batches is None or batches < max_batches:
+            overdue = overdue_complaints(status, default_hours, department_hours, now, batch_size)
+            if not overdue:
+                break
+            for complaint in overdue:
+                hours = department_hours.get(complaint.department_id, default_hours)
+                stalled = now - complaint.updated_at
+                complaint.escalation_notes = (
+                    f'SLA breach: {status} for {stalled.days}d {stalled.seconds // 3600}h '
+                    f'(deadline {hours:g}h).')
+                complaint.update_status('Escalated', actor,
+                                        f'Automatically escalated by the SLA monitor. {complaint.escalation_notes}')
+            _notify_supervisors(overdue)
+            db.session.commit()
+            escalated[status] += len(overdue)
+            batches += 1
+            if len(overdue) < batch_size:
+                break
+    return escalated
@@ -0,0 +1,253 @@
+"""
+Slow-query log with EXPLAIN capture
+
+Statements that take longer than SLOW_QUERY_MS are written as JSON lines to
+a rotating log in SLOW_QUERY_LOG_DIR with their SQL, the shape of their
+bound parameters (types and sizes, never values), the route that ran them
+and the query plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN elsewhere). Plans
+that scan a whole table listed in SLOW_QUERY_SCAN_TABLES are flagged.
+
+Each process writes its own file (slow-<pid>.log, rotated at 5 MB), so
+gunicorn workers never rotate each other's logs; the admin report merges
+them. A statement's plan is captured at most once every PLAN_TTL seconds
+per process.
+"""
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.sql_stats import fingerprint
+
+logger = logging.getLogger('cctrs.slow_sql')
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+PLAN_TTL = 300
+MAX_PLANS = 1000
+RETENTION_DAYS = 14
+
+_settings = {}            # threshold, directory and watched tables from the app config
+_plans = {}               # fingerprint -> (captured_at, plan, full_scans)
+_handler_pid = None
+_lock = threading.Lock()
+
+# A bare SCAN reads the table itself; 'SCAN x USING [COVERING] INDEX' walks an index
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+# ── Capture ──────────────────────────────────────────────────────────────
+
+def _shape(value):
+    if isinstance(value, (str, bytes)):
+        return f'{type(value).__name__}({len(value)})'
+    if isinstance(value, (list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def parameter_shapes(parameters, executemany):
+    """Types (and lengths) of the bound parameters, without their values"""
+    if executemany:
+        return {'executemany': len(parameters)}
+    if isinstance(parameters, dict):
+        return {key: _shape(value) for key, value in parameters.items()}
+    return [_shape(value) for value in parameters or ()]
+
+
+def _table(name):
+    # SQLAlchemy aliases tables as <name>_1, <name>_2, ...
+    return re.sub(r'_\d+$', '', name)
+
+
+def explain(conn, statement, parameters):
+    """(plan lines, [tables read by a full scan]) using the connection's own DBAPI cursor"""
+    dialect = conn.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    # On Postgres a failed statement aborts the rest of the transaction, so
+    # EXPLAIN runs in a savepoint that is rolled back if it fails
+    savepoint = dialect != 'sqlite'
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+            columns = [c[0].lower() for c in cursor.description or ()]
+        except Exception:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+            raise
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+
+    plan, scanned = [], set()
+    for row in rows:
+        if dialect == 'sqlite':
+            detail = row[-1]
+            match = _SQLITE_SCAN.match(detail)
+            if match:
+                scanned.add(_table(match.group(1)))
+        elif dialect in ('mysql', 'mariadb'):
+            record = dict(zip(columns, row))
+            detail = ' '.join(f'{k}={v}' for k, v in record.items() if v is not None)
+            if str(record.get('type', '')).upper() == 'ALL' and record.get('table'):
+                scanned.add(_table(record['table']))
+        else:
+            detail = str(row[0])
+            match = _POSTGRES_SCAN.search(detail)
+            if match:
+                scanned.add(_table(match.group(1)))
+        plan.append(detail)
+    return plan, sorted(scanned & _settings['scan_tables'])
+
+
+def _plan_for(conn, statement, parameters, executemany):
+    if executemany or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None, []
+    key = fingerprint(statement)
+    cached = _plans.get(key)
+    if cached and time.monotonic() - cached[0] < PLAN_TTL:
+        return cached[1], cached[2]
+    if len(_plans) >= MAX_PLANS:
+        _plans.clear()
+    try:
+        plan, full_scans = explain(conn, statement, parameters)
+    except Exception as e:           # the plan is a diagnostic; never fail the query over it
+        plan, full_scans = [f'EXPLAIN failed: {e}'], []
+    _plans[key] = (time.monotonic(), plan, full_scans)
+    return plan, full_scans
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context: a statement that raises never
+    # reaches after_cursor_execute, and must not leave a timing behind
+    context._slow_query_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < _settings['threshold_ms']:
+        return
+    plan, full_scans = _plan_for(conn, statement, parameters, executemany)
+    route = None
+    if has_request_context():
+        route = {'endpoint': request.endpoint, 'method': request.method, 'path': request.path}
+    _write({
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+        'ms': round(elapsed_ms, 1),
+        'sql': statement,
+        'params': parameter_shapes(parameters, executemany),
+        'route': route,
+        'plan': plan,
+        'full_scans': full_scans,
+    })
+
+
+def _write(record):
+    global _handler_pid
+    with _lock:
+        if _handler_pid != os.getpid():
+            # First slow query in this process (or after a fork): own file
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            os.makedirs(_settings['directory'], exist_ok=True)
+            path = os.path.join(_settings['directory'], f'slow-{os.getpid()}.log')
+            logger.addHandler(RotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT))
+            _handler_pid = os.getpid()
+    logger.warning(json.dumps(record, default=str))
+
+
+# ── Wiring ───────────────────────────────────────────────────────────────
+
+def log_dir(app):
+    return app.config['SLOW_QUERY_LOG_DIR'] or os.path.join(app.instance_path, 'slow_queries')
+
+
+def init_app(app):
+    if app.config['SLOW_QUERY_MS'] <= 0:
+        return
+    _settings.update(
+        threshold_ms=app.config['SLOW_QUERY_MS'],
+        directory=log_dir(app),
+        scan_tables={t.strip() for t in app.config['SLOW_QUERY_SCAN_TABLES'].split(',') if t.strip()},
+    )
+    _prune(_settings['directory'])
+    if not event.contains(Engine, 'before_cursor_execute', _before_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_execute)
+
+
+def _prune(directory):
+    """Remove logs of processes that stopped writing more than RETENTION_DAYS ago"""
+    cutoff = time.time() - RETENTION_DAYS * 86400
+    for path in glob.glob(os.path.join(directory, 'slow-*.log*')):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# ── Report ───────────────────────────────────────────────────────────────
+
+def report(directory, days=7, limit=100):
+    """
+    Slow statements of the last `days` grouped by fingerprint, slowest total
+    first: [{'statement', 'count', 'avg_ms', 'max_ms', 'last_seen', 'routes',
+    'params', 'plan', 'full_scans'}]
+    """
+    since = (datetime.utcnow() - timedelta(days=days)).isoformat(timespec='seconds')
+    groups = {}
+    for path in glob.glob(os.path.join(directory, 'slow-*.log*')):
+        try:
+            with open(path) as f:
+                lines = deque(f, maxlen=20000)
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record['at'] < since:
+                continue
+            key = fingerprint(record['sql'])
+            group = groups.setdefault(key, {'statement': key, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                            'last_seen': '', 'routes': set(), 'params': None,
+                                            'plan': [], 'full_scans': []})
+            group['count'] += 1
+            group['total_ms'] += record['ms']
+            group['max_ms'] = max(group['max_ms'], record['ms'])
+            if record['route']:
+                group['routes'].add(f"{record['route']['method']} {record['route']['endpoint']}")
+            if record['at'] >= group['last_seen']:
+                group['last_seen'] = record['at']
+                group['params'] = record['params']
+                if record['plan']:
+                    group['plan'], group['full_scans'] = record['plan'], record['full_scans']
+
+    rows = sorted(groups.values(), key=lambda g: -g['total_ms'])[:limit]
+    for group in rows:
+        group['avg_ms'] = group['total_ms'] / group['count']
+        group['routes'] = sorted(group['routes'])
+    return rows
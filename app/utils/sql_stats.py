@@ -0,0 +1,278 @@
+"""
+Per-request SQL instrumentation and N+1 detection
+
+Engine events count every statement a request executes, time it and group it
+by fingerprint (the SQL with whitespace and IN-lists normalised). At the end
+of the request the totals are
+
+* sent back as a `Server-Timing` header (`db` and `app` durations),
+* logged as one JSON line on the `cctrs.sql` logger (WARNING when a likely
+  N+1 pattern was seen, INFO otherwise),
+* folded into per-endpoint aggregates for the admin SQL page.
+
+A SELECT fingerprint repeated SQL_N_PLUS_ONE_THRESHOLD times or more in one
+request is reported as a likely N+1. Each gunicorn worker periodically
+writes its aggregates to SQL_STATS_DIR, and the admin page merges every
+worker's file. When a worker exits, gunicorn.conf.py writes its last
+aggregates and folds its file into retired.json, so recycled workers
+neither vanish from the totals nor leave a file behind each.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('cctrs.sql')
+
+FLUSH_INTERVAL = 10          # seconds between writes of this worker's aggregates
+MAX_SUSPECTS = 5             # repeated statements kept per endpoint
+
+_aggregates = {}             # endpoint -> totals, see _fold()
+_lock = threading.Lock()
+_last_flush = 0.0
+_started_at = time.time()
+_reset_seen = _started_at
+
+RETIRED = 'retired.json'
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Statement text with whitespace collapsed and bound IN-lists reduced to (...)"""
+    return _IN_LIST.sub('(...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestStats:
+    """What one request did against the database"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[fingerprint(statement)] += 1
+
+    def suspects(self, threshold):
+        """[(fingerprint, count)] of SELECTs repeated at least `threshold` times"""
+        return [(fp, n) for fp, n in self.statements.most_common()
+                if n >= threshold and fp.upper().startswith('SELECT')]
+
+
+def current():
+    """RequestStats of the active request, or None outside an instrumented request"""
+    return g.get('sql_stats') if has_request_context() else None
+
+
+# ── Engine hooks ─────────────────────────────────────────────────────────
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, not the connection: a statement that raises
+    # never reaches after_cursor_execute, and must not skew the next one
+    if context is not None:
+        context._sql_stats_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_sql_stats_started', None)
+    if started is None:
+        return
+    stats = current()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+# ── Request hooks ────────────────────────────────────────────────────────
+
+def stats_dir(app):
+    return app.config['SQL_STATS_DIR'] or os.path.join(app.instance_path, 'sql_stats')
+
+
+def init_app(app):
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _before_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_execute)
+
+    @app.before_request
+    def _start():
+        g.sql_stats = RequestStats()
+
+    @app.after_request
+    def _finish(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None or request.endpoint in (None, 'static'):
+            return response
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_seconds * 1000
+        suspects = stats.suspects(app.config['SQL_N_PLUS_ONE_THRESHOLD'])
+
+        if app.config['SQL_SERVER_TIMING']:
+            response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{stats.queries} queries"')
+            response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+
+        record = {
+            'endpoint': request.endpoint, 'method': request.method, 'path': request.path,
+            'status': response.status_code, 'queries': stats.queries,
+            'db_ms': round(db_ms, 2), 'total_ms': round(total_ms, 2),
+            'n_plus_one': [{'statement': fp[:500], 'count': n} for fp, n in suspects],
+        }
+        logger.log(logging.WARNING if suspects else logging.INFO, json.dumps(record))
+
+        _fold(request.endpoint, stats, db_ms, suspects)
+        _flush_if_due(stats_dir(app))
+        return response
+
+
+# ── Aggregates ───────────────────────────────────────────────────────────
+
+def _empty():
+    return {'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'max_db_ms': 0.0,
+            'n_plus_one_requests': 0, 'suspects': {}}
+
+
+def _fold(endpoint, stats, db_ms, suspects):
+    with _lock:
+        totals = _aggregates.setdefault(endpoint, _empty())
+        totals['requests'] += 1
+        totals['queries'] += stats.queries
+        totals['max_queries'] = max(totals['max_queries'], stats.queries)
+        totals['db_ms'] += db_ms
+        totals['max_db_ms'] = max(totals['max_db_ms'], db_ms)
+        if suspects:
+            totals['n_plus_one_requests'] += 1
+            kept = totals['suspects']
+            for fp, n in suspects:
+                kept[fp] = max(kept.get(fp, 0), n)
+            if len(kept) > MAX_SUSPECTS:
+                totals['suspects'] = dict(sorted(kept.items(), key=lambda i: -i[1])[:MAX_SUSPECTS])
+
+
+def _flush_if_due(directory, force=False):
+    global _last_flush, _reset_seen
+    now = time.time()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    with _lock:
+        # Another worker may have reset the stats since our last write
+        try:
+            reset_at = os.path.getmtime(os.path.join(directory, 'RESET'))
+        except OSError:
+            reset_at = 0
+        if reset_at > _reset_seen:
+            _aggregates.clear()
+            _reset_seen = reset_at
+        payload = json.dumps({'pid': os.getpid(), 'started_at': _started_at, 'written_at': now,
+                              'endpoints': _aggregates})
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            f.write(payload)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        logger.warning('Could not write SQL stats to %s: %s', directory, e)
+
+
+def flush(directory):
+    """Write this worker's aggregates now (gunicorn worker_exit)"""
+    _flush_if_due(directory, force=True)
+
+
+def _merge(merged, endpoints):
+    for endpoint, totals in endpoints.items():
+        into = merged.setdefault(endpoint, _empty())
+        for key in ('requests', 'queries', 'db_ms', 'n_plus_one_requests'):
+            into[key] += totals[key]
+        for key in ('max_queries', 'max_db_ms'):
+            into[key] = max(into[key], totals[key])
+        for fp, n in totals['suspects'].items():
+            into['suspects'][fp] = max(into['suspects'].get(fp, 0), n)
+        if len(into['suspects']) > MAX_SUSPECTS:
+            into['suspects'] = dict(sorted(into['suspects'].items(), key=lambda i: -i[1])[:MAX_SUSPECTS])
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['endpoints']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def retire(directory, pid):
+    """Fold an exited worker's aggregates into retired.json and remove its file (gunicorn master)"""
+    path = os.path.join(directory, f'{pid}.json')
+    endpoints = _load(path)
+    if endpoints is None:
+        return
+    retired_path = os.path.join(directory, RETIRED)
+    merged = _load(retired_path) or {}
+    _merge(merged, endpoints)
+    try:
+        with open(retired_path + '.tmp', 'w') as f:
+            json.dump({'written_at': time.time(), 'endpoints': merged}, f)
+        os.replace(retired_path + '.tmp', retired_path)
+        os.remove(path)
+    except OSError as e:
+        logger.warning('Could not retire SQL stats of worker %s: %s', pid, e)
+
+
+def summary(directory):
+    """
+    Aggregates of every worker that wrote to `directory` (this one flushed
+    first), as a list of per-endpoint dicts, most queries per request first
+    """
+    _flush_if_due(directory, force=True)
+    merged, workers = {}, 0
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        if not name.endswith('.json'):
+            continue
+        endpoints = _load(os.path.join(directory, name))
+        if endpoints is None:
+            continue
+        workers += name != RETIRED
+        _merge(merged, endpoints)
+
+    rows = []
+    for endpoint, totals in merged.items():
+        requests = totals['requests'] or 1
+        rows.append({
+            'endpoint': endpoint,
+            'requests': totals['requests'],
+            'avg_queries': totals['queries'] / requests,
+            'max_queries': totals['max_queries'],
+            'avg_db_ms': totals['db_ms'] / requests,
+            'max_db_ms': totals['max_db_ms'],
+            'n_plus_one_requests': totals['n_plus_one_requests'],
+            'suspects': sorted(totals['suspects'].items(), key=lambda i: -i[1])[:MAX_SUSPECTS],
+        })
+    rows.sort(key=lambda r: (-r['avg_queries'], -r['avg_db_ms']))
+    return rows, workers
+
+
+def reset(directory):
+    """Start the aggregates over; other workers drop theirs on their next write"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'RESET'), 'w') as f:
+        f.write(str(time.time()))
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    _flush_if_due(directory, force=True)
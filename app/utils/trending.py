@@ -0,0 +1,143 @@
+"""
+Trending ranking for the public feed
+
+A public complaint's trending_score is the sum of its upvotes from the last
+TRENDING_WINDOW_DAYS, each weighing 2^(-age / TRENDING_HALF_LIFE_HOURS),
+times a weight for its status (TRENDING_STATUS_WEIGHTS, so open and
+escalated complaints outrank resolved ones). "Top this week" in the feed
+reads it one page at a time from the (is_public, trending_score, id) index.
+
+Scores are stored as of trending_at and kept current two ways:
+* incrementally: each upvote batch written by app/utils/upvotes.py decays
+  the touched complaints' scores to now and adds the new upvotes, and a
+  status change rescales the score by the ratio of the status weights (or,
+  leaving a status that weighs 0, recounts the upvotes in the window);
+* in batches: `flask trending-decay` (cron, or --interval) recomputes every
+  scored complaint from its upvotes, so the scores of complaints nobody is
+  upvoting keep decaying and drop out once their upvotes leave the window.
+  Between runs such scores are overstated by at most one run interval of
+  decay.
+"""
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event, inspect, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Complaint, Upvote
+
+
+def _decay(age, half_life_hours):
+    return 0.5 ** (max(age.total_seconds(), 0) / 3600 / half_life_hours)
+
+
+def weight(status):
+    return float(current_app.config['TRENDING_STATUS_WEIGHTS'].get(status, 0))
+
+
+# ── Incremental updates ──────────────────────────────────────────────────
+
+def add_upvotes(counts, now=None):
+    """
+    Decay the scores of the complaints in `counts` ({complaint id: new
+    upvotes}) to now and add their new upvotes; the caller commits
+    """
+    now = now or datetime.utcnow()
+    half_life = current_app.config['TRENDING_HALF_LIFE_HOURS']
+    rows = db.session.execute(
+        select(Complaint.id, Complaint.current_status, Complaint.trending_at).where(Complaint.id.in_(counts))
+    ).all()
+    for complaint_id, status, scored_at in rows:
+        decay = _decay(now - scored_at, half_life) if scored_at else 0.0
+        # Only if no batch run rescored the row since we read trending_at
+        unchanged = Complaint.trending_at == scored_at if scored_at else Complaint.trending_at.is_(None)
+        result = db.session.execute(
+            update(Complaint).where(Complaint.id == complaint_id, unchanged)
+            .values(trending_score=Complaint.trending_score * decay + counts[complaint_id] * weight(status),
+                    trending_at=now, updated_at=Complaint.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            rescore([complaint_id], now)
+
+
+@event.listens_for(Session, 'before_flush')
+def _reweigh_status_changes(session, flush_context, instances):
+    # Rescaled in the UPDATE itself, so upvotes counted meanwhile are kept
+    for obj in session.dirty:
+        if not isinstance(obj, Complaint) or not has_app_context():
+            continue
+        history = inspect(obj).attrs.current_status.history
+        if not history.deleted:
+            continue
+        old, new = weight(history.deleted[0]), weight(obj.current_status)
+        if old and old != new:
+            obj.trending_score = Complaint.trending_score * (new / old)
+        elif not old and new and obj.is_public and obj.upvote_count:
+            # A zero score has nothing to rescale: recount its upvotes
+            now = datetime.utcnow()
+            obj.trending_score = _window_totals([obj.id], now)[obj.id] * new
+            obj.trending_at = now
+
+
+# ── Batch re-decay ───────────────────────────────────────────────────────
+
+def _window_totals(complaint_ids, now):
+    """{complaint id: decayed upvotes in the window}, before the status weight"""
+    config = current_app.config
+    since = now - timedelta(days=config['TRENDING_WINDOW_DAYS'])
+    totals = dict.fromkeys(complaint_ids, 0.0)
+    for complaint_id, created_at in db.session.execute(
+            select(Upvote.complaint_id, Upvote.created_at)
+            .where(Upvote.complaint_id.in_(totals), Upvote.created_at >= since)):
+        totals[complaint_id] += _decay(now - created_at, config['TRENDING_HALF_LIFE_HOURS'])
+    return totals
+
+
+def rescore(complaint_ids, now=None):
+    """Recompute the scores of these complaints from their upvotes in the window; the caller commits"""
+    if not complaint_ids:
+        return
+    now = now or datetime.utcnow()
+    totals = _window_totals(complaint_ids, now)
+    statuses = dict(db.session.execute(
+        select(Complaint.id, Complaint.current_status)
+        .where(Complaint.id.in_(totals), Complaint.is_public.is_(True))
+    ).all())
+
+    table = Complaint.__table__
+    db.session.execute(
+        update(table).where(table.c.id == bindparam('complaint_id'))
+        .values(trending_score=bindparam('score'), trending_at=now, updated_at=table.c.updated_at),
+        [{'complaint_id': complaint_id, 'score': total * weight(statuses[complaint_id])
+          if complaint_id in statuses else 0.0}
+         for complaint_id, total in totals.items()]
+    )
+
+
+def decay_all(batch_size=None, rebuild=False):
+    """
+    Rescore every complaint with a trending score, in batches of one
+    transaction each; with rebuild=True also every complaint upvoted in the
+    window (after a migration, or if scores were edited by hand). Returns
+    the number rescored.
+    """
+    batch_size = batch_size or current_app.config['TRENDING_BATCH_SIZE']
+    now = datetime.utcnow()
+    ids = set(db.session.execute(
+        select(Complaint.id).where(Complaint.is_public.is_(True), Complaint.trending_score > 0)
+    ).scalars())
+    if rebuild:
+        since = now - timedelta(days=current_app.config['TRENDING_WINDOW_DAYS'])
+        ids.update(db.session.execute(
+            select(Upvote.complaint_id).where(Upvote.created_at >= since).distinct()
+        ).scalars())
+
+    ids = sorted(ids)
+    for start in range(0, len(ids), batch_size):
+        try:
+            rescore(ids[start:start + batch_size], now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return len(ids)
@@ -0,0 +1,232 @@
+"""
+Write-behind upvotes
+
+A viral complaint collects upvotes faster than one transaction per click
+can keep up with. Upvotes are instead queued in this process, deduplicated
+per (user, complaint), and a background thread writes them every
+UPVOTE_FLUSH_INTERVAL seconds, or as soon as UPVOTE_FLUSH_SIZE are
+pending: one INSERT for the batch and one UPDATE recounting
+complaints.upvote_count for the complaints it touched, whose trending
+scores (app/utils/trending.py) and work-queue priorities
+(app/utils/work_queue.py) are brought up to date too. The unique
+(user_id, complaint_id) index keeps a vote cast through two workers from
+being stored twice.
+
+The voter sees their own upvote straight away: the complaints they upvoted
+recently are kept in their session cookie and added to what the database
+says (see state()). Everyone else sees it after the next flush. Pending
+upvotes are flushed when the process exits normally; a killed worker loses
+at most one interval's worth.
+
+UPVOTE_FLUSH_INTERVAL = 0 writes each upvote in its own request instead.
+"""
+import atexit
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import abort, current_app, has_request_context, session
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Complaint, Upvote
+from app.utils import trending, work_queue
+
+logger = logging.getLogger('cctrs.upvotes')
+
+SESSION_KEY = '_upvoted'
+OWN_UPVOTE_SECONDS = 300    # how long a voter's session remembers an upvote
+MAX_OWN_UPVOTES = 50
+
+_pending = {}           # (user_id, complaint_id) -> created_at
+_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+
+
+# ── Voting ───────────────────────────────────────────────────────────────
+
+def cast(user_id, complaint_id):
+    """
+    Upvote a complaint for `user_id`. Returns (whether the upvote is new,
+    upvote count as the voter now sees it), or None if the complaint is
+    private; 404s for unknown complaints.
+    """
+    upvoted = select(Upvote.id).where(Upvote.user_id == user_id,
+                                      Upvote.complaint_id == Complaint.id).exists()
+    row = db.session.execute(select(Complaint.is_public, Complaint.upvote_count, upvoted)
+                             .where(Complaint.id == complaint_id)).first()
+    if row is None:
+        abort(404)
+    is_public, count, stored = row
+    if not is_public:
+        return None
+    if stored:
+        return False, count
+    if complaint_id in recent(user_id):
+        return False, count + 1
+    add(user_id, complaint_id)
+    return True, count + 1
+
+
+def add(user_id, complaint_id):
+    """Queue an upvote (or write it now when buffering is off) and remember it in the session"""
+    app = current_app._get_current_object()
+    if has_request_context():
+        _remember(user_id, complaint_id)
+    if app.config['UPVOTE_FLUSH_INTERVAL'] <= 0:
+        try:
+            _write({(user_id, complaint_id): datetime.utcnow()})
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()   # a concurrent request stored it first
+        return
+    with _lock:
+        _pending.setdefault((user_id, complaint_id), datetime.utcnow())
+        size = len(_pending)
+    _start_flusher(app)
+    if size >= app.config['UPVOTE_FLUSH_SIZE']:
+        _wake.set()
+
+
+def _remember(user_id, complaint_id):
+    now = time.time()
+    entries = [entry for entry in session.get(SESSION_KEY, [])
+               if entry[2] > now and entry[:2] != [user_id, complaint_id]]
+    entries.append([user_id, complaint_id, now + OWN_UPVOTE_SECONDS])
+    session[SESSION_KEY] = entries[-MAX_OWN_UPVOTES:]
+
+
+def recent(user_id):
+    """Ids of complaints `user_id` upvoted from this session lately, stored or not"""
+    if not has_request_context():
+        return set()
+    now = time.time()
+    return {entry[1] for entry in session.get(SESSION_KEY, []) if entry[0] == user_id and entry[2] > now}
+
+
+def state(complaints, user_id=None):
+    """
+    {complaint id: (upvote count, whether user_id upvoted it)} for a page
+    of complaints, including the user's own upvotes still waiting to be
+    written
+    """
+    ids = [complaint.id for complaint in complaints]
+    stored, own = set(), set()
+    if user_id is not None and ids:
+        stored = set(db.session.execute(
+            select(Upvote.complaint_id).where(Upvote.user_id == user_id, Upvote.complaint_id.in_(ids))
+        ).scalars())
+        own = recent(user_id) - stored
+    return {complaint.id: (complaint.upvote_count + (complaint.id in own),
+                           complaint.id in stored or complaint.id in own)
+            for complaint in complaints}
+
+
+# ── Writing ──────────────────────────────────────────────────────────────
+
+def recount(complaint_ids):
+    """Set upvote_count (and the work-queue priority) of these complaints from the upvotes table; the caller commits"""
+    if not complaint_ids:
+        return
+    total = select(func.count(Upvote.id)).where(Upvote.complaint_id == Complaint.id).scalar_subquery()
+    # updated_at is kept as is: an upvote is not a change to the complaint
+    db.session.execute(
+        update(Complaint).where(Complaint.id.in_(list(complaint_ids)))
+        .values(upvote_count=total, updated_at=Complaint.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    work_queue.refresh(complaint_ids)
+
+
+def _write(batch):
+    """Insert the upvotes in `batch` that are new, for complaints still public; the caller commits"""
+    live = set(db.session.execute(
+        select(Complaint.id).where(Complaint.id.in_({c for _, c in batch}), Complaint.is_public)
+    ).scalars())
+    stored = set(db.session.execute(
+        select(Upvote.user_id, Upvote.complaint_id)
+        .where(Upvote.complaint_id.in_(live), Upvote.user_id.in_({u for u, _ in batch}))
+    ).tuples())
+    rows = [{'user_id': user_id, 'complaint_id': complaint_id, 'created_at': created_at}
+            for (user_id, complaint_id), created_at in batch.items()
+            if complaint_id in live and (user_id, complaint_id) not in stored]
+    if rows:
+        db.session.execute(insert(Upvote), rows)
+        recount({row['complaint_id'] for row in rows})
+        trending.add_upvotes(Counter(row['complaint_id'] for row in rows))
+    return len(rows)
+
+
+def flush(batch_size=None):
+    """Write every pending upvote of this process in batches; returns the number stored"""
+    batch_size = batch_size or current_app.config['UPVOTE_FLUSH_SIZE']
+    written = 0
+    while True:
+        with _lock:
+            batch = dict(itertools.islice(_pending.items(), batch_size))
+            for key in batch:
+                del _pending[key]
+        if not batch:
+            return written
+        try:
+            written += _write(batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            with _lock:
+                for key, created_at in batch.items():
+                    _pending.setdefault(key, created_at)
+            if isinstance(e, IntegrityError):
+                # Another worker stored one of these first; the retry skips it
+                logger.info('Upvote batch raced another writer, retrying next flush')
+                return written
+            raise
+
+
+def pending():
+    return len(_pending)
+
+
+def _flush_in(app):
+    with app.app_context():
+        try:
+            written = flush()
+        except Exception:
+            logger.exception('Upvote flush failed; %d upvote(s) kept for the next attempt', pending())
+            return
+        if written:
+            logger.debug('Stored %d upvote(s)', written)
+
+
+def _run(app):
+    interval = app.config['UPVOTE_FLUSH_INTERVAL']
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        _flush_in(app)
+
+
+def _start_flusher(app):
+    # Started on first use, so never in a preloading gunicorn master
+    # (threads do not survive fork)
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, args=(app,), name='upvote-flush', daemon=True)
+            _flusher.start()
+            atexit.register(_flush_in, app)
+
+
+def _reset_after_fork():
+    global _pending, _lock, _wake, _flusher
+    _pending, _lock, _wake, _flusher = {}, threading.Lock(), threading.Event(), None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
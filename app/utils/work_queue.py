@@ -0,0 +1,192 @@
+"""
+Officer work queue: a department's open complaints, most urgent first
+
+Every open complaint falls due a set time after it entered its current
+status (updated_at, as for the SLA monitor): its SLA deadline
+(SLA_DEADLINES_HOURS) or, in statuses the monitor does not watch,
+WORK_QUEUE_TARGET_HOURS. Upvotes and being Escalated bring the due time
+forward; the escalation boost ends when the complaint leaves Escalated.
+The queue ranks by due time, stored as Complaint.priority and read from the
+(department_id, priority) index, so the top N cost O(N) however many
+complaints the department has.
+
+All complaints age at the same rate, so the order between two of them only
+changes when one of them does, never with the clock. Priority is recomputed
+when complaints are flushed (status, department or escalation changes) and
+when upvote counts are written (app/utils/upvotes.py); no periodic job is
+needed. `flask work-queue-rebuild` recomputes every open complaint after a
+migration or a change to the SLA or work-queue settings.
+
+Claims are conditional UPDATEs (only while the complaint is open and
+unassigned), as in app/utils/assignment.py, so two officers can never claim
+the same complaint.
+"""
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event, inspect, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models import Complaint
+from app.utils import sla
+
+QUEUE_STATUSES = ('Under Review', 'Assigned', 'In Progress', 'On Hold', 'Escalated')
+DEFAULT_TARGET_HOURS = 72
+MAX_QUEUE_SIZE = 100
+SCOPES = {'next': 'Mine and unassigned', 'mine': 'Assigned to me',
+          'unassigned': 'Unassigned', 'department': 'Whole department'}
+
+# Priority is the number of hours between the due time and this instant,
+# so the most urgent complaint has the highest priority
+_HORIZON = datetime(2100, 1, 1)
+_CLAIM_CANDIDATES = 10
+
+
+def due_at(priority):
+    return _HORIZON - timedelta(hours=priority)
+
+
+def is_escalated(complaint):
+    # Not escalation_notes: they are kept after the escalation is resolved
+    return complaint.current_status == 'Escalated'
+
+
+def compute(complaint, since, deadlines):
+    """Priority of `complaint` had it entered its status at `since`; None when it is not open"""
+    if complaint.current_status not in QUEUE_STATUSES:
+        return None
+    config = current_app.config
+    if complaint.current_status in deadlines:
+        default_hours, department_hours = deadlines[complaint.current_status]
+        hours = department_hours.get(complaint.department_id, default_hours)
+    else:
+        hours = float(config['WORK_QUEUE_TARGET_HOURS'].get(complaint.current_status, DEFAULT_TARGET_HOURS))
+    hours -= min((complaint.upvote_count or 0) * config['WORK_QUEUE_UPVOTE_HOURS'],
+                 config['WORK_QUEUE_MAX_UPVOTE_HOURS'])
+    if is_escalated(complaint):
+        hours -= config['WORK_QUEUE_ESCALATION_HOURS']
+    return (_HORIZON - since - timedelta(hours=hours)).total_seconds() / 3600
+
+
+# ── Keeping priorities current ───────────────────────────────────────────
+
+@event.listens_for(Session, 'before_flush')
+def _reprioritize_changes(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Complaint)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Complaint) and session.is_modified(obj, include_collections=False)]
+    if not changed or not has_app_context():
+        return
+    deadlines = sla.deadlines()
+    now = datetime.utcnow()
+    for obj in changed:
+        # Unless set explicitly, updated_at becomes now in this flush
+        explicit = obj.updated_at is not None and (
+            inspect(obj).pending or inspect(obj).attrs.updated_at.history.has_changes())
+        obj.priority = compute(obj, obj.updated_at if explicit else now, deadlines)
+
+
+def refresh(complaint_ids):
+    """Recompute the priority of these complaints from their stored rows; the caller commits"""
+    if not complaint_ids:
+        return
+    deadlines = sla.deadlines()
+    rows = db.session.execute(
+        select(Complaint.id, Complaint.current_status, Complaint.department_id, Complaint.updated_at,
+               Complaint.upvote_count)
+        .where(Complaint.id.in_(list(complaint_ids)))
+    ).all()
+    if not rows:
+        return
+    table = Complaint.__table__
+    db.session.execute(
+        update(table).where(table.c.id == bindparam('complaint_id'))
+        .values(priority=bindparam('value'), updated_at=table.c.updated_at),
+        [{'complaint_id': row.id, 'value': compute(row, row.updated_at, deadlines)} for row in rows]
+    )
+
+
+def rebuild(batch_size=None):
+    """Recompute the priority of every open (or formerly queued) complaint in batches; returns the count"""
+    batch_size = batch_size or current_app.config['WORK_QUEUE_BATCH_SIZE']
+    total = last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(Complaint.id)
+            .where(Complaint.id > last_id,
+                   or_(Complaint.current_status.in_(QUEUE_STATUSES), Complaint.priority.isnot(None)))
+            .order_by(Complaint.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        try:
+            refresh(ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        total += len(ids)
+        last_id = ids[-1]
+
+
+# ── Reading and claiming ─────────────────────────────────────────────────
+
+def _in_scope(stmt, officer_id, scope):
+    if scope == 'next':
+        return stmt.where(or_(Complaint.assigned_officer_id == officer_id,
+                              Complaint.assigned_officer_id.is_(None)))
+    if scope == 'mine':
+        return stmt.where(Complaint.assigned_officer_id == officer_id)
+    if scope == 'unassigned':
+        return stmt.where(Complaint.assigned_officer_id.is_(None))
+    return stmt
+
+
+def fetch(department_id, officer_id, scope='next', limit=None):
+    """The department's most urgent open complaints in `scope` (one of SCOPES)"""
+    limit = limit or current_app.config['WORK_QUEUE_SIZE']
+    stmt = select(Complaint).where(Complaint.department_id == department_id, Complaint.priority.isnot(None))
+    stmt = _in_scope(stmt, officer_id, scope)
+    return db.session.execute(
+        stmt.order_by(Complaint.priority.desc(), Complaint.id.desc()).limit(limit)
+    ).scalars().all()
+
+
+def claim(complaint_id, officer):
+    """
+    Take an open, unassigned complaint of the officer's department. Returns
+    the complaint, or None when it is closed, assigned or was claimed by
+    someone else first. Under Review complaints move to Assigned. The caller
+    commits.
+    """
+    claimed = db.session.execute(
+        update(Complaint)
+        .where(Complaint.id == complaint_id, Complaint.department_id == officer.department_id,
+               Complaint.priority.isnot(None), Complaint.assigned_officer_id.is_(None))
+        .values(assigned_officer_id=officer.id, updated_at=Complaint.updated_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        return None
+    complaint = db.session.get(Complaint, complaint_id)
+    set_committed_value(complaint, 'assigned_officer_id', officer.id)
+    if complaint.current_status == 'Under Review':
+        complaint.update_status('Assigned', officer, 'Claimed from the work queue.')
+    return complaint
+
+
+def claim_next(officer):
+    """Claim the most urgent unassigned complaint, skipping any claimed meanwhile; None when there is none"""
+    while True:
+        candidates = db.session.execute(
+            select(Complaint.id)
+            .where(Complaint.department_id == officer.department_id, Complaint.priority.isnot(None),
+                   Complaint.assigned_officer_id.is_(None))
+            .order_by(Complaint.priority.desc(), Complaint.id.desc()).limit(_CLAIM_CANDIDATES)
+        ).scalars().all()
+        if not candidates:
+            return None
+        for complaint_id in candidates:
+            complaint = claim(complaint_id, officer)
+            if complaint is not None:
+                return complaint
@@ -0,0 +1,340 @@
+"""
+Endpoint benchmark suite with per-role latency budgets
+
+Generates datasets of several sizes with database/generate_dataset.py (cached
+between runs), then drives the Flask test client with a realistic role mix:
+citizens submitting and viewing, officers updating status, moderators
+verifying, staff dashboards and anonymous visitors on the public pages.
+
+For every endpoint it reports p50/p95/p99 latency, SQL statements per
+request and peak RSS with warm caches (each page is requested once, unmeasured,
+first), and compares them with benchmarks/budgets.json. Each size is run
+--runs times (default 3) on fresh copies of the dataset and latency is the
+median across runs. The exit status is 1 when any endpoint is over budget, so
+this can gate CI.
+
+Run: python benchmarks/endpoints.py                       # sizes 1000 10000
+     python benchmarks/endpoints.py --sizes 1000 10000 100000 --requests 30
+     python benchmarks/endpoints.py --update-budgets       # record new budgets
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS_FILE = os.path.join(ROOT, 'benchmarks', 'budgets.json')
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'cctrs-bench-data')
+PASSWORD = 'password123'
+
+# Headroom applied when recording budgets with --update-budgets
+LATENCY_HEADROOM = 2.0
+LATENCY_MIN_HEADROOM_MS = 5    # sub-millisecond pages still get room for timer noise
+RSS_HEADROOM = 1.25
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (falls back to peak RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ── Worker: runs inside a subprocess against one dataset ─────────────────
+
+def build_scenarios(app, seed):
+    """Return [(label, role, method, path_fn, form_fn)] with data pools filled"""
+    from app.models import User, Complaint
+    from app.utils import public_feed
+
+    rng = random.Random(seed)
+    with app.app_context():
+        citizen = User.query.filter_by(role='citizen').order_by(User.id).first()
+        own_ids = [c.id for c in Complaint.query.filter_by(citizen_id=citizen.id)
+                   .with_entities(Complaint.id).limit(200)]
+        assigned = Complaint.query.filter_by(current_status='Assigned')\
+                                  .order_by(Complaint.id).first()
+        officer = User.query.filter_by(role='officer', department_id=assigned.department_id)\
+                            .order_by(User.id).first()
+        officer_pool = [c.id for c in Complaint.query.filter_by(
+            current_status='Assigned', department_id=officer.department_id)
+            .with_entities(Complaint.id).limit(1000)]
+        dept_ids = [c.id for c in Complaint.query.filter_by(department_id=officer.department_id)
+                    .filter(Complaint.current_status != 'Draft')
+                    .with_entities(Complaint.id).limit(500)]
+        moderator_pool = [c.id for c in Complaint.query.filter_by(current_status='Submitted')
+                          .with_entities(Complaint.id).limit(1000)]
+        public_ids = [c.id for c in Complaint.query.filter_by(is_public=True)
+                      .with_entities(Complaint.id).limit(500)]
+        # A cursor near the end of the public feed: the deepest page a reader can scroll to
+        oldest = Complaint.query.filter_by(is_public=True).filter(Complaint.current_status != 'Draft')\
+                                .order_by(Complaint.created_at, Complaint.id).offset(10).first()
+        deep_cursor = public_feed.encode_cursor('new', oldest.created_at, oldest.id) if oldest else ''
+        supervisor = User.query.filter_by(role='supervisor', department_id=officer.department_id).first()
+        users = {
+            'citizen': citizen.username,
+            'officer': officer.username,
+            'moderator': User.query.filter_by(role='moderator').first().username,
+            'supervisor': supervisor.username if supervisor else None,
+            'auditor': User.query.filter_by(role='auditor').first().username,
+            'admin': User.query.filter_by(role='admin').first().username,
+        }
+        department_id = officer.department_id
+
+    def pop(pool):
+        return pool.pop() if pool else 0
+
+    submit_form = lambda: {
+        'title': f'Benchmark complaint {rng.randint(1, 10**6)}',
+        'description': 'Synthetic complaint submitted by the endpoint benchmark suite.',
+        'department_id': str(department_id), 'latitude': '33.68', 'longitude': '73.04',
+        'is_public': '1',
+    }
+    scenarios = [
+        ('anon GET /public', None, 'GET', lambda: '/public', None),
+        ('anon GET /public/complaints', None, 'GET', lambda: '/public/complaints', None),
+        ('anon GET /public/api/complaints (deep cursor)', None, 'GET',
+         lambda: f'/public/api/complaints?cursor={deep_cursor}', None),
+        ('anon GET /public/department/<id>', None, 'GET', lambda: f'/public/department/{department_id}', None),
+        ('citizen GET /citizen/dashboard', 'citizen', 'GET', lambda: '/citizen/dashboard', None),
+        ('citizen GET /citizen/complaints', 'citizen', 'GET', lambda: '/citizen/complaints', None),
+        ('citizen GET /citizen/complaint/<id>', 'citizen', 'GET',
+         lambda: f'/citizen/complaint/{rng.choice(own_ids)}', None),
+        ('citizen POST /citizen/submit', 'citizen', 'POST', lambda: '/citizen/submit', submit_form),
+        ('officer GET /officer/dashboard', 'officer', 'GET', lambda: '/officer/dashboard', None),
+        ('officer GET /officer/api/queue', 'officer', 'GET', lambda: '/officer/api/queue?limit=50', None),
+        ('officer POST /officer/api/queue/claim', 'officer', 'POST', lambda: '/officer/api/queue/claim', None),
+        ('officer GET /officer/complaint/<id>', 'officer', 'GET',
+         lambda: f'/officer/complaint/{rng.choice(dept_ids)}', None),
+        ('officer POST /officer/update_status/<id>', 'officer', 'POST',
+         lambda: f'/officer/update_status/{pop(officer_pool)}',
+         lambda: {'new_status': 'In Progress', 'notes': 'Benchmark update'}),
+        ('moderator GET /moderator/dashboard', 'moderator', 'GET', lambda: '/moderator/dashboard', None),
+        ('moderator POST /moderator/verify/<id>', 'moderator', 'POST',
+         lambda: f'/moderator/verify/{pop(moderator_pool)}', lambda: {'notes': 'Benchmark verify'}),
+        ('supervisor GET /supervisor/dashboard', 'supervisor', 'GET', lambda: '/supervisor/dashboard', None),
+        ('auditor GET /auditor/dashboard', 'auditor', 'GET', lambda: '/auditor/dashboard', None),
+        ('admin GET /admin/dashboard', 'admin', 'GET', lambda: '/admin/dashboard', None),
+        ('admin GET /admin/reports', 'admin', 'GET', lambda: '/admin/reports', None),
+    ]
+    if public_ids:
+        scenarios.append(('citizen POST /public/complaint/<id>/upvote', 'citizen', 'POST',
+                          lambda: f'/public/complaint/{public_ids.pop()}/upvote' if public_ids
+                          else '/public/complaint/0/upvote', None))
+    return [s for s in scenarios if s[1] is None or users[s[1]]], users
+
+
+def run_worker(db_path, requests, seed):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'      # measure the endpoints, not the limiter
+    # Steady state: caches are warmed below and must not expire mid-run, and
+    # version stamps live beside the database copy rather than in instance/
+    os.environ['IDENTITY_CACHE_TTL'] = '3600'
+    os.environ['REFERENCE_CACHE_TTL'] = '3600'
+    os.environ['REFERENCE_CACHE_DIR'] = os.path.join(os.path.dirname(db_path), 'reference_cache')
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    from app import create_app, db
+
+    app = create_app('production')
+    app.config['TESTING'] = True
+    statements = {'n': 0}
+    request_thread = threading.get_ident()
+
+    def count(*args, **kwargs):
+        # Background work (the upvote flusher) is not part of any request
+        if threading.get_ident() == request_thread:
+            statements['n'] += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+
+    scenarios, users = build_scenarios(app, seed)
+    clients = {None: app.test_client()}
+    for role, username in users.items():
+        if username:
+            client = app.test_client()
+            client.post('/auth/login', data={'username': username, 'password': PASSWORD})
+            clients[role] = client
+
+    # One unmeasured pass over the pages fills the identity and reference
+    # caches, so the first sample of an endpoint doesn't pay for loading them
+    for label, role, method, path_fn, form_fn in scenarios:
+        if method == 'GET':
+            clients[role].get(path_fn())
+
+    # Interleave endpoints so caches and the DB see a mixed workload
+    plan = [s for s in scenarios for _ in range(requests)]
+    random.Random(seed).shuffle(plan)
+
+    samples = {label: {'ms': [], 'queries': [], 'rss': 0.0, 'errors': 0} for label, *_ in scenarios}
+    for label, role, method, path_fn, form_fn in plan:
+        client = clients[role]
+        path = path_fn()
+        statements['n'] = 0
+        start = time.perf_counter()
+        if method == 'GET':
+            response = client.get(path)
+        else:
+            response = client.post(path, data=form_fn() if form_fn else None)
+        elapsed = (time.perf_counter() - start) * 1000
+        s = samples[label]
+        s['ms'].append(elapsed)
+        s['queries'].append(statements['n'])
+        s['rss'] = max(s['rss'], current_rss_mb())
+        if response.status_code >= 500:
+            s['errors'] += 1
+
+    results = {}
+    for label, s in samples.items():
+        results[label] = {
+            'p50_ms': round(statistics.median(s['ms']), 2),
+            'p95_ms': round(percentile(s['ms'], 95), 2),
+            'p99_ms': round(percentile(s['ms'], 99), 2),
+            'queries': max(s['queries']),
+            'rss_mb': round(s['rss'], 1),
+            'errors': s['errors'],
+        }
+    print(json.dumps(results))
+
+
+# ── Orchestrator ─────────────────────────────────────────────────────────
+
+def schema_fingerprint():
+    """Short hash of the files that shape a generated dataset"""
+    digest = hashlib.sha1()
+    for name in ('app/models.py', 'database/generate_dataset.py'):
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:8]
+
+
+def dataset_for(size, seed):
+    """Path to a pristine generated dataset of the given size (cached per schema)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'complaints-{size}-seed{seed}-{schema_fingerprint()}.db')
+    if not os.path.exists(path):
+        print(f'Generating {size:,}-complaint dataset...')
+        subprocess.run([sys.executable, 'database/generate_dataset.py',
+                        '--complaints', str(size), '--seed', str(seed), '--reset',
+                        '--database-url', f'sqlite:///{path}'],
+                       cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return path
+
+
+def run_once(size, requests, seed):
+    """Benchmark one fresh copy of the dataset in a worker process; returns its results"""
+    pristine = dataset_for(size, seed)
+    workdir = tempfile.mkdtemp(prefix='cctrs-bench-')
+    db_path = os.path.join(workdir, 'bench.db')
+    shutil.copy(pristine, db_path)   # runs write, so always start from a clean copy
+    try:
+        out = subprocess.run([sys.executable, __file__, '--worker', db_path,
+                              '--requests', str(requests), '--seed', str(seed)],
+                             cwd=ROOT, check=True, capture_output=True, text=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def combine(runs):
+    """Median latency over runs, so one noisy run doesn't decide; worst queries, RSS and errors"""
+    results = {}
+    for label in runs[0]:
+        rs = [run[label] for run in runs]
+        results[label] = {
+            'p50_ms': round(statistics.median(r['p50_ms'] for r in rs), 2),
+            'p95_ms': round(statistics.median(r['p95_ms'] for r in rs), 2),
+            'p99_ms': round(statistics.median(r['p99_ms'] for r in rs), 2),
+            'queries': max(r['queries'] for r in rs),
+            'rss_mb': max(r['rss_mb'] for r in rs),
+            'errors': sum(r['errors'] for r in rs),
+        }
+    return results
+
+
+def check_budget(result, budget):
+    """Return a list of human-readable budget violations"""
+    problems = []
+    if result['errors']:
+        problems.append(f"{result['errors']} server error(s)")
+    for key in ('p95_ms', 'queries', 'rss_mb'):
+        if key in budget and result[key] > budget[key]:
+            problems.append(f'{key} {result[key]} > {budget[key]}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark endpoints against stored budgets')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--requests', type=int, default=40, help='requests per endpoint')
+    parser.add_argument('--runs', type=int, default=3, help='worker runs per size (latency is their median)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--update-budgets', action='store_true')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.requests, args.seed)
+        return
+
+    budgets = {}
+    if os.path.exists(BUDGETS_FILE):
+        with open(BUDGETS_FILE) as f:
+            budgets = json.load(f)
+
+    failures = 0
+    for size in args.sizes:
+        results = combine([run_once(size, args.requests, args.seed) for _ in range(max(1, args.runs))])
+
+        size_budgets = budgets.setdefault(str(size), {})
+        print(f'\n== {size:,} complaints, {args.requests} requests per endpoint, median of {max(1, args.runs)} run(s)')
+        print(f"{'endpoint':<48}{'p50':>8}{'p95':>8}{'p99':>8}{'SQL':>6}{'RSS MB':>8}  budget")
+        for label, r in results.items():
+            budget = size_budgets.get(label)
+            if args.update_budgets:
+                size_budgets[label] = {
+                    'p95_ms': round(max(r['p95_ms'] * LATENCY_HEADROOM,
+                                        r['p95_ms'] + LATENCY_MIN_HEADROOM_MS), 1),
+                    'queries': r['queries'],
+                    'rss_mb': round(r['rss_mb'] * RSS_HEADROOM, 1),
+                }
+                verdict = 'recorded'
+            elif budget is None:
+                verdict = 'no budget'
+            else:
+                problems = check_budget(r, budget)
+                failures += bool(problems)
+                verdict = 'OVER: ' + '; '.join(problems) if problems else 'ok'
+            print(f"{label:<48}{r['p50_ms']:>8.1f}{r['p95_ms']:>8.1f}{r['p99_ms']:>8.1f}"
+                  f"{r['queries']:>6}{r['rss_mb']:>8.1f}  {verdict}")
+
+    if args.update_budgets:
+        with open(BUDGETS_FILE, 'w') as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBudgets written to {os.path.relpath(BUDGETS_FILE, ROOT)}')
+    elif failures:
+        print(f'\n{failures} endpoint(s) over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
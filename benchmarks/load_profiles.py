@@ -0,0 +1,160 @@
+"""
+Load comparison of the gunicorn deployment profiles (see gunicorn.conf.py)
+
+Seeds a throwaway SQLite database with database/seed_data.py, then for each
+profile starts gunicorn, logs one client per role in and hammers the role
+dashboards concurrently. Reports requests/second and p50/p99 latency per
+dashboard and overall.
+
+Run: python benchmarks/load_profiles.py [--profiles sync gthread gevent]
+                                        [--clients 24] [--duration 20]
+"""
+import argparse
+import http.cookiejar
+import importlib.util
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (username, password, dashboard path) — accounts created by seed_data.py
+ROLE_USERS = [
+    ('citizen1',    'password123', '/citizen/dashboard'),
+    ('officer1',    'password123', '/officer/dashboard'),
+    ('supervisor1', 'password123', '/supervisor/dashboard'),
+    ('moderator1',  'password123', '/moderator/dashboard'),
+    ('auditor1',    'password123', '/auditor/dashboard'),
+    ('admin1',      'Cctrs@2026',  '/admin/dashboard'),
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'gunicorn did not start listening on port {port}')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def login(base_url, username, password):
+    """Return a urllib opener carrying an authenticated session cookie"""
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    opener.open(f'{base_url}/auth/login', data=data, timeout=30).read()
+    return opener
+
+
+def client_loop(base_url, user, stop_at, results):
+    username, password, path = user
+    opener = login(base_url, username, password)
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            opener.open(base_url + path, timeout=60).read()
+        except OSError:
+            results.append((path, None))
+            continue
+        results.append((path, (time.perf_counter() - start) * 1000))
+
+
+def run_profile(profile, env, clients, duration):
+    """Start gunicorn with one profile, drive load, and return the raw samples"""
+    port = free_port()
+    proc_env = dict(env, GUNICORN_PROFILE=profile, PORT=str(port),
+                    GUNICORN_LOG_LEVEL='warning')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', 'wsgi:app'],
+        cwd=ROOT, env=proc_env)
+    try:
+        wait_for_port(port)
+        base_url = f'http://127.0.0.1:{port}'
+        results = []
+        stop_at = time.time() + duration
+        threads = [
+            threading.Thread(target=client_loop,
+                             args=(base_url, ROLE_USERS[i % len(ROLE_USERS)], stop_at, results))
+            for i in range(clients)
+        ]
+        started = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results, time.time() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def report(profile, results, elapsed):
+    ok = [ms for _, ms in results if ms is not None]
+    errors = len(results) - len(ok)
+    print(f"\n== {profile}: {len(ok) / elapsed:.1f} req/s, "
+          f"p50 {percentile(ok, 50):.1f} ms, p99 {percentile(ok, 99):.1f} ms, "
+          f"{errors} error(s)")
+    print(f"   {'dashboard':<24}{'req/s':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for _, _, path in ROLE_USERS:
+        samples = [ms for p, ms in results if p == path and ms is not None]
+        if samples:
+            print(f"   {path:<24}{len(samples) / elapsed:>8.1f}"
+                  f"{statistics.median(samples):>10.1f}{percentile(samples, 99):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn profiles under load')
+    parser.add_argument('--profiles', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--clients', type=int, default=24)
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cctrs-load-')
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               FLASK_ENV='production',
+               RATE_LIMIT_ENABLED='0')      # every client logs in from 127.0.0.1
+    try:
+        print('Seeding benchmark database...')
+        subprocess.run([sys.executable, 'database/seed_data.py', '--yes'],
+                       cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        print(f'{args.clients} concurrent clients, {args.duration:.0f}s per profile, '
+              f'{os.cpu_count()} CPU core(s)')
+        for profile in args.profiles:
+            if profile == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print('\n== gevent: skipped (pip install gevent to include it)')
+                continue
+            results, elapsed = run_profile(profile, env, args.clients, args.duration)
+            report(profile, results, elapsed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Login throughput benchmark for the password hashing policy
+
+For each candidate PASSWORD_HASH_METHOD, measures how many password
+verifications (i.e. logins) one core can do per second, then runs full
+POST /auth/login requests through the Flask test client from several
+threads to show the bounded hashing pool in action.
+
+Run: python benchmarks/login_hashing.py [--seconds 3] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+METHODS = [
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+PASSWORD = 'password123'
+
+
+def verifications_per_second(method, seconds):
+    """Single-threaded verify rate, i.e. logins per second per core"""
+    pwhash = generate_password_hash(PASSWORD, method=method)
+    done = 0
+    stop_at = time.perf_counter() + seconds
+    while time.perf_counter() < stop_at:
+        check_password_hash(pwhash, PASSWORD)
+        done += 1
+    return done / seconds
+
+
+def end_to_end(method, threads, seconds):
+    """Concurrent logins through the app; returns (logins/s, busy responses)"""
+    workdir = tempfile.mkdtemp(prefix='cctrs-login-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['PASSWORD_HASH_METHOD'] = method
+    os.environ['RATE_LIMIT_ENABLED'] = '0'      # one client logging in repeatedly is the point here
+
+    import importlib
+    import config
+    importlib.reload(config)
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app('production')
+    app.config['PASSWORD_HASH_METHOD'] = method
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@cctrs.local', role='citizen')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker():
+        client = app.test_client()
+        while time.perf_counter() < stop_at:
+            r = client.post('/auth/login', data={'username': 'bench', 'password': PASSWORD})
+            client.get('/auth/logout')
+            with lock:
+                counts['ok' if r.status_code == 302 else 'busy'] += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return counts['ok'] / seconds, counts['busy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark login hashing cost')
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"Verification rate per core ({os.cpu_count()} core(s) available)")
+    print(f"{'method':<24}{'logins/s/core':>15}{'ms/login':>10}")
+    for method in METHODS:
+        rate = verifications_per_second(method, args.seconds)
+        print(f"{method:<24}{rate:>15.1f}{1000 / rate:>10.1f}")
+
+    method = os.environ.get('PASSWORD_HASH_METHOD') or METHODS[0]
+    rate, busy = end_to_end(method, args.threads, args.seconds)
+    print(f"\nEnd-to-end /auth/login with {args.threads} threads ({method}): "
+          f"{rate:.1f} logins/s, {busy} busy (503) response(s)")
+
+
+if __name__ == '__main__':
+    main()
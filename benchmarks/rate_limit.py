@@ -0,0 +1,141 @@
+"""
+Load test for the token-bucket rate limiter (see app/utils/rate_limit.py)
+
+Starts gunicorn (gthread profile) on a seeded throwaway database, once with
+rate limiting off and once on. In each run a few logged-in citizens browse
+their dashboard and the public pages for the whole test; halfway through, a
+burst of abusive clients starts hammering POST /auth/login with wrong
+passwords (each one a full scrypt verification) and one citizen account
+spams upvotes. Reports the legitimate clients' p50/p99 latency before and
+during the burst, and what the abusive requests got back.
+
+Run: python benchmarks/rate_limit.py [--legit 4] [--abusers 16] [--duration 20]
+"""
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from load_profiles import ROOT, free_port, login, percentile, wait_for_port
+
+LEGIT_PATHS = ['/citizen/dashboard', '/public', '/citizen/complaints']
+
+
+def legit_loop(base_url, username, stop_at, attack_at, results):
+    opener = login(base_url, username, 'password123')
+    i = 0
+    while time.time() < stop_at:
+        path = LEGIT_PATHS[i % len(LEGIT_PATHS)]
+        i += 1
+        phase = 'burst' if time.time() >= attack_at else 'baseline'
+        start = time.perf_counter()
+        try:
+            opener.open(base_url + path, timeout=60).read()
+        except (urllib.error.URLError, OSError):
+            results.append((phase, None))
+            continue
+        results.append((phase, (time.perf_counter() - start) * 1000))
+
+
+def abuse_loop(base_url, opener, kind, stop_at, outcomes):
+    data = urllib.parse.urlencode({'username': 'citizen1', 'password': 'wrong-password'}).encode()
+    while time.time() < stop_at:
+        url = f'{base_url}/auth/login' if kind == 'login' else f'{base_url}/public/complaint/1/upvote'
+        try:
+            status = opener.open(url, data=data if kind == 'login' else b'', timeout=60).status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = 'error'
+        outcomes.append(status)
+
+
+def run(env, legit, abusers, duration):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', 'wsgi:app'],
+        cwd=ROOT, env=dict(env, GUNICORN_PROFILE='gthread', PORT=str(port),
+                           GUNICORN_LOG_LEVEL='warning'))
+    try:
+        wait_for_port(port)
+        base_url = f'http://127.0.0.1:{port}'
+        now = time.time()
+        stop_at, attack_at = now + duration, now + duration / 2
+        results, outcomes = [], []
+        threads = [threading.Thread(target=legit_loop,
+                                    args=(base_url, f'citizen{2 + i % 6}', stop_at, attack_at, results))
+                   for i in range(legit)]
+        for t in threads:
+            t.start()
+
+        time.sleep(max(0, attack_at - time.time()))
+        spammer = login(base_url, 'citizen7', 'password123')
+        anonymous = urllib.request.build_opener()
+        attackers = [threading.Thread(target=abuse_loop,
+                                      args=(base_url, spammer if i % 4 == 3 else anonymous,
+                                            'upvote' if i % 4 == 3 else 'login', stop_at, outcomes))
+                     for i in range(abusers)]
+        for t in attackers:
+            t.start()
+        for t in attackers + threads:
+            t.join()
+        return results, outcomes
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def report(label, results, outcomes, duration):
+    print(f'\n== rate limiting {label}')
+    print(f"   {'legitimate clients':<22}{'req/s':>8}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for phase in ('baseline', 'burst'):
+        samples = [ms for p, ms in results if p == phase and ms is not None]
+        errors = sum(1 for p, ms in results if p == phase and ms is None)
+        if samples:
+            print(f'   {phase:<22}{len(samples) / (duration / 2):>8.1f}'
+                  f'{statistics.median(samples):>10.1f}{percentile(samples, 99):>10.1f}{errors:>8}')
+    counts = {}
+    for status in outcomes:
+        counts[status] = counts.get(status, 0) + 1
+    summary = ', '.join(f'{status}: {n}' for status, n in sorted(counts.items(), key=str))
+    print(f'   abusive requests: {len(outcomes)} ({summary})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Legitimate latency during an abusive burst')
+    parser.add_argument('--legit', type=int, default=4)
+    parser.add_argument('--abusers', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cctrs-ratelimit-')
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               FLASK_ENV='production')
+    try:
+        print('Seeding benchmark database...')
+        subprocess.run([sys.executable, 'database/seed_data.py', '--yes'],
+                       cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        print(f'{args.legit} legitimate + {args.abusers} abusive clients, {args.duration:.0f}s per run '
+              f'(burst in the second half), {os.cpu_count()} CPU core(s)')
+        for enabled in ('0', '1'):
+            storage = 'sqlite:///' + os.path.join(workdir, f'ratelimit-{enabled}.db')
+            results, outcomes = run(dict(env, RATE_LIMIT_ENABLED=enabled, RATE_LIMIT_STORAGE=storage),
+                                    args.legit, args.abusers, args.duration)
+            report('off' if enabled == '0' else 'on', results, outcomes, args.duration)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
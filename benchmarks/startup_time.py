@@ -0,0 +1,64 @@
+"""
+Worker startup benchmark for the Civic Complaint Tracking System
+
+Measures how long a fresh interpreter takes to import the app and build it
+with create_app(), and how long the first request then takes. Each run is a
+separate subprocess so import caches don't flatter the numbers.
+
+Run: python benchmarks/startup_time.py [--runs 10] [--config production]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child interpreter; prints one JSON line of timings (ms)
+CHILD = r'''
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app(CONFIG)
+t2 = time.perf_counter()
+client = app.test_client()
+client.get('/auth/login')
+t3 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'total_ms': (t3 - t0) * 1000,
+}))
+'''
+
+
+def run_once(config_name):
+    """Start one child interpreter and return its timings"""
+    code = f'CONFIG = {config_name!r}\n' + CHILD
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--config', default='production')
+    args = parser.parse_args()
+
+    samples = [run_once(args.config) for _ in range(args.runs)]
+
+    print(f"Startup timings over {args.runs} cold runs (config={args.config})")
+    print(f"{'phase':<18}{'median':>10}{'min':>10}{'max':>10}")
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms'):
+        values = [s[key] for s in samples]
+        print(f"{key:<18}{statistics.median(values):>10.1f}"
+              f"{min(values):>10.1f}{max(values):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test for write-behind upvotes (see app/utils/upvotes.py)
+
+Generates a small dataset, then starts gunicorn (gthread profile) once with
+upvotes written in their request (UPVOTE_FLUSH_INTERVAL=0) and once with
+them buffered. In each run a crowd of logged-in citizens upvotes the same
+public complaint through the feed's AJAX endpoint, each clicking a few
+times as impatient users do. Reports upvote throughput and latency, then
+stops gunicorn and checks that every citizen's upvote was stored exactly
+once and that complaints.upvote_count matches.
+
+Run: python benchmarks/upvotes.py [--voters 200] [--clicks 3] [--threads 16]
+"""
+import argparse
+import os
+import queue
+import shutil
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+
+from load_profiles import ROOT, free_port, login, percentile, wait_for_port
+
+
+def vote_loop(base_url, openers, complaint_id, clicks, latencies, failures):
+    while True:
+        try:
+            opener = openers.get_nowait()
+        except queue.Empty:
+            return
+        for _ in range(clicks):
+            start = time.perf_counter()
+            try:
+                opener.open(f'{base_url}/public/api/complaint/{complaint_id}/upvote', data=b'',
+                            timeout=60).read()
+            except (urllib.error.URLError, OSError):
+                failures.append(1)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run(env, db_path, voters, complaint_id, clicks, threads):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', 'wsgi:app'],
+        cwd=ROOT, env=dict(env, GUNICORN_PROFILE='gthread', PORT=str(port),
+                           GUNICORN_LOG_LEVEL='warning'))
+    try:
+        wait_for_port(port)
+        base_url = f'http://127.0.0.1:{port}'
+        openers = queue.Queue()
+        logins = queue.Queue()
+        for username in voters:
+            logins.put(username)
+
+        def login_loop():
+            while True:
+                try:
+                    username = logins.get_nowait()
+                except queue.Empty:
+                    return
+                openers.put(login(base_url, username, 'password123'))
+
+        workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        latencies, failures = [], []
+        started = time.perf_counter()
+        workers = [threading.Thread(target=vote_loop,
+                                    args=(base_url, openers, complaint_id, clicks, latencies, failures))
+                   for _ in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        # A graceful stop; buffered upvotes are flushed as the workers exit
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    with sqlite3.connect(db_path) as conn:
+        stored, distinct = conn.execute('SELECT COUNT(*), COUNT(DISTINCT user_id) FROM upvotes '
+                                        'WHERE complaint_id = ?', (complaint_id,)).fetchone()
+        count, = conn.execute('SELECT upvote_count FROM complaints WHERE id = ?', (complaint_id,)).fetchone()
+    return latencies, failures, elapsed, (stored, distinct, count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upvote latency on a viral complaint')
+    parser.add_argument('--voters', type=int, default=200)
+    parser.add_argument('--clicks', type=int, default=3, help='upvote requests per voter')
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cctrs-upvotes-')
+    pristine = os.path.join(workdir, 'pristine.db')
+    try:
+        print('Generating benchmark database...')
+        subprocess.run([sys.executable, 'database/generate_dataset.py', '--complaints', '1000',
+                        '--citizens', str(max(100, args.voters)), '--skip-notifications', '--reset',
+                        '--database-url', f'sqlite:///{pristine}'],
+                       cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        with sqlite3.connect(pristine) as conn:
+            complaint_id, = conn.execute("SELECT id FROM complaints WHERE is_public = 1 "
+                                         "ORDER BY id LIMIT 1").fetchone()
+            conn.execute('DELETE FROM upvotes WHERE complaint_id = ?', (complaint_id,))
+            conn.execute('UPDATE complaints SET upvote_count = 0 WHERE id = ?', (complaint_id,))
+            voters = [name for name, in conn.execute("SELECT username FROM users WHERE role = 'citizen' "
+                                                      "ORDER BY id LIMIT ?", (args.voters,))]
+
+        print(f'{len(voters)} voters x {args.clicks} clicks on complaint #{complaint_id}, '
+              f'{args.threads} client threads, {os.cpu_count()} CPU core(s)')
+        print(f"\n   {'upvotes':<16}{'req/s':>8}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+              f"   stored / distinct / upvote_count")
+        for interval in ('0', '2'):
+            db_path = os.path.join(workdir, f'bench-{interval}.db')
+            shutil.copyfile(pristine, db_path)
+            env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', FLASK_ENV='production',
+                       RATE_LIMIT_ENABLED='0', UPVOTE_FLUSH_INTERVAL=interval)
+            latencies, failures, elapsed, check = run(env, db_path, voters, complaint_id,
+                                                      args.clicks, args.threads)
+            label = 'write-through' if interval == '0' else 'write-behind'
+            print(f'   {label:<16}{len(latencies) / elapsed:>8.1f}{statistics.median(latencies):>10.1f}'
+                  f'{percentile(latencies, 99):>10.1f}{len(failures):>8}   {check[0]} / {check[1]} / {check[2]}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
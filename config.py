@@ -1,6 +1,7 @@
 """
 Configuration settings for the Civic Complaint Tracking System
 """
+import json
 import os
 from dotenv import load_dotenv
 
@@ -16,6 +17,12 @@ class Config:
     # Database configuration
     # Default to SQLite for easy setup
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///civic_complaints.db'
+
+    # Optional read replica for auditor, public, report and export pages.
+    # After a write a user reads from the primary for REPLICA_STICKY_SECONDS.
+    SQLALCHEMY_BINDS = ({'replica': os.environ['DATABASE_REPLICA_URL']}
+                        if os.environ.get('DATABASE_REPLICA_URL') else {})
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
     
     # Disable modification tracking (saves resources)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -28,6 +35,132 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max limit
     
+    # Password hashing policy (any Werkzeug method string). Existing hashes
+    # with other parameters are upgraded on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # Concurrent verifications per process, and how many may wait for one
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 32))
+    PASSWORD_HASH_TIMEOUT = 30
+    
+    # Identity cache for Flask-Login's load_user (seconds; 0 disables it).
+    # Role, active-flag and department changes reach every worker on its next
+    # request; unread counts catch up within this many seconds.
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_MAX_ENTRIES = 10000
+
+    # Reference-data cache (departments, supervisor/officer rosters): entries
+    # live this many seconds (0 disables it) unless a change bumps their
+    # version stamp in REFERENCE_CACHE_DIR (default instance/reference_cache),
+    # which every worker checks on read
+    REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL', 300))
+    REFERENCE_CACHE_DIR = os.environ.get('REFERENCE_CACHE_DIR')
+
+    # Reverse proxies in front of the app (router, nginx, load balancer) whose
+    # X-Forwarded-For/-Proto/-Host headers are trusted. The client address
+    # keys anonymous rate limits and the /metrics allow-list, so set this to
+    # the number of proxies or every request seems to come from the proxy.
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+    # Token-bucket rate limits: endpoint -> [capacity, period seconds,
+    # methods (default POST)], per user when logged in, per IP otherwise;
+    # login is per username and IP, and RATE_LIMIT_LOGIN_PER_IP caps every
+    # username from one address (an office NAT) together.
+    # RATE_LIMIT_STORAGE is 'memory' (per process) or sqlite:////path/file.db
+    # (shared by the workers of a host; gunicorn.conf.py sets one up).
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMITS = json.loads(os.environ.get('RATE_LIMITS') or
+                             '{"auth.login": [10, 60], "auth.register": [5, 3600], '
+                             '"citizen.submit_complaint": [10, 600], "main.upvote_complaint": [30, 60], '
+                             '"main.upvote_api": [30, 60]}')
+    RATE_LIMIT_LOGIN_PER_IP = json.loads(os.environ.get('RATE_LIMIT_LOGIN_PER_IP') or '[300, 60]')
+
+    # Write-behind upvotes: queued per process, deduplicated per (user,
+    # complaint) and written in batches every UPVOTE_FLUSH_INTERVAL seconds,
+    # or as soon as UPVOTE_FLUSH_SIZE are pending (0 writes each one at once)
+    UPVOTE_FLUSH_INTERVAL = float(os.environ.get('UPVOTE_FLUSH_INTERVAL', 2))
+    UPVOTE_FLUSH_SIZE = int(os.environ.get('UPVOTE_FLUSH_SIZE', 500))
+
+    # Trending ranking ("Top this week" in the public feed): upvotes count for
+    # TRENDING_WINDOW_DAYS, halving in weight every TRENDING_HALF_LIFE_HOURS,
+    # times the complaint's status weight (statuses not listed weigh 0).
+    # `flask trending-decay` re-decays scores, TRENDING_BATCH_SIZE per transaction.
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 48))
+    TRENDING_WINDOW_DAYS = int(os.environ.get('TRENDING_WINDOW_DAYS', 7))
+    TRENDING_STATUS_WEIGHTS = json.loads(os.environ.get('TRENDING_STATUS_WEIGHTS') or
+                                         '{"Submitted": 1, "Under Review": 1, "Assigned": 1, "In Progress": 1, '
+                                         '"On Hold": 1, "Escalated": 1.5, "Flagged": 0.25, "Resolved": 0.5, '
+                                         '"Rejected": 0.1, "Closed": 0.25}')
+    TRENDING_BATCH_SIZE = int(os.environ.get('TRENDING_BATCH_SIZE', 500))
+
+    # Officer work queue: open complaints ranked by when they fall due. A
+    # complaint is due its SLA deadline (SLA_DEADLINES_HOURS) or, in statuses
+    # the SLA monitor does not watch, WORK_QUEUE_TARGET_HOURS after it entered
+    # its status; each upvote brings that forward WORK_QUEUE_UPVOTE_HOURS (up
+    # to WORK_QUEUE_MAX_UPVOTE_HOURS) and an escalation WORK_QUEUE_ESCALATION_HOURS.
+    WORK_QUEUE_TARGET_HOURS = json.loads(os.environ.get('WORK_QUEUE_TARGET_HOURS') or
+                                         '{"Under Review": 48, "Escalated": 24}')
+    WORK_QUEUE_UPVOTE_HOURS = float(os.environ.get('WORK_QUEUE_UPVOTE_HOURS', 2))
+    WORK_QUEUE_MAX_UPVOTE_HOURS = float(os.environ.get('WORK_QUEUE_MAX_UPVOTE_HOURS', 72))
+    WORK_QUEUE_ESCALATION_HOURS = float(os.environ.get('WORK_QUEUE_ESCALATION_HOURS', 48))
+    WORK_QUEUE_SIZE = int(os.environ.get('WORK_QUEUE_SIZE', 25))
+    WORK_QUEUE_BATCH_SIZE = int(os.environ.get('WORK_QUEUE_BATCH_SIZE', 1000))
+
+    # Archive tier: Closed complaints older than this move to *_archive tables
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+
+    # Daily rollups: status_history rows folded per transaction
+    ROLLUP_BATCH_SIZE = int(os.environ.get('ROLLUP_BATCH_SIZE', 5000))
+
+    # SLA monitor (flask sla-sweep): hours a complaint may sit in a status
+    # before it is escalated, with optional per-department overrides, e.g.
+    # {"Assigned": 72, "departments": {"Sanitation": {"In Progress": 120}}}
+    SLA_DEADLINES_HOURS = json.loads(os.environ.get('SLA_DEADLINES_HOURS') or
+                                     '{"Assigned": 72, "In Progress": 240, "On Hold": 168}')
+    SLA_BATCH_SIZE = int(os.environ.get('SLA_BATCH_SIZE', 200))
+
+    # Officer auto-assignment (flask assign-complaints): complaints per batch
+    ASSIGNMENT_BATCH_SIZE = int(os.environ.get('ASSIGNMENT_BATCH_SIZE', 200))
+
+    # User recorded as the actor of automatic transitions (SLA escalations,
+    # auto-assignment); defaults to the first active admin
+    SYSTEM_ACTOR_USERNAME = os.environ.get('SYSTEM_ACTOR_USERNAME')
+
+    # Near-duplicate detection: minimum estimated text similarity (0-1),
+    # radius for complaints that both have coordinates, suggestions shown
+    DUPLICATE_MIN_SIMILARITY = float(os.environ.get('DUPLICATE_MIN_SIMILARITY', 0.3))
+    DUPLICATE_RADIUS_METERS = float(os.environ.get('DUPLICATE_RADIUS_METERS', 250))
+    DUPLICATE_MAX_CANDIDATES = int(os.environ.get('DUPLICATE_MAX_CANDIDATES', 5))
+
+    # Per-request SQL instrumentation: Server-Timing header, JSON logs on the
+    # cctrs.sql logger, and the admin SQL page (aggregated across workers
+    # through SQL_STATS_DIR, default instance/sql_stats)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'
+    SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', '1') == '1'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    SQL_STATS_DIR = os.environ.get('SQL_STATS_DIR')
+
+    # Prometheus metrics at /metrics, served only to these networks (comma
+    # separated). Multi-worker aggregation needs PROMETHEUS_MULTIPROC_DIR,
+    # which gunicorn.conf.py sets up.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_ALLOWED_NETWORKS = os.environ.get('METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128')
+
+    # Slow-query log: statements slower than this (ms; 0 disables) are logged
+    # with their query plan to SLOW_QUERY_LOG_DIR (default instance/slow_queries)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 250))
+    SLOW_QUERY_LOG_DIR = os.environ.get('SLOW_QUERY_LOG_DIR')
+    SLOW_QUERY_SCAN_TABLES = os.environ.get('SLOW_QUERY_SCAN_TABLES', 'complaints,status_history,notifications')
+
+    # On-demand profiler: ?_profile=sample|cprofile for admins, or a signed
+    # X-Profile header; reports go to PROFILER_DIR (default instance/profiles)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '1') == '1'
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 1))
+    PROFILER_TOKEN_MAX_AGE = int(os.environ.get('PROFILER_TOKEN_MAX_AGE', 900))
+    PROFILER_DIR = os.environ.get('PROFILER_DIR')
+    
     # Pagination
     COMPLAINTS_PER_PAGE = 10
     USERS_PER_PAGE = 20
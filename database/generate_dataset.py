@@ -0,0 +1,373 @@
+"""
+Synthetic large-scale dataset generator for load testing
+
+Bulk-inserts realistic volumes of departments, staff, citizens, complaints
+(with plausible status chains in status_history), notifications, upvotes
+and geo coordinates using Core-level batched inserts. The same --seed (and
+--end-date) always produces the same rows; only the password salt differs.
+
+Run: python database/generate_dataset.py --complaints 1000000 --reset
+     python database/generate_dataset.py --complaints 50000 \\
+         --database-url sqlite:////tmp/cctrs-50k.db --reset --seed 7
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEPARTMENTS = [
+    ('Public Health', 'Hospitals, clinics, disease outbreaks and water contamination.'),
+    ('Parks & Recreation', 'Public parks, playgrounds, greenery and public events.'),
+    ('Public Works', 'Roads, street lights, drainage and public building maintenance.'),
+    ('Sanitation', 'Garbage collection, street cleaning and sewer maintenance.'),
+    ('Traffic', 'Traffic signals, road signage, accident response and public transport.'),
+    ('Water & Sewerage', 'Clean water supply, leakage repairs and sewerage maintenance.'),
+    ('Electricity', 'Power outages, street lighting and transformer issues.'),
+    ('Local Police', 'Neighbourhood safety and non-emergency complaints.'),
+]
+
+# Issue vocabulary per department: (title template, description template)
+ISSUES = {
+    'Public Health': [('Mosquito breeding near {place}', 'Stagnant water near {place} on {street} is breeding mosquitoes. Several families nearby report fever cases.'),
+                      ('Clinic closed during hours at {place}', 'The basic health unit at {place} has been closed during posted hours for {n} days.')],
+    'Parks & Recreation': [('Broken swings in {place}', 'Playground equipment in {place} off {street} is damaged and unsafe for children.'),
+                           ('Overgrown grass at {place}', 'Grass and hedges in {place} have not been trimmed for {n} weeks and attract snakes.')],
+    'Public Works': [('Pothole on {street}', 'A deep pothole on {street} near {place} is damaging vehicles and causing traffic backups.'),
+                     ('Collapsed footpath on {street}', 'The footpath on {street} near {place} has caved in and pedestrians walk on the road.')],
+    'Sanitation': [('Garbage not collected on {street}', 'Bins on {street} near {place} have not been emptied for {n} days. Waste is spilling onto the road.'),
+                   ('Open sewer near {place}', 'The sewer cover near {place} on {street} is broken and overflowing.')],
+    'Traffic': [('Signal not working at {street}', 'The traffic signal at {street} and {place} has been blinking red for {n} days.'),
+                ('Illegal parking on {street}', 'Vehicles park on the footpath of {street} near {place}, blocking wheelchairs and strollers.')],
+    'Water & Sewerage': [('No water supply in {place}', 'Houses around {place} on {street} have had no water supply for {n} days.'),
+                         ('Pipe leakage on {street}', 'A water main on {street} near {place} has been leaking for {n} days, flooding the road.')],
+    'Electricity': [('Street lights out on {street}', 'All street lights on {street} near {place} have been off for {n} nights.'),
+                    ('Sparking transformer at {place}', 'The transformer at {place} on {street} sparks whenever it rains.')],
+    'Local Police': [('Loitering near {place}', 'A group loiters near {place} on {street} every evening and harasses passers-by.'),
+                     ('Noise at night on {street}', 'Loud music from {street} near {place} continues past midnight for {n} days.')],
+}
+STREETS = ['Main Avenue', 'Jinnah Road', 'Park Lane', 'Canal Road', 'Club Road', 'Mall Road',
+           'Station Road', 'College Road', 'Margalla Road', 'Service Road', '5th Street', '12th Avenue']
+PLACES = ['Block 5', 'Sector G-9', 'the market', 'the bus stop', 'Central Park', 'the school',
+          'the mosque', 'the hospital', 'Phase 2', 'the river bank', 'the chowk', 'the stadium']
+
+# Random walk through STATUS_TRANSITIONS: chance of stopping at a status,
+# weighted next steps, and mean hours spent there before moving on.
+STOP_PROBABILITY = {
+    'Submitted': 0.05, 'Flagged': 0.4, 'Under Review': 0.06, 'Assigned': 0.08,
+    'In Progress': 0.1, 'On Hold': 0.25, 'Escalated': 0.3, 'Resolved': 0.35,
+    'Rejected': 0.4,
+}
+NEXT_WEIGHTS = {
+    'Draft':        [('Submitted', 1.0)],
+    'Submitted':    [('Under Review', 0.9), ('Flagged', 0.1)],
+    'Flagged':      [('Closed', 1.0)],
+    'Under Review': [('Assigned', 0.9), ('Rejected', 0.1)],
+    'Assigned':     [('In Progress', 0.85), ('On Hold', 0.1), ('Rejected', 0.05)],
+    'In Progress':  [('Resolved', 0.8), ('On Hold', 0.1), ('Escalated', 0.07), ('Rejected', 0.03)],
+    'On Hold':      [('In Progress', 0.8), ('Rejected', 0.1), ('Escalated', 0.1)],
+    'Escalated':    [('In Progress', 0.6), ('Assigned', 0.4)],
+    'Resolved':     [('Closed', 1.0)],
+    'Rejected':     [('Closed', 0.8), ('Submitted', 0.2)],
+}
+MEAN_HOURS_IN_STATUS = {
+    'Draft': 6, 'Submitted': 18, 'Flagged': 48, 'Under Review': 24, 'Assigned': 36,
+    'In Progress': 96, 'On Hold': 120, 'Escalated': 48, 'Resolved': 72, 'Rejected': 48,
+}
+DRAFT_SHARE = 0.03
+PUBLIC_SHARE = 0.6
+
+# City centre (Islamabad, as in seed_complaints_script.py) and spread in degrees
+CENTRE = (33.6844, 73.0479)
+SPREAD = 0.08
+
+
+class Generator:
+    """Builds rows in memory batch by batch and writes them with executemany"""
+
+    def __init__(self, conn, tables, args):
+        self.conn = conn
+        self.t = tables
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.end = datetime.fromisoformat(args.end_date)
+        self.start = self.end - timedelta(days=args.days)
+        self.counts = {'complaints': 0, 'status_history': 0, 'notifications': 0, 'upvotes': 0}
+        self.buffers = {name: [] for name in self.counts}
+
+    # ── Helpers ──────────────────────────────────────────────────────────
+    def next_id(self, table):
+        from sqlalchemy import func, select
+        return (self.conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+    def emit(self, name, row):
+        buffer = self.buffers[name]
+        buffer.append(row)
+        if len(buffer) >= self.args.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Buffers are flushed parents-first (complaints before their children)
+        for key in self.buffers:
+            if self.buffers[key]:
+                self.conn.execute(self.t[key].insert(), self.buffers[key])
+                self.counts[key] += len(self.buffers[key])
+                self.buffers[key] = []
+
+    # ── Reference data ───────────────────────────────────────────────────
+    def create_people(self, password_hash):
+        """Departments, staff and citizens; returns id lookups for complaints"""
+        rng = self.rng
+        dept_ids = []
+        dept_id = self.next_id(self.t['departments'])
+        existing = {r.name: r.id for r in self.conn.execute(
+            self.t['departments'].select())}
+        new_depts = []
+        for name, description in DEPARTMENTS:
+            if name in existing:
+                dept_ids.append((existing[name], name))
+                continue
+            new_depts.append({'id': dept_id, 'name': name, 'description': description,
+                              'created_at': self.start})
+            dept_ids.append((dept_id, name))
+            dept_id += 1
+        if new_depts:
+            self.conn.execute(self.t['departments'].insert(), new_depts)
+
+        user_id = self.next_id(self.t['users'])
+        tag = f's{self.args.seed}'
+        users = []
+
+        def add_user(prefix, n, role, department_id=None):
+            nonlocal user_id
+            users.append({
+                'id': user_id, 'username': f'{prefix}_{tag}_{n}',
+                'email': f'{prefix}_{tag}_{n}@load.cctrs.local', 'password_hash': password_hash,
+                'role': role, 'department_id': department_id, 'is_active': True,
+                'created_at': self.start,
+            })
+            user_id += 1
+            return user_id - 1
+
+        admins = [add_user('admin', i, 'admin') for i in range(2)]
+        moderators = [add_user('moderator', i, 'moderator') for i in range(max(2, self.args.complaints // 100000))]
+        add_user('auditor', 0, 'auditor')
+        officers, supervisors = {}, {}
+        for d_id, _ in dept_ids:
+            supervisors[d_id] = add_user('supervisor', d_id, 'supervisor', d_id)
+            officers[d_id] = [add_user('officer', f'{d_id}_{i}', 'officer', d_id)
+                              for i in range(self.args.officers_per_department)]
+        first_citizen = user_id
+        for i in range(self.args.citizens):
+            add_user('citizen', i, 'citizen')
+            if len(users) >= self.args.batch_size:
+                self.conn.execute(self.t['users'].insert(), users)
+                users = []
+        if users:
+            self.conn.execute(self.t['users'].insert(), users)
+
+        # Each department gets a few geographic hotspots its issues cluster around
+        hotspots = {d_id: [(CENTRE[0] + rng.gauss(0, SPREAD), CENTRE[1] + rng.gauss(0, SPREAD))
+                           for _ in range(5)] for d_id, _ in dept_ids}
+        return {
+            'departments': dept_ids, 'admins': admins, 'moderators': moderators,
+            'officers': officers, 'supervisors': supervisors, 'hotspots': hotspots,
+            'citizens': (first_citizen, first_citizen + self.args.citizens - 1),
+        }
+
+    # ── Complaints ───────────────────────────────────────────────────────
+    def walk(self, created_at):
+        """Return [(status, entered_at)] starting at Draft, ending before end date"""
+        rng = self.rng
+        chain = [('Draft', created_at)]
+        if rng.random() < DRAFT_SHARE:
+            return chain
+        status, at = 'Draft', created_at
+        for _ in range(12):
+            choices = NEXT_WEIGHTS.get(status)
+            if not choices:
+                break
+            if status in STOP_PROBABILITY and rng.random() < STOP_PROBABILITY[status]:
+                break
+            nxt = rng.choices([c for c, _ in choices], [w for _, w in choices])[0]
+            at = at + timedelta(hours=rng.expovariate(1 / MEAN_HOURS_IN_STATUS[status]))
+            if at >= self.end:
+                break
+            chain.append((nxt, at))
+            status = nxt
+        return chain
+
+    def actor_for(self, status, prev, complaint, people):
+        rng = self.rng
+        if status == 'Submitted':
+            return complaint['citizen_id']
+        if prev == 'Submitted' and status in ('Under Review', 'Flagged'):
+            return rng.choice(people['moderators'])
+        if status == 'Escalated':
+            return people['supervisors'][complaint['department_id']]
+        if status == 'Closed' and prev == 'Flagged':
+            return rng.choice(people['moderators'])
+        if status == 'Closed':
+            return rng.choice(people['admins'])
+        return complaint['assigned_officer_id'] or rng.choice(people['officers'][complaint['department_id']])
+
+    def create_complaints(self, people):
+        rng = self.rng
+        args = self.args
+        complaint_id = self.next_id(self.t['complaints'])
+        history_id = self.next_id(self.t['status_history'])
+        lo, hi = people['citizens']
+        window = (self.end - self.start).total_seconds()
+        started = time.time()
+
+        for n in range(args.complaints):
+            d_id, d_name = rng.choice(people['departments'])
+            title_t, desc_t = rng.choice(ISSUES[d_name])
+            words = {'street': rng.choice(STREETS), 'place': rng.choice(PLACES), 'n': rng.randint(2, 14)}
+            # Skew creation towards recent dates (volume grows over time)
+            created_at = self.start + timedelta(seconds=window * rng.random() ** 0.7)
+            lat, lng = rng.choice(people['hotspots'][d_id])
+            complaint = {
+                'id': complaint_id,
+                'title': title_t.format(**words),
+                'description': desc_t.format(**words),
+                'citizen_id': rng.randint(lo, hi),
+                'department_id': d_id,
+                'assigned_officer_id': None,
+                'flag_reason': None,
+                'escalation_notes': None,
+                'evidence_filename': None,
+                'latitude': round(lat + rng.gauss(0, 0.004), 6),
+                'longitude': round(lng + rng.gauss(0, 0.004), 6),
+                'is_public': rng.random() < PUBLIC_SHARE,
+                'rating': None,
+                'feedback_text': None,
+                'created_at': created_at,
+            }
+
+            chain = self.walk(created_at)
+            history, notifications = [], []
+            for (prev, _), (status, at) in zip(chain, chain[1:]):
+                if status == 'Assigned' and not complaint['assigned_officer_id']:
+                    complaint['assigned_officer_id'] = rng.choice(people['officers'][d_id])
+                actor = self.actor_for(status, prev, complaint, people)
+                if status == 'Flagged':
+                    complaint['flag_reason'] = 'Duplicate of an existing complaint.'
+                elif status == 'Escalated':
+                    complaint['escalation_notes'] = 'No progress within the expected time.'
+                history.append({
+                    'id': history_id, 'complaint_id': complaint_id,
+                    'previous_status': prev, 'new_status': status,
+                    'changed_by_user_id': actor, 'notes': f'Moved to {status}.',
+                    'changed_at': at,
+                })
+                history_id += 1
+                if not args.skip_notifications and actor != complaint['citizen_id']:
+                    notifications.append({
+                        'user_id': complaint['citizen_id'],
+                        'complaint_id': complaint_id,
+                        'message': f'Your complaint "#{complaint_id}: {complaint["title"]}" '
+                                   f'status changed to {status}.'[:255],
+                        'link': f'/citizen/complaint/{complaint_id}',
+                        'is_read': (self.end - at).days > 7 or rng.random() < 0.5,
+                        'created_at': at,
+                    })
+
+            final_status, final_at = chain[-1]
+            complaint['current_status'] = final_status
+            complaint['updated_at'] = final_at
+            if final_status in ('Resolved', 'Closed') and rng.random() < 0.4:
+                complaint['rating'] = rng.choices([1, 2, 3, 4, 5], [1, 1, 2, 4, 4])[0]
+            upvotes = []
+            if complaint['is_public'] and final_status != 'Draft':
+                upvotes = self.create_upvotes(complaint, lo, hi)
+            complaint['upvote_count'] = len(upvotes)
+            # Parent row first so batches stay valid under enforced foreign keys
+            self.emit('complaints', complaint)
+            for row in history:
+                self.emit('status_history', row)
+            for row in notifications:
+                self.emit('notifications', row)
+            for row in upvotes:
+                self.emit('upvotes', row)
+
+            complaint_id += 1
+            if (n + 1) % 100000 == 0:
+                rate = (n + 1) / (time.time() - started)
+                print(f'  {n + 1:>10,} complaints ({rate:,.0f}/s)')
+
+        self.flush()
+
+    def create_upvotes(self, complaint, lo, hi):
+        # Heavy-tailed: most public complaints get a handful, a few go viral
+        rng = self.rng
+        count = min(int(rng.paretovariate(1.3)) - 1, hi - lo + 1, 5000)
+        if count <= 0:
+            return []
+        return [{'user_id': user_id, 'complaint_id': complaint['id'],
+                 'created_at': complaint['created_at'] + timedelta(hours=rng.expovariate(1 / 48))}
+                for user_id in rng.sample(range(lo, hi + 1), count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a large synthetic CCTRS dataset')
+    parser.add_argument('--complaints', type=int, default=100000)
+    parser.add_argument('--citizens', type=int, default=None,
+                        help='default: one citizen per 20 complaints')
+    parser.add_argument('--officers-per-department', type=int, default=6)
+    parser.add_argument('--days', type=int, default=730, help='history window length')
+    parser.add_argument('--end-date', default='2026-01-01',
+                        help='newest timestamp in the data (kept fixed for determinism)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=20000)
+    parser.add_argument('--skip-notifications', action='store_true')
+    parser.add_argument('--database-url', help='overrides DATABASE_URL')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+    if args.citizens is None:
+        args.citizens = max(100, args.complaints // 20)
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app, db
+    from app.utils.passwords import hash_password
+
+    app = create_app('production')
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        engine = db.engine
+        tables = {name: db.metadata.tables[name] for name in
+                  ('departments', 'users', 'complaints', 'status_history', 'notifications', 'upvotes')}
+        started = time.time()
+        with engine.begin() as conn:
+            if engine.dialect.name == 'sqlite':
+                # Bulk load: fewer fsyncs, bigger page cache
+                conn.exec_driver_sql('PRAGMA synchronous = OFF')
+                conn.exec_driver_sql('PRAGMA cache_size = -200000')
+            gen = Generator(conn, tables, args)
+            print(f'Generating {args.complaints:,} complaints for {args.citizens:,} citizens '
+                  f'(seed {args.seed}) into {engine.url.render_as_string(hide_password=True)}')
+            people = gen.create_people(hash_password('password123'))
+            gen.create_complaints(people)
+        # Work-queue priorities depend on the SLA settings, so they are
+        # computed by the app rather than generated
+        from app.utils import work_queue
+        work_queue.rebuild()
+
+        elapsed = time.time() - started
+        print(f'Done in {elapsed:.1f}s:')
+        for name, count in gen.counts.items():
+            print(f'  {name:<16}{count:>12,}')
+        print(f"Every generated account's password is 'password123' "
+              f"(usernames like citizen_s{args.seed}_0, officer_s{args.seed}_<dept>_0).")
+
+
+if __name__ == '__main__':
+    main()
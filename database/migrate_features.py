@@ -1,3 +1,4 @@
+import re
 import sqlite3
 import os
 import sys
@@ -7,6 +8,67 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'instance', 'civic_complaints.db')
 
+STATUS_COLUMNS = {
+    "complaints": ["current_status"],
+    "status_history": ["previous_status", "new_status"],
+    "complaints_archive": ["current_status"],
+    "status_history_archive": ["previous_status", "new_status"],
+}
+
+def recode_statuses(cursor):
+    """Rebuild tables whose status columns still hold names (SQLite cannot ALTER a column type)"""
+    from app.models import STATUS_CODES
+
+    cursor.execute("CREATE TABLE IF NOT EXISTS statuses (code SMALLINT PRIMARY KEY, name VARCHAR(50) NOT NULL UNIQUE)")
+    cursor.executemany("INSERT OR IGNORE INTO statuses (code, name) VALUES (?, ?)",
+                       [(code, name) for name, code in STATUS_CODES.items()])
+
+    pending = {}
+    for table, status_columns in STATUS_COLUMNS.items():
+        columns = {row[1]: row[2] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if not columns:
+            continue
+        if all(columns[c].upper() == "SMALLINT" for c in status_columns):
+            print(f" -> {table} already uses status codes")
+            continue
+        pending[table] = (status_columns, columns)
+
+    # The CASE below would copy an unknown name into the SMALLINT column as
+    # is, and StatusCode would then fail on that row at load time; check
+    # every table before rebuilding any of them
+    names = ", ".join(f"'{name}'" for name in STATUS_CODES)
+    unknown = []
+    for table, (status_columns, _) in pending.items():
+        for column in status_columns:
+            for value, count in cursor.execute(
+                    f"SELECT {column}, COUNT(*) FROM {table} "
+                    f"WHERE {column} IS NOT NULL AND {column} NOT IN ({names}) GROUP BY {column}"):
+                unknown.append(f"{table}.{column} = {value!r} ({count} row(s))")
+    if unknown:
+        raise SystemExit("Unknown status values, not recoded; update these rows to a status in "
+                         "app/models.py STATUS_CODES and run the migration again:\n  " + "\n  ".join(unknown))
+
+    for table, (status_columns, columns) in pending.items():
+        create_sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    (table,)).fetchone()[0]
+        index_sqls = [row[0] for row in cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+        for column in status_columns:
+            create_sql = re.sub(rf'(\b{column}\s+)VARCHAR\(\d+\)', r'\1SMALLINT', create_sql)
+        create_sql = re.sub(rf'^CREATE TABLE\s+"?{table}"?', f'CREATE TABLE {table}__recoded', create_sql)
+
+        cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in STATUS_CODES.items())
+        select_list = ", ".join(f"CASE {c} {cases} ELSE {c} END" if c in status_columns else c
+                                for c in columns)
+        cursor.execute(create_sql)
+        cursor.execute(f"INSERT INTO {table}__recoded ({', '.join(columns)}) SELECT {select_list} FROM {table}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}__recoded RENAME TO {table}")
+        for sql in index_sqls:
+            cursor.execute(sql)
+        print(f" -> Recoded {', '.join(status_columns)} in {table} (run VACUUM to reclaim the freed space)")
+
+
 def migrate():
     print(f"Connecting to database at {db_path}...")
     if not os.path.exists(db_path):
@@ -70,6 +132,96 @@ def migrate():
     except sqlite3.OperationalError as e:
         print(f" -> Skipping upvotes table (already exists?): {e}")
 
+    print("Creating audit trail indexes...")
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_status_history_complaint_id ON status_history(complaint_id)",
+        "CREATE INDEX IF NOT EXISTS ix_status_history_changed_at_id ON status_history(changed_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_status_history_actor_changed_at ON status_history(changed_by_user_id, changed_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_status_history_new_status_changed_at ON status_history(new_status, changed_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_complaints_department_id ON complaints(department_id)",
+    ]:
+        cursor.execute(statement)
+    print(" -> Audit trail indexes in place")
+
+    print("Preparing archive tier...")
+    try:
+        cursor.execute("ALTER TABLE notifications ADD COLUMN complaint_id INTEGER")
+        # Older notifications only carry the complaint in their link
+        cursor.execute("""
+        UPDATE notifications SET complaint_id = CAST(substr(link, 20) AS INTEGER)
+        WHERE complaint_id IS NULL AND link LIKE '/citizen/complaint/%'
+        """)
+        print(" -> Added and backfilled notifications.complaint_id")
+    except sqlite3.OperationalError as e:
+        print(f" -> Skipping notifications.complaint_id (already exists?): {e}")
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_notifications_complaint_id ON notifications(complaint_id)",
+        "CREATE INDEX IF NOT EXISTS ix_upvotes_complaint_id ON upvotes(complaint_id)",
+        "CREATE INDEX IF NOT EXISTS ix_complaints_status_updated_at ON complaints(current_status, updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_complaints_officer_status ON complaints(assigned_officer_id, current_status)",
+    ]:
+        cursor.execute(statement)
+    print(" -> Archive indexes in place (archive tables are created by `flask init-db`)")
+
+    print("Preparing duplicate detection...")
+    for table in ("complaints", "complaints_archive"):
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN duplicate_of_id INTEGER")
+            print(f" -> Added {table}.duplicate_of_id")
+        except sqlite3.OperationalError as e:
+            print(f" -> Skipping {table}.duplicate_of_id (already exists?): {e}")
+    print(" -> Run `flask init-db` then `flask dedup-index` to build the signature index")
+
+    print("Preparing write-behind upvotes...")
+    try:
+        cursor.execute("ALTER TABLE complaints ADD COLUMN upvote_count INTEGER NOT NULL DEFAULT 0")
+        print(" -> Added complaints.upvote_count")
+    except sqlite3.OperationalError as e:
+        print(f" -> Skipping complaints.upvote_count (already exists?): {e}")
+    # Repeat upvotes from before the unique index; keep the first of each
+    cursor.execute("""
+    DELETE FROM upvotes WHERE id NOT IN (SELECT MIN(id) FROM upvotes GROUP BY user_id, complaint_id)
+    """)
+    print(f" -> Removed {cursor.rowcount} repeated upvote(s)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_upvotes_user_complaint ON upvotes(user_id, complaint_id)")
+    cursor.execute("""
+    UPDATE complaints SET upvote_count = (SELECT COUNT(*) FROM upvotes WHERE upvotes.complaint_id = complaints.id)
+    """)
+    print(" -> Backfilled upvote counts")
+
+    print("Preparing public feed pagination...")
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_complaints_public_created_at ON complaints(is_public, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_complaints_department_public_created_at "
+        "ON complaints(department_id, is_public, created_at, id)",
+    ]:
+        cursor.execute(statement)
+    print(" -> Public feed indexes in place")
+
+    print("Preparing trending ranking...")
+    try:
+        cursor.execute("ALTER TABLE complaints ADD COLUMN trending_score FLOAT NOT NULL DEFAULT 0")
+        cursor.execute("ALTER TABLE complaints ADD COLUMN trending_at DATETIME")
+        print(" -> Added complaints.trending_score and trending_at")
+    except sqlite3.OperationalError as e:
+        print(f" -> Skipping trending columns (already exist?): {e}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_complaints_public_trending "
+                   "ON complaints(is_public, trending_score, id)")
+    print(" -> Run `flask trending-decay --rebuild` to score recently upvoted complaints")
+
+    print("Preparing officer work queue...")
+    try:
+        cursor.execute("ALTER TABLE complaints ADD COLUMN priority FLOAT")
+        print(" -> Added complaints.priority")
+    except sqlite3.OperationalError as e:
+        print(f" -> Skipping complaints.priority (already exists?): {e}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_complaints_department_priority "
+                   "ON complaints(department_id, priority)")
+    print(" -> Run `flask work-queue-rebuild` to rank open complaints")
+
+    print("Converting status columns to integer codes...")
+    recode_statuses(cursor)
+
     conn.commit()
     conn.close()
     print("Migration complete!")
@@ -0,0 +1,146 @@
+"""
+Gunicorn configuration for the Civic Complaint Tracking System
+
+Pick a deployment profile with the GUNICORN_PROFILE environment variable:
+
+    sync     CPU-sized pool of sync workers (2 x cores + 1). Simple and
+             predictable, but one slow client (large evidence download,
+             SSE stream) occupies a whole worker.
+    gthread  (default) one process per core, each with a thread pool. Slow
+             clients only hold a thread; the DB-bound dashboards overlap I/O.
+    gevent   cooperative greenlets for very high concurrency of mostly idle
+             connections (SSE, slow mobile uploads). Needs `pip install gevent`;
+             falls back to gthread when it is not installed.
+
+Any value can still be overridden on the command line or with the usual
+GUNICORN_CMD_ARGS, e.g. GUNICORN_CMD_ARGS="--workers 3".
+
+Run: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+CORES = multiprocessing.cpu_count()
+
+# Each profile: worker model plus recycling, keepalive and timeouts.
+# `timeout` is the silent-worker kill limit. For sync workers it bounds a
+# whole request, so it has to cover a 16 MB evidence download on a slow link;
+# threaded/async workers heartbeat independently of requests, so streams
+# (SSE, downloads) are not cut off by it.
+PROFILES = {
+    'sync': {
+        'worker_class': 'sync',
+        'workers': CORES * 2 + 1,
+        'threads': 1,
+        'timeout': 120,
+        'keepalive': 2,
+        'max_requests': 1000,
+        'max_requests_jitter': 100,
+    },
+    'gthread': {
+        'worker_class': 'gthread',
+        'workers': CORES,
+        'threads': 8,
+        'timeout': 60,
+        'keepalive': 5,
+        'max_requests': 2000,
+        'max_requests_jitter': 200,
+    },
+    'gevent': {
+        'worker_class': 'gevent',
+        'workers': CORES,
+        'threads': 1,
+        'worker_connections': 1000,
+        'timeout': 60,
+        'keepalive': 30,
+        'max_requests': 5000,
+        'max_requests_jitter': 500,
+    },
+}
+
+profile_name = os.environ.get('GUNICORN_PROFILE', 'gthread').lower()
+if profile_name not in PROFILES:
+    raise RuntimeError(f'Unknown GUNICORN_PROFILE "{profile_name}". '
+                       f'Choose one of: {", ".join(PROFILES)}')
+if profile_name == 'gevent' and importlib.util.find_spec('gevent') is None:
+    print('gevent is not installed — falling back to the gthread profile.')
+    profile_name = 'gthread'
+
+profile = PROFILES[profile_name]
+
+if profile_name == 'gevent':
+    # Patch before --preload imports the app, otherwise modules loaded in the
+    # master keep references to the unpatched threading/socket primitives
+    from gevent import monkey
+    monkey.patch_all()
+
+# ── Server socket ────────────────────────────────────────────────────────
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+backlog = 2048
+
+# ── Workers ──────────────────────────────────────────────────────────────
+worker_class = profile['worker_class']
+workers = int(os.environ.get('WEB_CONCURRENCY', profile['workers']))
+threads = profile['threads']
+worker_connections = profile.get('worker_connections', 1000)
+
+# Recycle workers periodically (jittered so they don't all restart at once)
+max_requests = profile['max_requests']
+max_requests_jitter = profile['max_requests_jitter']
+
+timeout = profile['timeout']
+graceful_timeout = 30
+keepalive = profile['keepalive']
+
+# Build the app once in the master; workers share it copy-on-write.
+# create_app() registers an at-fork hook that drops inherited DB connections.
+preload_app = True
+
+# ── Metrics ──────────────────────────────────────────────────────────────
+# Workers write Prometheus values to per-process files in this directory and
+# /metrics merges them. It must be set before --preload imports the app, and
+# is emptied on every (re)start so counters from old processes don't linger.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'cctrs-metrics'))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+# ── Rate limiting ────────────────────────────────────────────────────────
+# Workers share their token buckets through one SQLite file (see
+# app/utils/rate_limit.py), so a client's limit doesn't multiply by the
+# number of workers. Like the metrics dir it must be set before --preload.
+os.environ.setdefault('RATE_LIMIT_STORAGE',
+                      'sqlite:///' + os.path.join(tempfile.gettempdir(), 'cctrs-ratelimit.db'))
+
+# ── Logging ──────────────────────────────────────────────────────────────
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    server.log.info(f'Profile "{profile_name}": {workers} x {worker_class} '
+                    f'worker(s), {threads} thread(s) each, timeout {timeout}s')
+
+
+def worker_exit(server, worker):
+    # Write the last SQL aggregates for child_exit to retire
+    from app.utils import sql_stats
+    app = server.app.wsgi()
+    if app.config['SQL_INSTRUMENTATION']:
+        sql_stats.flush(sql_stats.stats_dir(app))
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight requests)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+    # Fold its SQL aggregates into the retired totals
+    from app.utils import sql_stats
+    app = server.app.wsgi()
+    if app.config['SQL_INSTRUMENTATION']:
+        sql_stats.retire(sql_stats.stats_dir(app), worker.pid)